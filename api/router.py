@@ -1,10 +1,14 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from .v1 import auth, item, user
+from core.admission import admit_auth_request
 from core.config import settings
 
 api_router = APIRouter(prefix=settings.API_V1_STR)
 
 # Include routers
-api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
+api_router.include_router(
+    auth.router, prefix="/auth", tags=["auth"], dependencies=[Depends(admit_auth_request)]
+)
+api_router.include_router(auth.token_router, prefix="/auth", tags=["auth"])
 api_router.include_router(user.router, prefix="/users", tags=["users"])
 api_router.include_router(item.router, prefix="/items", tags=["items"])
\ No newline at end of file
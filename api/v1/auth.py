@@ -1,16 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 import re
+import crud.refresh_token as crud_refresh_token
 import crud.user as crud_user
 from models.user import User
-from schemas.user import UserCreate, Token
-from core.database import get_db
-from core.security import verify_password, create_access_token
+from schemas.user import RefreshRequest, UserCreate, Token
+from core.database import get_async_db
+from core.security import verify_password_async, rehash_password_async, create_access_token
 from core.config import settings
 
 router = APIRouter()
+# Token endpoints never run Argon2, so they sit outside auth admission control
+token_router = APIRouter()
 
 def validate_email(email: str) -> bool:
     """Validate email format"""
@@ -29,8 +33,16 @@ def validate_password(password: str) -> tuple[bool, str]:
         return False, "Password must contain at least one number"
     return True, ""
 
+def token_response(user: User, refresh_token: str) -> dict:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.email},
+        expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
 @router.post("/register", response_model=dict)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register new user"""
     if not validate_email(user_in.email):
         raise HTTPException(
@@ -45,7 +57,8 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
             detail=password_error
         )
     
-    existing_user = db.query(User).filter(User.email == user_in.email).first()
+    result = await db.execute(select(User).where(User.email == user_in.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -53,7 +66,7 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
         )
     
     try:
-        user = crud_user.create_user(
+        user = await crud_user.create_user(
             db=db,
             username=user_in.email.split("@")[0],
             password=user_in.password,
@@ -61,8 +74,10 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
             full_name=None
         )
         return {"message": "User created successfully", "email": user.email}
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating user: {str(e)}"
@@ -71,26 +86,53 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     OAuth2 compatible token login
     Use your email as username
     """
     # form_data.username sẽ chứa email
-    user = db.query(User).filter(User.email == form_data.username).first()
+    result = await db.execute(select(User).where(User.email == form_data.username))
+    user = result.scalars().first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email},
-        expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    # Upgrade hashes made with older Argon2 parameters while the password is at hand
+    new_hash = await rehash_password_async(form_data.password, user.hashed_password)
+    if new_hash is not None:
+        await crud_user.update_password_hash(db, user.id, user.hashed_password, new_hash)
+
+    refresh_token = await crud_refresh_token.issue_refresh_token(db, user.id)
+    return token_response(user, refresh_token)
+
+@token_router.post("/refresh", response_model=Token)
+async def refresh(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Exchange a refresh token for a new access token and refresh token
+
+    Each refresh token works once. Presenting a used one revokes every
+    token issued from the same login.
+    """
+    rotated = await crud_refresh_token.rotate_refresh_token(db, body.refresh_token)
+    user = await db.get(User, rotated[0]) if rotated else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return token_response(user, rotated[1])
+
+@token_router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Revoke the refresh token and every token rotated from the same login"""
+    row = await crud_refresh_token.get_refresh_token(db, body.refresh_token)
+    if row is not None:
+        await crud_refresh_token.revoke_family(db, row.family)
\ No newline at end of file
@@ -1,83 +1,377 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Literal
+import json
+import zlib
 from models.item import Item
-from models.user import User
-from schemas.item import ItemCreate, Item as ItemSchema
-from core.database import get_db
-from core.security import get_current_user
+import crud.item as crud_item
+import crud.item_stats as crud_item_stats
+from crud.item import owned_items_query, search_items_query
+from schemas.item import (
+    ItemCreate, Item as ItemSchema, ItemBulkUpdate, ItemBulkDelete, BulkItemResult, ItemListAdapter, ItemStats,
+    ItemBatch, ItemBatchRequest,
+)
+from core.batch import check_batch_size, parse_ids
+from core.config import settings
+from core.database import get_async_db
+from core.etag import if_match, if_none_match, make_etag, make_list_etag
+from core.group_commit import run_write
+from core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from core.responses import RawJSONResponse
+from core.security import Principal, get_current_user
 
 router = APIRouter()
 
 @router.post("/", response_model=ItemSchema, status_code=status.HTTP_201_CREATED)
 async def create_item(
     item: ItemCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create new item for current user"""
-    db_item = Item(
-        title=item.title,
-        description=item.description,
-        owner_id=current_user.id
-    )
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
-    return db_item
+    async def create(session: AsyncSession) -> Item:
+        db_item = Item(
+            title=item.title,
+            description=item.description,
+            owner_id=current_user.id
+        )
+        session.add(db_item)
+        await session.flush()
+        await crud_item_stats.adjust_item_count(session, current_user.id, 1)
+        return db_item
+
+    return await run_write(db, create)
 
-@router.get("/", response_model=List[ItemSchema])
+# Columns read by the list endpoint: the schema's fields plus the version for the ETag
+LIST_COLUMNS = (Item.id, Item.title, Item.description, Item.owner_id, Item.version)
+
+@router.get(
+    "/",
+    response_model=List[ItemSchema],
+    response_class=RawJSONResponse,
+    responses={200: {"headers": {NEXT_CURSOR_HEADER: {
+        "description": "Cursor for the next page; absent on the last page",
+        "schema": {"type": "string"},
+    }}}},
+)
 async def get_items(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: str | None = None,
+    if_none_match_header: str | None = Header(None, alias="If-None-Match"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Get all items of current user, in id order
+    
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next
+    page with a keyset seek; `skip` is ignored when `cursor` is given.
+    
+    Rows are fetched as plain column tuples and serialized in one pass by
+    ItemListAdapter, skipping ORM instances and FastAPI's per-object
+    response validation.
+    """
+    if cursor is not None:
+        try:
+            owner_id, after_id = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if owner_id != current_user.id or not isinstance(after_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = owned_items_query(current_user.id, after_id=after_id)
+    else:
+        query = owned_items_query(current_user.id).offset(skip)
+
+    result = await db.execute(query.with_only_columns(*LIST_COLUMNS).limit(limit))
+    rows = result.all()
+    headers = {"ETag": make_list_etag("items", ((row.id, row.version) for row in rows))}
+    if rows and len(rows) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(current_user.id, rows[-1].id)
+    if if_none_match(if_none_match_header, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    body = ItemListAdapter.dump_json(ItemListAdapter.validate_python(rows, from_attributes=True))
+    return RawJSONResponse(body, headers=headers)
+
+EXPORT_COLUMNS = (Item.id, Item.title, Item.description, Item.owner_id)
+
+async def export_chunks(db: AsyncSession, owner_id: int, fmt: str) -> AsyncIterator[bytes]:
+    """Serialize the owner's items batch by batch from a server-side cursor"""
+    query = (
+        owned_items_query(owner_id)
+        .with_only_columns(*EXPORT_COLUMNS)
+        .execution_options(yield_per=settings.ITEMS_EXPORT_BATCH_SIZE)
+    )
+    result = await db.stream(query)
+    first = True
+    try:
+        if fmt == "json":
+            yield b"["
+        async for rows in result.partitions():
+            lines = [json.dumps(row._asdict(), ensure_ascii=False) for row in rows]
+            if fmt == "json":
+                chunk = ",".join(lines)
+                yield (chunk if first else "," + chunk).encode()
+            else:
+                yield ("\n".join(lines) + "\n").encode()
+            first = False
+        if fmt == "json":
+            yield b"]"
+    finally:
+        # Release the cursor if the client disconnects mid-stream
+        await result.close()
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_items(
+    format: Literal["ndjson", "json"] = "ndjson",
+    compress: Literal["gzip"] | None = Query(None, description="Compress the stream"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Stream all items of current user as NDJSON (default) or a JSON array
+    
+    Rows are read in ITEMS_EXPORT_BATCH_SIZE batches, so memory stays flat
+    however many items the user owns.
+    """
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    body = export_chunks(db, current_user.id, format)
+    headers = {"Content-Disposition": f'attachment; filename="items.{format}"'}
+    if compress == "gzip":
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+@router.get(
+    "/search",
+    response_model=List[ItemSchema],
+    responses={200: {"headers": {NEXT_CURSOR_HEADER: {
+        "description": "Cursor for the next page of results; absent on the last page",
+        "schema": {"type": "string"},
+    }}}},
+)
+async def search_items(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in title or description"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Full-text search over current user's item titles and descriptions
+    
+    Results are ordered by bm25 relevance. Every word must match; pass the
+    X-Next-Cursor header as `cursor` for the next page.
+    """
+    if not q.split():
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    after = None
+    if cursor is not None:
+        try:
+            owner_id, last_rank, last_id = decode_cursor(cursor, 3)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if owner_id != current_user.id or not isinstance(last_rank, (int, float)) or not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after = (last_rank, last_id)
+
+    result = await db.execute(search_items_query(current_user.id, q, after=after).limit(limit))
+    rows = result.all()
+    if rows and len(rows) == limit:
+        last_item, last_rank = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(current_user.id, last_rank, last_item.id)
+    return [item for item, _ in rows]
+
+@router.post("/bulk", response_model=List[BulkItemResult])
+async def create_items_bulk(
+    items: List[ItemCreate],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Create many items for current user in one transaction"""
+    check_batch_size(len(items), settings.ITEMS_BULK_MAX_BATCH)
+    db_items = await crud_item.create_items(db, items, owner_id=current_user.id) if items else []
+    return [
+        BulkItemResult(index=i, id=db_item.id, status=status.HTTP_201_CREATED, item=db_item)
+        for i, db_item in enumerate(db_items)
+    ]
+
+@router.patch("/bulk", response_model=List[BulkItemResult])
+async def update_items_bulk(
+    updates: List[ItemBulkUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Update many items of current user in one transaction"""
+    check_batch_size(len(updates), settings.ITEMS_BULK_MAX_BATCH)
+    updated = await crud_item.update_items(db, updates, owner_id=current_user.id) if updates else {}
+    return [
+        BulkItemResult(index=i, id=u.id, status=status.HTTP_200_OK, item=updated[u.id])
+        if u.id in updated else
+        BulkItemResult(index=i, id=u.id, status=status.HTTP_404_NOT_FOUND, detail="Item not found")
+        for i, u in enumerate(updates)
+    ]
+
+@router.delete("/bulk", response_model=List[BulkItemResult])
+async def delete_items_bulk(
+    body: ItemBulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all items of current user"""
-    items = db.query(Item).filter(Item.owner_id == current_user.id).offset(skip).limit(limit).all()
-    return items
+    """Delete many items of current user in one transaction"""
+    check_batch_size(len(body.ids), settings.ITEMS_BULK_MAX_BATCH)
+    deleted = await crud_item.delete_items(db, body.ids, owner_id=current_user.id) if body.ids else set()
+    return [
+        BulkItemResult(index=i, id=item_id, status=status.HTTP_204_NO_CONTENT)
+        if item_id in deleted else
+        BulkItemResult(index=i, id=item_id, status=status.HTTP_404_NOT_FOUND, detail="Item not found")
+        for i, item_id in enumerate(body.ids)
+    ]
+
+async def fetch_batch(db: AsyncSession, owner_id: int, ids: List[int]) -> RawJSONResponse:
+    """
+    Resolve ``ids`` with one IN query over the owner's items
+
+    Items come back in request order (duplicates once); ids that do not
+    exist or belong to someone else are listed as missing alike.
+    """
+    check_batch_size(len(ids), settings.ITEMS_BULK_MAX_BATCH)
+    wanted = list(dict.fromkeys(ids))
+    rows = {}
+    if wanted:
+        query = owned_items_query(owner_id).where(Item.id.in_(wanted)).with_only_columns(*LIST_COLUMNS)
+        rows = {row.id: row for row in (await db.execute(query)).all()}
+    batch = ItemBatch.model_validate(
+        {"items": [rows[i] for i in wanted if i in rows], "missing": [i for i in wanted if i not in rows]},
+        from_attributes=True,
+    )
+    return RawJSONResponse(batch.model_dump_json().encode())
+
+@router.get("/batch", response_model=ItemBatch, response_class=RawJSONResponse)
+async def get_items_batch(
+    ids: str = Query(..., description="Comma-separated item ids, e.g. 1,2,3"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get several items of current user by id in one request"""
+    return await fetch_batch(db, current_user.id, parse_ids(ids))
+
+@router.post("/batch", response_model=ItemBatch, response_class=RawJSONResponse)
+async def post_items_batch(
+    body: ItemBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get several items of current user by id; the POST form for id lists too long for a URL"""
+    return await fetch_batch(db, current_user.id, body.ids)
+
+@router.get("/stats", response_model=ItemStats)
+async def get_item_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Item totals of current user, read from the maintained counters"""
+    return ItemStats(owner_id=current_user.id, item_count=await crud_item_stats.get_item_count(db, current_user.id))
 
 @router.get("/{item_id}", response_model=ItemSchema)
 async def get_item(
     item_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    if_none_match_header: str | None = Header(None, alias="If-None-Match"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get specific item by ID"""
-    item = db.query(Item).filter(Item.id == item_id, Item.owner_id == current_user.id).first()
+    """
+    Get specific item by ID
+    
+    Answers If-None-Match with 304 after reading only the item's version;
+    without it the row is read once.
+    """
+    if if_none_match_header is not None:
+        result = await db.execute(select(Item.version).where(Item.id == item_id, Item.owner_id == current_user.id))
+        version = result.scalar()
+        if version is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        etag = make_etag("item", item_id, version)
+        if if_none_match(if_none_match_header, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    result = await db.execute(select(Item).where(Item.id == item_id, Item.owner_id == current_user.id))
+    item = result.scalars().first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
+    response.headers["ETag"] = make_etag("item", item.id, item.version)
     return item
 
+def stale_item(if_match_header: str | None) -> HTTPException:
+    """The error for a write whose row changed underneath it"""
+    if if_match_header is not None:
+        return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Item has been modified")
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Item was modified concurrently, retry")
+
 @router.put("/{item_id}", response_model=ItemSchema)
 async def update_item(
     item_id: int,
     item_update: ItemCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    if_match_header: str | None = Header(None, alias="If-Match"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Update item"""
-    db_item = db.query(Item).filter(Item.id == item_id, Item.owner_id == current_user.id).first()
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
+    """
+    Update item
     
-    db_item.title = item_update.title
-    db_item.description = item_update.description
-    db.commit()
-    db.refresh(db_item)
+    With If-Match, the update only applies if the item still has that ETag;
+    otherwise 412 Precondition Failed. An update that loses a race with a
+    concurrent write is 412 with If-Match and 409 without.
+    """
+    async def update(session: AsyncSession) -> Item:
+        result = await session.execute(select(Item).where(Item.id == item_id, Item.owner_id == current_user.id))
+        db_item = result.scalars().first()
+        if not db_item:
+            raise HTTPException(status_code=404, detail="Item not found")
+        if not if_match(if_match_header, make_etag("item", db_item.id, db_item.version)):
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Item has been modified")
+
+        db_item.title = item_update.title
+        db_item.description = item_update.description
+        try:
+            # UPDATE ... WHERE version = <loaded version>; a concurrent write makes it miss
+            await session.flush()
+        except StaleDataError:
+            raise stale_item(if_match_header)
+        return db_item
+
+    try:
+        db_item = await run_write(db, update)
+    except HTTPException:
+        await db.rollback()
+        raise
+    response.headers["ETag"] = make_etag("item", db_item.id, db_item.version)
     return db_item
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_item(
     item_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Delete item"""
-    db_item = db.query(Item).filter(Item.id == item_id, Item.owner_id == current_user.id).first()
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    db.delete(db_item)
-    db.commit()
+    async def delete(session: AsyncSession):
+        if not await crud_item.delete_item(session, item_id, owner_id=current_user.id):
+            raise HTTPException(status_code=404, detail="Item not found")
+
+    await run_write(db, delete)
     return None
\ No newline at end of file
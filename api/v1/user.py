@@ -1,33 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+import crud.item_stats as crud_item_stats
+import crud.refresh_token as crud_refresh_token
+import crud.user as crud_user
 from models.user import User
-from schemas.user import User as UserSchema
-from core.database import get_db
-from core.security import get_current_user
+from schemas.user import User as UserSchema, UserBatch
+from core.batch import check_batch_size, parse_ids
+from core.config import settings
+from core.database import get_async_db
+from core.etag import if_none_match, make_etag
+from core.security import Principal, get_current_user, invalidate_principal
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserSchema)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    if_none_match_header: str | None = Header(None, alias="If-None-Match"),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get current logged-in user information
     Requires: Bearer token in Authorization header
     """
+    etag = make_etag("user", current_user.id, current_user.version)
+    if if_none_match(if_none_match_header, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return current_user
 
+@router.get("", response_model=UserBatch)
+async def get_users_batch(
+    ids: str = Query(..., description="Comma-separated user ids, e.g. 1,2,3"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Get several user profiles by ID, in request order
+    Served from the profile cache; misses are loaded with one query
+    """
+    wanted = list(dict.fromkeys(parse_ids(ids)))
+    check_batch_size(len(wanted), settings.USERS_BATCH_MAX_IDS)
+    profiles = await crud_user.get_profiles(db, wanted)
+    return UserBatch(
+        users=[profiles[i] for i in wanted if i in profiles],
+        missing=[i for i in wanted if i not in profiles],
+    )
+
 @router.get("/{user_id}", response_model=UserSchema)
 async def get_user_by_id(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get user by ID
     Requires: Bearer token in Authorization header
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await crud_user.get_profiles(db, [user_id])).get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -35,29 +66,44 @@ async def get_user_by_id(
 @router.put("/me", response_model=UserSchema)
 async def update_current_user(
     full_name: str | None = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Update current user's information
     Requires: Bearer token in Authorization header
     """
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
     if full_name is not None:
-        current_user.full_name = full_name
+        user.full_name = full_name
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    try:
+        await db.commit()
+    except StaleDataError:
+        # Another request updated the user between our read and our write
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User was modified concurrently, retry")
+    await db.refresh(user)
+    invalidate_principal(user.email)
+    crud_user.cache_profile(user)
+    return user
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_current_user(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Delete current user account
     Requires: Bearer token in Authorization header
     """
-    db.delete(current_user)
-    db.commit()
+    await crud_item_stats.delete_item_stats(db, current_user.id)
+    # Otherwise the next user given this id could refresh into the account
+    await crud_refresh_token.delete_user_tokens(db, current_user.id)
+    await crud_user.delete_user(db, current_user.id)
+    await db.commit()
+    invalidate_principal(current_user.email)
+    crud_user.invalidate_profile(current_user.id)
     return None
\ No newline at end of file
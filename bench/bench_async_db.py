@@ -0,0 +1,165 @@
+"""
+Concurrent-request throughput: sync Session vs AsyncSession in async handlers
+
+The "before" app is the pre-migration pattern (``async def`` handler using a
+blocking ``Session``); the "after" app is the same handler on ``AsyncSession``.
+Both run a mixed workload against a file-backed SQLite database: one in
+every ``--write-every`` requests inserts and commits an item, the rest list
+the newest items.
+
+Both engines use the same pool limits with short pool and lock timeouts. When
+a blocking handler holds up the event loop, requests that cannot get a
+connection or the write lock fail instead of hanging the run; failures are
+reported next to throughput.
+
+Usage:
+    python -m bench.bench_async_db --requests 2000 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.database import Base
+from models.item import Item
+from models.user import User
+
+# Seconds a request may wait for a pooled connection / the SQLite write lock
+# before failing
+POOL_TIMEOUT = 0.25
+LOCK_TIMEOUT = 0.25
+
+
+def build_before_app(url: str):
+    """Baseline pattern: async handler, blocking Session; returns (app, engine)"""
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": LOCK_TIMEOUT},
+        pool_timeout=POOL_TIMEOUT,
+    )
+    SessionLocal = sessionmaker(autoflush=False, bind=engine)
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.post("/items")
+    async def create(db: Session = Depends(get_db)):
+        db.add(Item(title="bench", owner_id=1))
+        db.commit()
+        return {}
+
+    @app.get("/items")
+    async def list_items(db: Session = Depends(get_db)):
+        return len(db.query(Item).filter(Item.owner_id == 1).order_by(Item.id.desc()).limit(50).all())
+
+    return app, engine
+
+
+def build_after_app(url: str):
+    """Migrated pattern: async handler, AsyncSession; returns (app, engine)"""
+    engine = create_async_engine(
+        url.replace("sqlite://", "sqlite+aiosqlite://"),
+        connect_args={"timeout": LOCK_TIMEOUT},
+        pool_timeout=POOL_TIMEOUT,
+    )
+    SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    app = FastAPI()
+
+    async def get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    @app.post("/items")
+    async def create(db: AsyncSession = Depends(get_db)):
+        db.add(Item(title="bench", owner_id=1))
+        await db.commit()
+        return {}
+
+    @app.get("/items")
+    async def list_items(db: AsyncSession = Depends(get_db)):
+        result = await db.execute(
+            select(Item).where(Item.owner_id == 1).order_by(Item.id.desc()).limit(50)
+        )
+        return len(result.scalars().all())
+
+    return app, engine
+
+
+async def drive(build, url: str, total: int, concurrency: int, write_every: int) -> tuple[float, int]:
+    """Send ``total`` requests with ``concurrency`` workers; return (requests/second, failures)"""
+    app, engine = build(url)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    counter = iter(range(total))
+    failures = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal failures
+            for i in counter:
+                if i % write_every == 0:
+                    response = await client.post("/items")
+                else:
+                    response = await client.get("/items")
+                failures += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    # Both engine kinds must be released on this loop
+    result = engine.dispose()
+    if asyncio.iscoroutine(result):
+        await result
+    return total / elapsed, failures
+
+
+def prepare_database(path: str) -> str:
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        db.add_all(Item(title=f"seed {i}", owner_id=1) for i in range(500))
+        db.commit()
+    engine.dispose()
+    return url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--write-every", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'concurrency':>11}  {'before rps':>10}  {'failed':>6}  {'after rps':>10}  {'failed':>6}")
+        for concurrency in args.concurrency:
+            results = []
+            for name, build in (("before", build_before_app), ("after", build_after_app)):
+                url = prepare_database(os.path.join(tmp, f"{name}-{concurrency}.db"))
+                results.append(asyncio.run(drive(build, url, args.requests, concurrency, args.write_every)))
+            (before, before_failed), (after, after_failed) = results
+            print(
+                f"{concurrency:>11}  {before:>10.0f}  {before_failed:>6}  {after:>10.0f}  {after_failed:>6}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
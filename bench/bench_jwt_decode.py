@@ -0,0 +1,46 @@
+"""
+JWT decode cost with and without the verified-token cache
+
+Compares python-jose's ``jwt.decode`` (HMAC check + JSON parse on every
+call) with ``core.security.decode_access_token`` once the token is cached.
+
+Usage:
+    python -m bench.bench_jwt_decode --iterations 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jose import jwt
+
+from core.config import settings
+from core.security import create_access_token, decode_access_token, token_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = create_access_token({"sub": "bench@example.com"})
+    token_cache.clear()
+    decode_access_token(token)
+
+    uncached = timeit.timeit(
+        lambda: jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"]),
+        number=args.iterations,
+    )
+    cached = timeit.timeit(lambda: decode_access_token(token), number=args.iterations)
+
+    per_uncached = uncached / args.iterations * 1e6
+    per_cached = cached / args.iterations * 1e6
+    print(f"jwt.decode:          {per_uncached:8.2f} us/call")
+    print(f"decode_access_token: {per_cached:8.2f} us/call (cache hit)")
+    print(f"speedup:             {per_uncached / per_cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Full-text search latency: FTS5 + bm25 vs a LIKE '%term%' scan
+
+Seeds one owner with N items in a file-backed SQLite database created from
+the app's metadata (so the FTS5 table and triggers are in place), then
+times the first page of results for a few query terms. Each term matches
+roughly 10% (single word) or 1% (two words) of the rows; "42424" matches
+one row.
+
+Usage:
+    python -m bench.bench_search --sizes 100000 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, or_, text
+from sqlalchemy.orm import Session
+
+from core.database import Base
+from crud.item import owned_items_query, search_items_query
+from models.item import Item
+import models  # noqa: F401  (registers all tables)
+
+WORDS = ["milk", "bread", "report", "invoice", "meeting", "garden", "refactor", "deploy", "dentist", "taxes"]
+TERMS = ["invoice", "dentist", "refactor deploy", "42424"]
+
+
+def seed(engine, size: int):
+    words = ", ".join(f"'{w}'" for w in WORDS)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'b', 'b@example.com', 'x')"))
+        conn.execute(text(
+            f"""
+            WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < :size),
+            w(i, word) AS (SELECT row_number() OVER () - 1, value FROM json_each('[' || :words || ']'))
+            INSERT INTO items (title, description, owner_id)
+            SELECT 'task ' || x || ' ' || (SELECT word FROM w WHERE i = x % 10),
+                   'note about ' || (SELECT word FROM w WHERE i = (x * 7 + x / 10) % 10),
+                   1
+            FROM n
+            """
+        ), {"size": size, "words": words.replace("'", '"')})
+
+
+def timed(session, query, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        session.execute(query).all()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'items':>9}  {'query':<16}  {'fts ms':>8}  {'like page':>9}  {'like all':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'search.db')}")
+            Base.metadata.create_all(bind=engine)
+            seed(engine, size)
+            with Session(engine) as session:
+                for term in TERMS:
+                    fts = search_items_query(1, term).limit(args.limit)
+                    # LIKE cannot rank: "like page" is an unranked first page, "like all"
+                    # is the full scan a ranked LIKE search would need
+                    like_all = owned_items_query(1).where(*(
+                        or_(Item.title.like(f"%{word}%"), Item.description.like(f"%{word}%"))
+                        for word in term.split()
+                    ))
+                    like_page = like_all.limit(args.limit)
+                    print(
+                        f"{size:>9}  {term:<16}  {timed(session, fts, args.repeat):>8.2f}  "
+                        f"{timed(session, like_page, args.repeat):>9.2f}  "
+                        f"{timed(session, like_all, args.repeat):>8.2f}",
+                        flush=True,
+                    )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+List serialization cost: ORM objects + response_model vs column tuples + TypeAdapter
+
+Seeds one owner with N items in an in-memory SQLite database and times one
+page of the list endpoint's work, from query to JSON bytes, both ways:
+
+  orm    load Item instances, validate them against List[ItemSchema] and
+         json.dumps the jsonable result (what response_model does)
+  fast   load column tuples and ItemListAdapter.dump_json them (get_items)
+
+Peak allocations come from tracemalloc over a single run.
+
+Usage:
+    python -m bench.bench_serialization --sizes 100 1000 10000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from typing import List
+
+from api.v1.item import LIST_COLUMNS
+from core.database import Base
+from crud.item import owned_items_query
+from schemas.item import Item as ItemSchema, ItemListAdapter
+import models  # noqa: F401  (registers all tables)
+
+# FastAPI builds an equivalent adapter for response_model and dumps in JSON mode
+response_model = TypeAdapter(List[ItemSchema])
+
+
+def orm_page(session, size: int) -> bytes:
+    items = session.execute(owned_items_query(1).limit(size)).scalars().all()
+    content = response_model.dump_python(response_model.validate_python(items, from_attributes=True), mode="json")
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    session.expunge_all()
+    return body
+
+
+def fast_page(session, size: int) -> bytes:
+    rows = session.execute(owned_items_query(1).with_only_columns(*LIST_COLUMNS).limit(size)).all()
+    return ItemListAdapter.dump_json(ItemListAdapter.validate_python(rows, from_attributes=True))
+
+
+def measure(fn, session, size: int, repeat: int) -> tuple[float, float]:
+    fn(session, size)  # warm up statement cache
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(session, size)
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(session, size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(samples) * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'b', 'b@example.com', 'x')"))
+        conn.execute(text(
+            """
+            WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < :size)
+            INSERT INTO items (title, description, owner_id)
+            SELECT 'task ' || x, 'some longer description for item ' || x, 1 FROM n
+            """
+        ), {"size": max(args.sizes)})
+
+    print(f"{'items':>6}  {'orm ms':>8}  {'fast ms':>8}  {'speedup':>7}  {'orm KiB':>9}  {'fast KiB':>9}")
+    with Session(engine) as session:
+        assert json.loads(orm_page(session, 10)) == json.loads(fast_page(session, 10))
+        for size in args.sizes:
+            orm_ms, orm_kib = measure(orm_page, session, size, args.repeat)
+            fast_ms, fast_kib = measure(fast_page, session, size, args.repeat)
+            print(
+                f"{size:>6}  {orm_ms:>8.2f}  {fast_ms:>8.2f}  {orm_ms / fast_ms:>6.1f}x  "
+                f"{orm_kib:>9.0f}  {fast_kib:>9.0f}",
+                flush=True,
+            )
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
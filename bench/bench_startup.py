@@ -0,0 +1,107 @@
+"""
+Cold-start cost: time to import the app and time to first response
+
+Each sample runs in a fresh interpreter against a migrated SQLite file:
+
+  import     wall time of ``import main`` inside the interpreter
+  process    interpreter start through ``import main`` returning
+  first      ``uvicorn main:app`` spawn until GET /health answers 200
+
+It also reports which heavy optional modules ``import main`` loaded.
+``--root`` points at another checkout to measure it the same way (for
+before/after comparisons); manage.py migrate is run there if it exists.
+
+Usage:
+    python -m bench.bench_startup --runs 10
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("argon2", "jose", "cryptography.x509")
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"import": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(root: str, env: dict) -> tuple[float, float, list[str]]:
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=root, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    process = time.perf_counter() - start
+    probe = json.loads(out.strip().splitlines()[-1])
+    return probe["import"], process, probe["loaded"]
+
+
+def measure_first_response(root: str, env: dict) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=root, env=env,
+    )
+    try:
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited before answering")
+            time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--root", default=ROOT, help="checkout to measure")
+    args = parser.parse_args()
+    root = os.path.abspath(args.root)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'startup.db')}"}
+        if os.path.exists(os.path.join(root, "manage.py")):
+            subprocess.run([sys.executable, "manage.py", "migrate"], cwd=root, env=env, check=True,
+                           stdout=subprocess.DEVNULL)
+
+        imports, processes, firsts = [], [], []
+        loaded: list[str] = []
+        for _ in range(args.runs):
+            import_s, process_s, loaded = measure_import(root, env)
+            imports.append(import_s)
+            processes.append(process_s)
+            firsts.append(measure_first_response(root, env))
+
+    print(f"{'metric':<8}  {'median ms':>9}  {'min ms':>8}  {'max ms':>8}")
+    for name, samples in (("import", imports), ("process", processes), ("first", firsts)):
+        print(f"{name:<8}  {statistics.median(samples) * 1000:>9.0f}  "
+              f"{min(samples) * 1000:>8.0f}  {max(samples) * 1000:>8.0f}")
+    print(f"heavy modules loaded by import main: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Mixed read/write throughput for each SQLite storage profile
+
+For every profile in core.storage.PROFILES, seeds a file-backed database
+and runs ``--concurrency`` async workers on an aiosqlite engine configured
+exactly like the app's (profile pragmas plus the DB_POOL_* settings). One in
+every ``--write-every`` operations inserts and commits an item; the rest
+read a page of the newest items. Operations that fail (e.g. "database is
+locked" after busy_timeout) are counted, not retried.
+
+Usage:
+    python -m bench.bench_storage --operations 4000 --concurrency 1 8 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.database import Base, to_async_url
+from core.storage import PROFILES, apply_storage_profile, pool_options
+from models.item import Item
+from models.user import User
+
+
+def prepare(url: str, profile):
+    engine = create_engine(url)
+    apply_storage_profile(engine, profile)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        conn.execute(insert(Item), [{"title": f"seed {i}", "owner_id": 1} for i in range(1000)])
+    engine.dispose()
+
+
+async def drive(url: str, profile, total: int, concurrency: int, write_every: int) -> tuple[float, float, int]:
+    """Return (operations/second, p95 ms, failures)"""
+    engine = create_async_engine(to_async_url(url), **pool_options(url))
+    apply_storage_profile(engine.sync_engine, profile)
+    counter = iter(range(total))
+    samples: list[float] = []
+    failures = 0
+    page = select(Item.id, Item.title).where(Item.owner_id == 1).order_by(Item.id.desc()).limit(50)
+
+    async def worker():
+        nonlocal failures
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                if i % write_every == 0:
+                    async with engine.begin() as conn:
+                        await conn.execute(insert(Item).values(title="bench", owner_id=1))
+                else:
+                    async with engine.connect() as conn:
+                        (await conn.execute(page)).all()
+            except OperationalError:
+                failures += 1
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    p95 = statistics.quantiles(samples, n=20)[-1] * 1000
+    return total / elapsed, p95, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--operations", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--write-every", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'profile':<9}  {'conc':>4}  {'ops/s':>8}  {'p95 ms':>8}  {'failed':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, profile in PROFILES.items():
+            for concurrency in args.concurrency:
+                url = f"sqlite:///{os.path.join(tmp, f'{name}-{concurrency}.db')}"
+                prepare(url, profile)
+                ops, p95, failed = asyncio.run(drive(url, profile, args.operations, concurrency, args.write_every))
+                print(f"{name:<9}  {concurrency:>4}  {ops:>8.0f}  {p95:>8.2f}  {failed:>6}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
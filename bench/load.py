@@ -0,0 +1,372 @@
+"""
+End-to-end load benchmark for the auth and item flows
+
+Drives the real application either in-process through httpx's ASGI
+transport (``--target asgi``) or over HTTP against a uvicorn server started
+on a free local port (``--target uvicorn``). Each run uses a fresh SQLite
+file, so results do not depend on local state.
+
+Scenarios (each runs ``--requests`` requests per concurrency level):
+
+  register   POST /auth/register with unique emails (Argon2 hash)
+  login      POST /auth/login for one of the seeded users (Argon2 verify)
+  refresh    POST /auth/refresh, each worker rotating its own refresh token
+  me         GET /users/me
+  profiles   GET /users?ids= with 10 random seeded users (profile cache)
+  items      per worker: 20% create, 50% list, 20% update, 10% delete
+  retries    POST /items/ with an Idempotency-Key, each key sent 3 times
+             as a client on a flaky network would
+
+Admission control on /auth is switched off (AUTH_ADMISSION_ENABLED=false)
+so register and login measure the Argon2 path rather than 429s from one
+client address; pass ``--admission`` to keep it on.
+
+Results (RPS, error count, p50/p95/p99 latency in ms and the number of
+Argon2 verifications, read from /metrics) are printed and
+written to ``--output`` as JSON. ``compare`` checks a result file against a
+stored baseline and exits 1 when any scenario's p95 grew, or its RPS
+dropped, by more than ``--threshold``.
+
+Usage:
+    python -m bench.load run --target asgi --concurrency 1 16 --output bench/results.json
+    python -m bench.load compare bench/baseline.json bench/results.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API = "/api/v1"
+PASSWORD = "bench123"
+SCENARIOS = ("register", "login", "refresh", "me", "profiles", "items", "retries")
+PROFILE_BATCH = 10
+RETRY_ATTEMPTS = 3
+
+
+def percentile(sorted_samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, -(-len(sorted_samples) * pct // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+def summarize(
+    scenario: str, concurrency: int, samples: list[float], errors: int, elapsed: float, counters: dict | None = None
+) -> dict:
+    samples = sorted(samples)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": errors,
+        **(counters or {}),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+class Runner:
+    """Runs the scenarios against one client"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.ids = itertools.count()
+        self.tokens: list[dict] = []
+        self.refresh_tokens: list[str] = []
+        self.user_ids: list[int] = []
+
+    async def register(self, email: str) -> httpx.Response:
+        return await self.client.post(f"{API}/auth/register", json={"email": email, "password": PASSWORD})
+
+    async def login(self, email: str) -> httpx.Response:
+        return await self.client.post(f"{API}/auth/login", data={"username": email, "password": PASSWORD})
+
+    async def seed(self, users: int):
+        """Register ``users`` accounts and keep a bearer header for each"""
+        for n in range(users):
+            email = f"seed{n}@bench.example.com"
+            await self.register(email)
+            tokens = (await self.login(email)).json()
+            self.tokens.append({"Authorization": f"Bearer {tokens['access_token']}"})
+            self.refresh_tokens.append(tokens["refresh_token"])
+            self.user_ids.append((await self.client.get(f"{API}/users/me", headers=self.tokens[-1])).json()["id"])
+
+    async def scrape(self) -> dict[str, float]:
+        """The app's /metrics samples by series name (with labels)"""
+        samples = {}
+        for line in (await self.client.get("/metrics")).text.splitlines():
+            if line and not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                samples[name] = float(value)
+        return samples
+
+    @staticmethod
+    def counters(before: dict, after: dict) -> dict:
+        """Argon2 verifies, profile cache effect and idempotent replays between two scrapes"""
+        def delta(name):
+            return int(after.get(name, 0) - before.get(name, 0))
+        hits = delta('cache_hits_total{cache="profile"}')
+        lookups = hits + delta('cache_misses_total{cache="profile"}')
+        return {
+            "argon2_verifies": delta('argon2_seconds_count{op="verify"}'),
+            "profile_hit_rate": round(hits / lookups, 3) if lookups else None,
+            # Every lookup used to be its own query; misses now share one per request
+            "profile_queries_saved": lookups - delta("profile_cache_fallback_queries_total"),
+            "idempotent_replays": delta('idempotency_requests_total{outcome="replayed"}'),
+        }
+
+    async def refresh(self, w: int) -> httpx.Response:
+        response = await self.client.post(f"{API}/auth/refresh", json={"refresh_token": self.refresh_tokens[w]})
+        if response.status_code == 200:
+            self.refresh_tokens[w] = response.json()["refresh_token"]
+        return response
+
+    async def run(self, scenario: str, total: int, concurrency: int) -> dict:
+        samples: list[float] = []
+        errors = 0
+        remaining = iter(range(total))
+
+        async def timed(call) -> httpx.Response | None:
+            nonlocal errors
+            start = time.perf_counter()
+            try:
+                response = await call
+            except httpx.HTTPError:
+                response = None
+            samples.append(time.perf_counter() - start)
+            if response is None or response.status_code >= 400:
+                errors += 1
+            return response
+
+        async def worker(w: int):
+            headers = self.tokens[w % len(self.tokens)]
+            owned: list[int] = []
+            rng = random.Random(w)
+            sent = 0
+            for _ in remaining:
+                if scenario == "register":
+                    await timed(self.register(f"user{next(self.ids)}-{os.getpid()}@bench.example.com"))
+                elif scenario == "login":
+                    await timed(self.login(f"seed{w % len(self.tokens)}@bench.example.com"))
+                elif scenario == "refresh":
+                    await timed(self.refresh(w % len(self.tokens)))
+                elif scenario == "me":
+                    await timed(self.client.get(f"{API}/users/me", headers=headers))
+                elif scenario == "profiles":
+                    ids = rng.sample(self.user_ids, min(PROFILE_BATCH, len(self.user_ids)))
+                    await timed(self.client.get(f"{API}/users?ids={','.join(map(str, ids))}", headers=headers))
+                elif scenario == "retries":
+                    key = f"{concurrency}-{w}-{sent // RETRY_ATTEMPTS}"
+                    sent += 1
+                    await timed(self.client.post(
+                        f"{API}/items/", json={"title": f"retry {w}"}, headers={**headers, "Idempotency-Key": key}
+                    ))
+                else:
+                    roll = rng.random()
+                    if roll < 0.2 or not owned:
+                        response = await timed(self.client.post(
+                            f"{API}/items/", json={"title": f"load {w}", "description": "bench"}, headers=headers
+                        ))
+                        if response is not None and response.status_code == 201:
+                            owned.append(response.json()["id"])
+                    elif roll < 0.7:
+                        await timed(self.client.get(f"{API}/items/?limit=50", headers=headers))
+                    elif roll < 0.9:
+                        await timed(self.client.put(
+                            f"{API}/items/{rng.choice(owned)}", json={"title": "updated"}, headers=headers
+                        ))
+                    else:
+                        await timed(self.client.delete(f"{API}/items/{owned.pop()}", headers=headers))
+
+        before = await self.scrape()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(w) for w in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        counters = self.counters(before, await self.scrape())
+        return summarize(scenario, concurrency, samples, errors, elapsed, counters)
+
+
+async def run_all(client: httpx.AsyncClient, args) -> list[dict]:
+    runner = Runner(client)
+    await runner.seed(max(args.concurrency))
+    results = []
+    for scenario in args.scenarios:
+        for concurrency in args.concurrency:
+            result = await runner.run(scenario, args.requests, concurrency)
+            print(
+                f"{scenario:<9} {concurrency:>4}  {result['rps']:>8.1f}  {result['errors']:>6}  "
+                f"{result['p50_ms']:>8.2f}  {result['p95_ms']:>8.2f}  {result['p99_ms']:>8.2f}  "
+                f"{result['argon2_verifies']:>7}"
+                + (f"  profile hit rate {result['profile_hit_rate']:.1%}, {result['profile_queries_saved']} queries saved"
+                   if scenario == "profiles" and result["profile_hit_rate"] is not None else "")
+                + (f"  {result['idempotent_replays']} replayed" if scenario == "retries" else ""),
+                flush=True,
+            )
+            results.append(result)
+    return results
+
+
+async def run_asgi(args) -> list[dict]:
+    # Settings are read at import time, so the app is imported only after
+    # DATABASE_URL points at this run's database
+    from main import app
+    from core.database import async_engine, engine, read_engines
+    from core.group_commit import group_writer
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_all(client, args)
+    finally:
+        # httpx does not run the lifespan, so shut down what it would
+        await group_writer.close()
+        for async_db_engine in (async_engine, *read_engines):
+            await async_db_engine.dispose()
+        engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def uvicorn_server(env: dict):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{url}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+async def run_uvicorn(args, url: str) -> list[dict]:
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        return await run_all(client, args)
+
+
+def command_run(args) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'load.db')}",
+            "AUTH_ADMISSION_ENABLED": "true" if args.admission else "false",
+        }
+        subprocess.run([sys.executable, "manage.py", "migrate"], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        print(f"{'scenario':<9} {'conc':>4}  {'rps':>8}  {'errors':>6}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'argon2':>7}")
+        if args.target == "asgi":
+            os.environ.update(env)
+            results = asyncio.run(run_asgi(args))
+        else:
+            with uvicorn_server(env) as url:
+                results = asyncio.run(run_uvicorn(args, url))
+
+    report = {
+        "meta": {
+            "target": args.target,
+            "requests": args.requests,
+            "admission": args.admission,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Describe every scenario that regressed by more than ``threshold`` (a fraction)"""
+    base = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        key = (result["scenario"], result["concurrency"])
+        before = base.get(key)
+        if before is None:
+            continue
+        name = f"{key[0]}@{key[1]}"
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']} ms -> {result['p95_ms']} ms")
+        if result["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{name}: rps {before['rps']} -> {result['rps']}")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def command_compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No scenario regressed by more than {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the scenarios and record results")
+    run.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    run.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    run.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    run.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    run.add_argument("--output", help="write results as JSON to this file")
+    run.add_argument("--admission", action="store_true", help="keep auth admission control enabled")
+    run.set_defaults(handler=command_run)
+
+    check = commands.add_parser("compare", help="fail if results regressed against a baseline")
+    check.add_argument("baseline")
+    check.add_argument("current")
+    check.add_argument("--threshold", type=float, default=0.15, help="allowed regression as a fraction")
+    check.set_defaults(handler=command_compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Admission control for the Argon2-backed auth endpoints
+
+Every login or registration costs an Argon2 operation, so a burst of them
+can take the CPU from everything else. Before any hashing starts, the auth
+router's dependency checks three things:
+
+  - a global cap on auth requests in flight;
+  - a token bucket per client address;
+  - a token bucket per account (the login username or registration email).
+
+Item traffic never passes through here. Together with the hashing pool
+leaving a core free, this keeps authenticated item requests responsive
+during a login storm. Rejections are 429 with Retry-After.
+
+Buckets live in HashedTokenBuckets: fixed arrays indexed by a hash of the
+key. Memory and time per check are constant however many distinct clients
+or accounts show up. Two keys that share a slot share a bucket, which can
+only make limiting stricter, never looser.
+"""
+import math
+import time
+from array import array
+
+from fastapi import HTTPException, Request, status
+
+from core import metrics
+from core.config import settings
+
+
+class HashedTokenBuckets:
+    """
+    Token buckets for an unbounded key space in a fixed number of slots
+
+    A slot stores its token count and last refill time. An untouched slot
+    reads as full because its stamp (0) is far in the past.
+    """
+
+    def __init__(self, slots: int, rate: float, burst: float, clock=time.monotonic):
+        self.slots = slots
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = array("d", bytes(8 * slots))
+        self._stamps = array("d", bytes(8 * slots))
+
+    def take(self, key: str) -> float:
+        """Consume one token for ``key``; return 0 if admitted, else seconds until a token is due"""
+        slot = hash(key) % self.slots
+        now = self._clock()
+        tokens = min(self.burst, self._tokens[slot] + (now - self._stamps[slot]) * self.rate)
+        self._stamps[slot] = now
+        if tokens >= 1:
+            self._tokens[slot] = tokens - 1
+            return 0.0
+        self._tokens[slot] = tokens
+        return (1 - tokens) / self.rate if self.rate > 0 else math.inf
+
+    def clear(self):
+        self._tokens = array("d", bytes(8 * self.slots))
+        self._stamps = array("d", bytes(8 * self.slots))
+
+
+class AuthAdmission:
+    """Concurrency cap plus per-client and per-account buckets for auth requests"""
+
+    def __init__(self, clients: HashedTokenBuckets, accounts: HashedTokenBuckets, max_concurrent: int,
+                 retry_after: int = 1, enabled: bool = True):
+        self.clients = clients
+        self.accounts = accounts
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.enabled = enabled
+        self.in_flight = 0
+
+    @classmethod
+    def from_settings(cls, config=settings) -> "AuthAdmission":
+        return cls(
+            clients=HashedTokenBuckets(
+                config.AUTH_ADMISSION_SLOTS, config.AUTH_CLIENT_RATE_PER_MINUTE / 60, config.AUTH_CLIENT_BURST
+            ),
+            accounts=HashedTokenBuckets(
+                config.AUTH_ADMISSION_SLOTS, config.AUTH_ACCOUNT_RATE_PER_MINUTE / 60, config.AUTH_ACCOUNT_BURST
+            ),
+            max_concurrent=config.AUTH_MAX_CONCURRENT,
+            retry_after=config.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+            enabled=config.AUTH_ADMISSION_ENABLED,
+        )
+
+    def reject(self, reason: str, retry_after: float) -> HTTPException:
+        metrics.auth_rejected.inc((reason,))
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication attempts, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(min(retry_after, 86_400))))},
+        )
+
+    def admit(self, client: str | None, account: str | None):
+        """
+        Raises:
+            HTTPException: 429 if any limit is exhausted
+        """
+        if self.in_flight >= self.max_concurrent:
+            raise self.reject("concurrency", self.retry_after)
+        if client is not None:
+            wait = self.clients.take(client)
+            if wait:
+                raise self.reject("client", wait)
+        if account is not None:
+            wait = self.accounts.take(account.strip().lower())
+            if wait:
+                raise self.reject("account", wait)
+
+    def reset(self):
+        self.clients.clear()
+        self.accounts.clear()
+        self.in_flight = 0
+
+
+auth_admission = AuthAdmission.from_settings()
+
+
+async def _account(request: Request) -> str | None:
+    """Login username or registration email; FastAPI has already read the body"""
+    try:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            body = await request.json()
+            account = body.get("email") if isinstance(body, dict) else None
+        else:
+            account = (await request.form()).get("username")
+    except Exception:
+        return None
+    return account if isinstance(account, str) and account else None
+
+
+async def admit_auth_request(request: Request):
+    """Router dependency: admit the request or answer 429, and count it while in flight"""
+    if not auth_admission.enabled:
+        yield
+        return
+    client = request.client.host if request.client else None
+    auth_admission.admit(client, await _account(request))
+    auth_admission.in_flight += 1
+    try:
+        yield
+    finally:
+        auth_admission.in_flight -= 1
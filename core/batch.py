@@ -0,0 +1,19 @@
+"""
+Request-size checks shared by the batch and bulk endpoints
+"""
+from fastapi import HTTPException, status
+
+def parse_ids(ids: str) -> list[int]:
+    """Parse a comma-separated id list"""
+    try:
+        return [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+
+def check_batch_size(size: int, limit: int):
+    """Reject a batch of more than ``limit`` elements with 413"""
+    if size > limit:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Batch size {size} exceeds maximum of {limit}"
+        )
@@ -0,0 +1,65 @@
+"""
+Argon2 cost calibration
+
+Picks the Argon2 time and memory cost that bring one hash (a verify costs
+the same) close to a target latency on the current host. Memory is the
+costlier resource for an attacker, so it is kept as high as the ceiling
+allows and only halved if even one pass is too slow; the time cost then
+grows while the latency stays within the target.
+
+``python manage.py calibrate`` runs this and writes the result to the
+PASSWORD_HASH_* settings. Hashes made with older parameters keep verifying
+and are upgraded on the user's next successful login.
+"""
+import statistics
+import time
+from dataclasses import dataclass
+
+# Argon2 needs at least 8 KiB per lane; below 1 MiB the hash is not worth having
+MIN_MEMORY_KIB = 1024
+MAX_TIME_COST = 10
+
+
+@dataclass(frozen=True)
+class HashParameters:
+    time_cost: int
+    memory_cost: int  # KiB
+    parallelism: int
+    seconds: float = 0.0
+
+    def as_settings(self) -> dict[str, str]:
+        return {
+            "PASSWORD_HASH_TIME_COST": str(self.time_cost),
+            "PASSWORD_HASH_MEMORY_COST": str(self.memory_cost),
+            "PASSWORD_HASH_PARALLELISM": str(self.parallelism),
+        }
+
+
+def measure(time_cost: int, memory_cost: int, parallelism: int, rounds: int = 3) -> float:
+    """Median seconds of one Argon2id hash with these parameters"""
+    from argon2 import PasswordHasher
+
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.hash("calibration password")
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def calibrate(target_seconds: float, max_memory_kib: int, parallelism: int, measure=measure) -> HashParameters:
+    """The strongest parameters whose measured latency stays within ``target_seconds``"""
+    memory = max(max_memory_kib, MIN_MEMORY_KIB)
+    seconds = measure(1, memory, parallelism)
+    while seconds > target_seconds and memory // 2 >= MIN_MEMORY_KIB:
+        memory //= 2
+        seconds = measure(1, memory, parallelism)
+
+    time_cost = 1
+    while time_cost < MAX_TIME_COST:
+        slower = measure(time_cost + 1, memory, parallelism)
+        if slower > target_seconds:
+            break
+        time_cost, seconds = time_cost + 1, slower
+    return HashParameters(time_cost, memory, parallelism, seconds)
@@ -1,3 +1,5 @@
+from typing import Literal
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
@@ -9,6 +11,118 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "lUcnpGjCznUAIEaIjztCNw")
     API_V1_STR: str = "/api/v1"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens (POST /auth/refresh) rotate on every use; this is the
+    # lifetime of each one, so an idle client must log in again after it
+    REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=30, ge=1)
+    # Used tokens are kept this long so a replay still revokes the family;
+    # `python manage.py sweep-refresh-tokens` deletes them afterwards
+    REFRESH_TOKEN_REUSE_DETECTION_DAYS: int = Field(default=7, ge=0)
+
+    # Startup refuses to serve a database whose schema fingerprint does not
+    # match the models (run `python manage.py migrate`)
+    SCHEMA_CHECK_ON_STARTUP: bool = True
+    # Run the additive migrations at startup instead (local development)
+    DB_AUTO_MIGRATE: bool = False
+
+    # Read-only engines (replica URLs) serving GET/HEAD/OPTIONS requests
+    DATABASE_READ_URLS: list[str] = Field(default_factory=list)
+    # Also open the primary SQLite file read-only (mode=ro) as a read engine
+    SQLITE_READ_ONLY_REPLICA: bool = False
+    # After a write, reads by the same caller stay on the primary this long
+    READ_YOUR_WRITES_SECONDS: float = Field(default=5, ge=0)
+    READ_YOUR_WRITES_CACHE_SIZE: int = Field(default=10_000, ge=0)
+
+    # Log every SQL statement through SQLAlchemy's engine echo (development only)
+    SQL_ECHO: bool = False
+    # Warn when one statement shape runs more than this many times in a request
+    SQL_N_PLUS_ONE_THRESHOLD: int = Field(default=10, ge=1)
+
+    # SQLite pragmas: a named profile from core.storage.PROFILES, plus optional
+    # per-pragma overrides (None keeps the profile's value)
+    SQLITE_PROFILE: Literal["compat", "wal", "wal_mmap"] = "wal"
+    SQLITE_JOURNAL_MODE: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] | None = None
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] | None = None
+    SQLITE_BUSY_TIMEOUT_MS: int | None = Field(default=None, ge=0)
+    # Negative: KiB; positive: pages
+    SQLITE_CACHE_SIZE: int | None = None
+    SQLITE_MMAP_SIZE: int | None = Field(default=None, ge=0)
+    SQLITE_TEMP_STORE: Literal["DEFAULT", "FILE", "MEMORY"] | None = None
+
+    # Connection pool of both engines (ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = Field(default=5, ge=1)
+    DB_MAX_OVERFLOW: int = Field(default=10, ge=0)
+    DB_POOL_TIMEOUT_SECONDS: float = Field(default=30, gt=0)
+    # Close connections older than this; -1 never recycles
+    DB_POOL_RECYCLE_SECONDS: int = Field(default=-1, ge=-1)
+    DB_POOL_PRE_PING: bool = False
+
+    # Group commit (core.group_commit): item writes arriving within the delay are
+    # committed together, up to the batch size, each in its own savepoint
+    GROUP_COMMIT_ENABLED: bool = False
+    GROUP_COMMIT_MAX_DELAY_MS: float = Field(default=2, ge=0)
+    GROUP_COMMIT_MAX_BATCH: int = Field(default=64, ge=1)
+
+    # Idempotency-Key on item writes (core.idempotency): the first response is
+    # kept this long and replayed to retries with the same key
+    IDEMPOTENCY_TTL_SECONDS: int = Field(default=24 * 3600, ge=1)
+    # A claim whose request never finished (crashed worker) is released after this
+    IDEMPOTENCY_LOCK_SECONDS: int = Field(default=60, ge=1)
+    # Larger responses are not kept; their key is released for another try
+    IDEMPOTENCY_MAX_RESPONSE_BYTES: int = Field(default=256 * 1024, ge=0)
+    # Stored responses delete up to IDEMPOTENCY_SWEEP_BATCH expired rows this often,
+    # so storage stays bounded without `python manage.py sweep-idempotency`
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS: float = Field(default=300, ge=0)
+    IDEMPOTENCY_SWEEP_BATCH: int = Field(default=1000, ge=1)
+
+    # Pre-fork server (python manage.py serve): worker processes and how long
+    # each may take to finish in-flight requests after SIGTERM
+    SERVER_WORKERS: int = Field(default=os.cpu_count() or 1, ge=1)
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: float = Field(default=30, ge=0)
+
+    # Argon2 worker pool: "thread" or "process" executor
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    # One core is left to request handling so item traffic is not starved
+    PASSWORD_HASH_WORKERS: int = Field(default=max(1, min(4, (os.cpu_count() or 1) - 1)), ge=1)
+    # Hash jobs allowed to wait for a worker before new ones are rejected with 503
+    PASSWORD_HASH_QUEUE_SIZE: int = Field(default=32, ge=0)
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = Field(default=1, ge=1)
+    # Argon2id cost; `python manage.py calibrate` sets these for the host.
+    # Defaults are argon2-cffi's. Older hashes are upgraded on login.
+    PASSWORD_HASH_TIME_COST: int = Field(default=3, ge=1)
+    PASSWORD_HASH_MEMORY_COST: int = Field(default=65536, ge=8)  # KiB
+    PASSWORD_HASH_PARALLELISM: int = Field(default=4, ge=1)
+
+    # Admission control on /auth (core.admission): auth requests in flight,
+    # then token buckets per client address and per account. Buckets live in
+    # AUTH_ADMISSION_SLOTS hashed slots (16 bytes each) however many keys appear.
+    AUTH_ADMISSION_ENABLED: bool = True
+    AUTH_MAX_CONCURRENT: int = Field(default=16, ge=1)
+    AUTH_CLIENT_BURST: int = Field(default=20, ge=1)
+    AUTH_CLIENT_RATE_PER_MINUTE: float = Field(default=60, gt=0)
+    AUTH_ACCOUNT_BURST: int = Field(default=5, ge=1)
+    AUTH_ACCOUNT_RATE_PER_MINUTE: float = Field(default=10, gt=0)
+    AUTH_ADMISSION_SLOTS: int = Field(default=1 << 18, ge=1)
+
+    # Authenticated-user cache in get_current_user (TTL is capped by token exp).
+    # Per process: after a delete, other workers may still accept the user's
+    # token until the TTL runs out; 0 disables the cache.
+    PRINCIPAL_CACHE_SIZE: int = Field(default=10_000, ge=0)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = Field(default=60, ge=0)
+    # Public user profiles (GET /users) keyed by id. Writes through this process
+    # update it at once; other workers may serve a stale profile up to the TTL.
+    PROFILE_CACHE_SIZE: int = Field(default=50_000, ge=0)
+    PROFILE_CACHE_TTL_SECONDS: int = Field(default=60, ge=0)
+    # Maximum number of ids accepted by GET /users?ids=
+    USERS_BATCH_MAX_IDS: int = Field(default=100, ge=1)
+    # Verified JWT claims keyed by token digest; entries expire at the token's exp.
+    # An entry is a 32-byte digest plus the small claims dict (well under 1 KiB),
+    # so the entry cap is also the memory cap.
+    TOKEN_CACHE_SIZE: int = Field(default=50_000, ge=0)
+
+    # Maximum number of elements accepted by the /items/bulk endpoints
+    ITEMS_BULK_MAX_BATCH: int = Field(default=500, ge=1)
+    # Rows fetched per round trip by the streaming /items/export endpoint
+    ITEMS_EXPORT_BATCH_SIZE: int = Field(default=1000, ge=1)
     
     class Config:
         env_file = ".env"
@@ -1,9 +1,81 @@
+import hashlib
+import itertools
+import os
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from .cache import TTLCache
 from .config import settings
+from .storage import apply_storage_profile, is_memory, is_sqlite, pool_options, read_only_url
 
-engine = create_engine(settings.DATABASE_URL, echo=True)
+# Async drivers used for the async engine, keyed by the sync URL's backend.
+# Only drivers listed in requirements.txt belong here.
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Return the async-driver variant of a database URL"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or url.get_driver_name() == driver:
+        return url.render_as_string(hide_password=False)
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+# Sync engine: schema management (manage.py migrate/check, via core.schema),
+# the other manage.py commands and sync callers of get_db
+engine = create_engine(settings.DATABASE_URL, echo=settings.SQL_ECHO, **pool_options(settings.DATABASE_URL))
+apply_storage_profile(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine: used by the request handlers through get_async_db
+async_engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL), echo=settings.SQL_ECHO, **pool_options(settings.DATABASE_URL)
+)
+apply_storage_profile(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def read_urls(config=settings) -> list[str]:
+    urls = list(config.DATABASE_READ_URLS)
+    url = config.DATABASE_URL
+    if config.SQLITE_READ_ONLY_REPLICA and is_sqlite(url) and not is_memory(url):
+        urls.append(read_only_url(url))
+    return urls
+
+# Read engines: safe-method requests are spread over these round-robin.
+# With none configured every request uses the primary async_engine.
+read_engines = [
+    create_async_engine(to_async_url(url), echo=settings.SQL_ECHO, **pool_options(url))
+    for url in read_urls()
+]
+for read_engine in read_engines:
+    apply_storage_profile(read_engine.sync_engine, read_only=True)
+ReadSessionLocals = [
+    async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False)
+    for read_engine in read_engines
+]
+_next_read_session = itertools.cycle(ReadSessionLocals).__next__ if ReadSessionLocals else None
+
+def _reset_pools_after_fork():
+    """
+    Give a forked child fresh, empty pools
+
+    close=False leaves the parent's connections alone (closing them from
+    the child would break the parent); the child just stops referencing them.
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for read_engine in read_engines:
+        read_engine.sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Digests of Authorization headers that wrote within READ_YOUR_WRITES_SECONDS
+recent_writers = TTLCache(max_size=settings.READ_YOUR_WRITES_CACHE_SIZE, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
 Base = declarative_base()
 
 # Dependency
@@ -12,4 +84,28 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def session_factory(method: str, authorization: str | None) -> async_sessionmaker:
+    """
+    Pick the primary or a read engine for a request
+
+    Writes go to the primary and open a read-your-writes window for the
+    caller (identified by a digest of its Authorization header), so their
+    next reads do not race replica lag. Anonymous reads always use a
+    read engine.
+    """
+    if _next_read_session is None:
+        return AsyncSessionLocal
+    caller = hashlib.sha256(authorization.encode()).digest() if authorization else None
+    if method not in SAFE_METHODS:
+        if caller is not None:
+            recent_writers.set(caller, True)
+        return AsyncSessionLocal
+    if caller is not None and recent_writers.get(caller):
+        return AsyncSessionLocal
+    return _next_read_session()
+
+async def get_async_db(request: Request):
+    async with session_factory(request.method, request.headers.get("authorization"))() as db:
+        yield db
@@ -0,0 +1,31 @@
+"""
+Entity tags and conditional request helpers (RFC 9110)
+"""
+import hashlib
+
+def make_etag(kind: str, *parts) -> str:
+    """Strong ETag built from a resource kind and its version components"""
+    return '"' + "-".join([kind, *map(str, parts)]) + '"'
+
+def make_list_etag(kind: str, versions) -> str:
+    """Strong ETag for a list, from its (id, version) pairs in order"""
+    digest = hashlib.blake2b(digest_size=12)
+    for item_id, version in versions:
+        digest.update(f"{item_id}:{version},".encode())
+    return make_etag(kind, digest.hexdigest())
+
+def _tags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """True when an If-None-Match header matches ``etag`` (weak comparison)"""
+    if not header:
+        return False
+    strip_weak = lambda tag: tag[2:] if tag.startswith("W/") else tag
+    return any(tag == "*" or strip_weak(tag) == etag for tag in _tags(header))
+
+def if_match(header: str | None, etag: str) -> bool:
+    """True when an If-Match header is absent or matches ``etag`` (strong comparison)"""
+    if header is None:
+        return True
+    return any(tag == "*" or tag == etag for tag in _tags(header))
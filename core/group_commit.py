@@ -0,0 +1,186 @@
+"""
+Group commit for item writes (opt-in with GROUP_COMMIT_ENABLED)
+
+With SQLite every commit pays for a sync and holds the single writer lock,
+so one commit per request caps write throughput at the disk's sync rate.
+When group commit is on, write handlers hand their work to the writer as
+an ``async def op(session)``. The writer collects the ops that arrive
+within GROUP_COMMIT_MAX_DELAY_MS, up to GROUP_COMMIT_MAX_BATCH, and runs
+them in one transaction, each inside its own SAVEPOINT. An op that raises
+rolls back only its savepoint and gets its exception back. Every op is
+acknowledged only after the shared COMMIT returns; if that commit fails,
+every op in the batch fails with it.
+
+The writer has its own engine. On SQLite it replaces pysqlite's implicit
+transactions with an explicit BEGIN IMMEDIATE, which SAVEPOINT needs to
+nest correctly and which takes the write lock once per batch.
+"""
+import asyncio
+import contextvars
+import os
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from . import metrics
+from .config import settings
+from .database import to_async_url
+from .storage import apply_storage_profile, pool_options
+
+
+def enable_savepoints(engine):
+    """Take transaction control from pysqlite so SAVEPOINT nests inside a real transaction"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def disable_implicit_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class GroupCommitWriter:
+    """Runs submitted write ops in shared transactions from one background task"""
+
+    def __init__(self, session_factory=None, max_delay: float = 0.002, max_batch: int = 64):
+        self.session_factory = session_factory
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._engine = None
+        self._queue: asyncio.Queue | None = None
+        self._op_arrived: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._loop = None
+
+    @classmethod
+    def from_settings(cls, config=settings) -> "GroupCommitWriter":
+        return cls(max_delay=config.GROUP_COMMIT_MAX_DELAY_MS / 1000, max_batch=config.GROUP_COMMIT_MAX_BATCH)
+
+    def _session_factory(self):
+        if self.session_factory is None:
+            url = settings.DATABASE_URL
+            self._engine = create_async_engine(to_async_url(url), echo=settings.SQL_ECHO, **pool_options(url))
+            apply_storage_profile(self._engine.sync_engine)
+            enable_savepoints(self._engine.sync_engine)
+            self.session_factory = async_sessionmaker(self._engine, autoflush=False, expire_on_commit=False)
+        return self.session_factory
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._loop is not loop or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._op_arrived = asyncio.Event()
+            # A fresh context: copying the first submitter's would attribute every
+            # later batch's statements to that request's SQL instrumentation
+            self._task = loop.create_task(self._run(), name="group-commit", context=contextvars.Context())
+
+    async def submit(self, op):
+        """Run ``await op(session)`` in the next batch; returns its result once the batch has committed"""
+        self._start()
+        future = self._loop.create_future()
+        self._queue.put_nowait((op, future))
+        self._op_arrived.set()
+        return await future
+
+    async def _collect(self) -> list | None:
+        """The next batch; None once close() has asked the writer to stop"""
+        first = await self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = self._loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wait_for_op(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            op = self._queue.get_nowait()
+            if op is None:
+                # Commit what was collected, then stop
+                self._queue.put_nowait(None)
+                break
+            batch.append(op)
+        return batch
+
+    async def _wait_for_op(self):
+        # Waits without dequeuing, so a timeout never loses an op
+        while self._queue.empty():
+            self._op_arrived.clear()
+            await self._op_arrived.wait()
+
+    async def _run(self):
+        while (batch := await self._collect()) is not None:
+            await self._commit(batch)
+
+    async def _commit(self, batch: list):
+        # Callers that gave up before their turn are skipped, not applied
+        batch = [(op, future) for op, future in batch if not future.done()]
+        if not batch:
+            return
+        metrics.group_commit_batch_size.observe(len(batch))
+        outcomes = []
+        try:
+            async with self._session_factory()() as session:
+                async with session.begin():
+                    for op, future in batch:
+                        try:
+                            async with session.begin_nested():
+                                outcomes.append((True, await op(session)))
+                        except Exception as exc:
+                            outcomes.append((False, exc))
+        except Exception as exc:
+            outcomes = [(False, exc if ok else value) for ok, value in outcomes]
+            outcomes += [(False, exc)] * (len(batch) - len(outcomes))
+
+        for (op, future), (ok, value) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    async def close(self):
+        """Commit the ops already queued, then stop the background task"""
+        if self._task is not None and self._loop is asyncio.get_running_loop() and not self._task.done():
+            self._queue.put_nowait(None)
+            self._op_arrived.set()
+            await self._task
+        self._task = None
+        if self._engine is not None:
+            await self._engine.dispose()
+
+    def reset_after_fork(self):
+        """The child inherits neither the background task nor usable connections"""
+        self._task = None
+        self._queue = None
+        self._op_arrived = None
+        self._loop = None
+        if self._engine is not None:
+            self._engine.sync_engine.dispose(close=False)
+
+
+group_writer = GroupCommitWriter.from_settings()
+os.register_at_fork(after_in_child=group_writer.reset_after_fork)
+
+
+async def run_write(db: AsyncSession, op):
+    """
+    Run ``await op(session)`` and commit it
+
+    Through the group-commit writer when GROUP_COMMIT_ENABLED is set,
+    otherwise on the request's own session with its own commit.
+    """
+    if settings.GROUP_COMMIT_ENABLED:
+        return await group_writer.submit(op)
+    result = await op(db)
+    await db.commit()
+    return result
@@ -0,0 +1,160 @@
+"""
+Bounded worker pool for Argon2 hashing and verification
+
+Argon2 is CPU-bound by design. Running it on the event loop stalls every
+other request, and handing it to the shared threadpool lets a login storm
+take every slot. The pool runs it on a dedicated executor and admits at
+most ``workers + max_queue`` jobs; anything beyond that is rejected
+immediately so callers can answer 503 instead of piling up.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from core.config import settings
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the hashing pool already holds its maximum number of jobs"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+def _timed(fn, *args):
+    """Run ``fn`` in the worker and return ``(result, seconds)``"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class _Timing:
+    """Running totals for one kind of job"""
+
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "last_ms": round(self.last * 1000, 3),
+        }
+
+
+class HashingPool:
+    """
+    Executor wrapper with a bounded queue for password hashing work
+
+    All bookkeeping happens on the event loop thread, so the counters need
+    no locking. The executor is created on first use, which keeps it out
+    of processes that import this module but never hash (and out of the
+    parent of a pre-forked server).
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 1, max_queue: int = 0, retry_after: int = 1):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor: Executor | None = None
+        self._pending = 0
+        self.rejected = 0
+        self.timings: dict[str, _Timing] = {}
+
+    @classmethod
+    def from_settings(cls, config=settings) -> "HashingPool":
+        return cls(
+            kind=config.PASSWORD_HASH_EXECUTOR,
+            workers=config.PASSWORD_HASH_WORKERS,
+            max_queue=config.PASSWORD_HASH_QUEUE_SIZE,
+            retry_after=config.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        return self._pending
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs admitted but still waiting for a free worker"""
+        return max(0, self._pending - self.workers)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="argon2")
+        return self._executor
+
+    async def run(self, label: str, fn, *args):
+        """
+        Run ``fn(*args)`` on the pool
+
+        Raises:
+            PoolSaturatedError: if the pool already holds ``capacity`` jobs
+        """
+        if self._pending >= self.capacity:
+            self.rejected += 1
+            raise PoolSaturatedError(self.retry_after)
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, seconds = await loop.run_in_executor(self._get_executor(), _timed, fn, *args)
+        finally:
+            self._pending -= 1
+
+        timing = self.timings.get(label)
+        if timing is None:
+            timing = self.timings[label] = _Timing()
+        timing.observe(seconds)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "timings": {label: timing.as_dict() for label, timing in self.timings.items()},
+        }
+
+    def reset_after_fork(self):
+        """A forked child inherits the executor object but none of its workers"""
+        self._executor = None
+        self._pending = 0
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+hashing_pool = HashingPool.from_settings()
+os.register_at_fork(after_in_child=hashing_pool.reset_after_fork)
@@ -0,0 +1,302 @@
+"""
+Idempotency-Key support for item writes
+
+A client that may retry a write (flaky mobile networks) sends the same
+``Idempotency-Key`` header with every attempt. The first attempt claims
+the key in ``idempotency_keys`` and runs normally; its response is stored
+there and every retry gets that response back, marked with
+``Idempotent-Replayed: true``, without running the endpoint again.
+
+- Keys are scoped to the token subject, so two users never collide.
+- A key reused with a different method, path or body is answered 422.
+- Duplicates arriving while the first attempt runs in this process wait
+  for it and share its response; a duplicate in another worker finds the
+  pending claim and gets 409 with Retry-After.
+- 5xx responses and responses over IDEMPOTENCY_MAX_RESPONSE_BYTES are not
+  kept: the key is released so the client can try again.
+- Stored responses expire after IDEMPOTENCY_TTL_SECONDS. Expired rows are
+  deleted in small batches as new responses are stored, and in full by
+  ``python manage.py sweep-idempotency``.
+
+Requests without the header, or without a valid bearer token, pass
+through untouched.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from . import metrics
+from .config import settings
+from .database import AsyncSessionLocal
+from .security import decode_access_token
+from models.idempotency_key import IdempotencyKey
+
+HEADER = "idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+# Response headers stored with the body; content-length is recomputed on replay
+REPLAYED_HEADERS = frozenset({b"content-type", b"etag", b"location"})
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: bytes
+    status_code: int | None  # None: the first attempt is still running
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+def _digest(*parts: bytes) -> bytes:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.digest()
+
+
+def _expired_batch(now: datetime, limit: int):
+    expired = select(IdempotencyKey.key_hash).where(IdempotencyKey.expires_at <= now).limit(limit)
+    return delete(IdempotencyKey).where(IdempotencyKey.key_hash.in_(expired.scalar_subquery()))
+
+
+def sweep(conn, batch_size: int | None = None) -> int:
+    """
+    Delete every expired key on a sync Connection, ``batch_size`` rows per statement
+
+    Returns the number of rows deleted. Run it inside a transaction.
+    """
+    batch_size = batch_size or settings.IDEMPOTENCY_SWEEP_BATCH
+    now = datetime.utcnow()
+    deleted = 0
+    while True:
+        count = conn.execute(_expired_batch(now, batch_size)).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+class IdempotencyStore:
+    """Claims, stores and releases keys in ``idempotency_keys``, one short transaction each"""
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self._last_sweep = time.monotonic()
+
+    async def _get(self, session, key_hash: bytes) -> StoredResponse | None:
+        row = (await session.execute(
+            select(
+                IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.headers,
+                IdempotencyKey.body, IdempotencyKey.expires_at,
+            ).where(IdempotencyKey.key_hash == key_hash)
+        )).first()
+        if row is None or row.expires_at <= datetime.utcnow():
+            return None
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(row.headers or "[]")]
+        return StoredResponse(row.fingerprint, row.status_code, headers, row.body or b"")
+
+    async def claim(self, key_hash: bytes, fingerprint: bytes) -> StoredResponse | None:
+        """None if the key is now ours to execute, else what is stored under it (maybe still pending)"""
+        async with self.session_factory() as session:
+            stored = await self._get(session, key_hash)
+            if stored is not None:
+                return stored
+            now = datetime.utcnow()
+            try:
+                # An expired row under this key is replaced, not kept
+                await session.execute(delete(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash))
+                await session.execute(insert(IdempotencyKey).values(
+                    key_hash=key_hash,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                ))
+                await session.commit()
+            except IntegrityError:
+                # Another worker claimed it first
+                await session.rollback()
+                return await self._get(session, key_hash) or StoredResponse(fingerprint, None, [], b"")
+            return None
+
+    async def complete(self, key_hash: bytes, response: StoredResponse):
+        async with self.session_factory() as session:
+            now = datetime.utcnow()
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key_hash == key_hash)
+                .values(
+                    status_code=response.status_code,
+                    headers=json.dumps([[name.decode("latin-1"), value.decode("latin-1")] for name, value in response.headers]),
+                    body=response.body,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+                )
+            )
+            if time.monotonic() - self._last_sweep >= settings.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS:
+                self._last_sweep = time.monotonic()
+                await session.execute(_expired_batch(now, settings.IDEMPOTENCY_SWEEP_BATCH))
+            await session.commit()
+
+    async def release(self, key_hash: bytes):
+        """Drop a pending claim so the client's next attempt executes"""
+        async with self.session_factory() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status_code.is_(None))
+            )
+            await session.commit()
+
+
+idempotency_store = IdempotencyStore()
+
+
+def _subject(authorization: str | None) -> str | None:
+    """The bearer token's subject, or None if there is no valid token"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token).get("sub")
+    except Exception:
+        return None
+
+
+def _error(status_code: int, detail: str, headers: dict | None = None) -> JSONResponse:
+    return JSONResponse({"detail": detail, "status_code": status_code}, status_code=status_code, headers=headers)
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware applying Idempotency-Key to writes under ``prefixes``, except ``exclude``"""
+
+    def __init__(self, app, prefixes: tuple[str, ...], exclude: tuple[str, ...] = (), store: IdempotencyStore | None = None):
+        self.app = app
+        self.prefixes = prefixes
+        self.exclude = frozenset(exclude)
+        self._store = store
+        # key hash -> future of the stored response (None if it was not kept)
+        self._in_flight: dict[bytes, asyncio.Future] = {}
+
+    @property
+    def store(self) -> IdempotencyStore:
+        return self._store or idempotency_store
+
+    def _covers(self, scope) -> bool:
+        path = scope["path"].rstrip("/")
+        return (
+            scope["method"] in MUTATING_METHODS
+            and path not in self.exclude
+            and any(path == prefix or path.startswith(prefix + "/") for prefix in self.prefixes)
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._covers(scope):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get(HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _error(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")(scope, receive, send)
+            return
+        subject = _subject(headers.get("authorization"))
+        if subject is None:
+            # The endpoint answers 401 itself
+            await self.app(scope, receive, send)
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        key_hash = _digest(subject.encode(), key.encode())
+        fingerprint = _digest(scope["method"].encode(), scope["path"].encode(), scope["query_string"], body)
+
+        # Wait for a duplicate already running here rather than racing it
+        while (leader := self._in_flight.get(key_hash)) is not None:
+            stored = await asyncio.shield(leader)
+            if stored is not None:
+                await self._replay(stored, fingerprint, scope, receive, send)
+                return
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key_hash] = future
+        try:
+            stored = await self.store.claim(key_hash, fingerprint)
+            if stored is None:
+                stored = await self._execute(key_hash, fingerprint, body, scope, receive, send)
+            elif stored.status_code is None:
+                metrics.idempotency_requests.inc(("conflict",))
+                await _error(
+                    409, "A request with this Idempotency-Key is in progress", {"Retry-After": "1"}
+                )(scope, receive, send)
+                stored = None
+            else:
+                await self._replay(stored, fingerprint, scope, receive, send)
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            del self._in_flight[key_hash]
+        if not future.done():
+            future.set_result(stored)
+
+    async def _execute(self, key_hash: bytes, fingerprint: bytes, body: bytes, scope, receive, send) -> StoredResponse | None:
+        """Run the endpoint, store its response, then send it"""
+        consumed = False
+
+        async def receive_body():
+            nonlocal consumed
+            if consumed:
+                return await receive()
+            consumed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        start = None
+        chunks = []
+
+        async def buffer(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive_body, buffer)
+        except BaseException:
+            await self.store.release(key_hash)
+            raise
+
+        response_body = b"".join(chunks)
+        stored = None
+        if start["status"] < 500 and len(response_body) <= settings.IDEMPOTENCY_MAX_RESPONSE_BYTES:
+            headers = [(name, value) for name, value in start.get("headers", []) if name.lower() in REPLAYED_HEADERS]
+            stored = StoredResponse(fingerprint, start["status"], headers, response_body)
+            await self.store.complete(key_hash, stored)
+        else:
+            await self.store.release(key_hash)
+        metrics.idempotency_requests.inc(("executed",))
+        await send(start)
+        await send({"type": "http.response.body", "body": response_body, "more_body": False})
+        return stored
+
+    async def _replay(self, stored: StoredResponse, fingerprint: bytes, scope, receive, send):
+        if stored.fingerprint != fingerprint:
+            metrics.idempotency_requests.inc(("mismatch",))
+            await _error(422, "Idempotency-Key was already used with a different request")(scope, receive, send)
+            return
+        metrics.idempotency_requests.inc(("replayed",))
+        headers = list(stored.headers) + [(REPLAYED_HEADER, b"true")]
+        if stored.status_code not in (204, 304):
+            headers.append((b"content-length", str(len(stored.body)).encode()))
+        await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": stored.body, "more_body": False})
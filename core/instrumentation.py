@@ -0,0 +1,108 @@
+"""
+Per-request SQL instrumentation
+
+Cursor-execute events on every Engine feed a QueryStats object held in a
+context variable for the duration of one request. SQLAlchemy's async
+layer runs the sync engine in greenlets that inherit the caller's context,
+so statements issued through the async engine are attributed to the right
+request too. Outside a request the listeners do nothing but one lookup.
+
+SQLMetricsMiddleware reports the totals in a Server-Timing header and logs
+a warning when one statement shape repeats often enough to look like N+1.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Collapses expanded IN lists so "IN (?, ?)" and "IN (?, ?, ?)" share a shape
+_PARAM_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def statement_shape(statement: str) -> str:
+    return _PARAM_LIST.sub("?", statement)
+
+
+class QueryStats:
+    """Statements executed during one request"""
+
+    __slots__ = ("count", "duration", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.duration += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes executed more than ``threshold`` times"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("sql_query_stats", default=None)
+
+
+def current_stats() -> QueryStats | None:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get("query_start")
+    if stats is not None and starts:
+        stats.record(statement, time.perf_counter() - starts.pop())
+
+
+class SQLMetricsMiddleware:
+    """ASGI middleware collecting QueryStats for each HTTP request"""
+
+    def __init__(self, app, n_plus_one_threshold: int | None = None):
+        self.app = app
+        self.threshold = n_plus_one_threshold or settings.SQL_N_PLUS_ONE_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            for shape, n in stats.repeated(self.threshold):
+                logger.warning(
+                    "Possible N+1: %s %s ran the same statement %d times: %s",
+                    scope["method"], scope["path"], n, shape,
+                )
@@ -0,0 +1,240 @@
+"""
+In-process metrics exposed in Prometheus text format
+
+Recording happens on the event loop thread (the ASGI middleware and the
+async engine's pool both run there), so the collectors are plain counters
+and lists with no locks. The only other writer is the sync engine's pool
+from threadpool workers, whose increments are single bytecode operations
+on ints; a lost update there skews a count by one, never corrupts it.
+
+Pool sizes and Argon2 timings are read from their owners at scrape time
+rather than mirrored here.
+"""
+import time
+from bisect import bisect_left
+
+from sqlalchemy.pool import QueuePool
+
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Fixed-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, labels: tuple = ()) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _labels(self.label_names, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+    def clear(self):
+        self._series.clear()
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+    def clear(self):
+        self._values.clear()
+
+
+def _gauge(name: str, help: str, samples: list[tuple[str, float]]) -> list[str]:
+    """Render a gauge from ``(label string, value)`` pairs read at scrape time"""
+    return [f"# HELP {name} {help}", f"# TYPE {name} gauge"] + [f"{name}{labels} {value}" for labels, value in samples]
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+responses_total = Counter(
+    "http_responses_total", "HTTP responses by route and status code", ("method", "route", "status")
+)
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection", ("engine",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+auth_rejected = Counter(
+    "auth_admission_rejected_total", "Auth requests rejected by admission control", ("reason",)
+)
+group_commit_batch_size = Histogram(
+    "group_commit_batch_size", "Write ops committed together by the group-commit writer",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+profile_queries = Counter(
+    "profile_cache_fallback_queries_total", "DB queries issued for profile cache misses"
+)
+idempotency_requests = Counter(
+    "idempotency_requests_total", "Requests carrying an Idempotency-Key by outcome", ("outcome",)
+)
+in_flight = 0
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight count per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global in_flight
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight -= 1
+            # The route template, not the raw path, keeps label cardinality bounded
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            request_duration.observe(elapsed, labels)
+            responses_total.inc(labels + (status_code,))
+
+
+def instrument_pool(engine, name: str):
+    """
+    Time connection checkouts on ``engine``'s pool
+
+    Only queue pools can make a caller wait. The pool's class is swapped
+    for a subclass whose ``_do_get`` is timed; ``Pool.recreate`` (used by
+    ``engine.dispose()``) builds from ``self.__class__``, so the timing
+    survives disposal and re-creation.
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or getattr(pool, "_metrics_name", None):
+        return
+    base = type(pool)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - start, (self._metrics_name,))
+
+    pool.__class__ = type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get, "_metrics_name": name})
+
+
+def _pool_samples(engines: dict) -> list[str]:
+    sizes, checked_out, overflow = [], [], []
+    for name, engine in engines.items():
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            labels = f'{{engine="{name}"}}'
+            sizes.append((labels, pool.size()))
+            checked_out.append((labels, pool.checkedout()))
+            overflow.append((labels, pool.overflow()))
+    return (
+        _gauge("db_pool_size", "Configured pool size", sizes)
+        + _gauge("db_pool_checked_out", "Connections currently checked out", checked_out)
+        + _gauge("db_pool_overflow", "Connections open beyond the pool size", overflow)
+    )
+
+
+def _hashing_samples(pool) -> list[str]:
+    stats = pool.stats()
+    lines = [
+        "# HELP argon2_seconds Time spent in Argon2 hash and verify calls",
+        "# TYPE argon2_seconds summary",
+    ]
+    for label, timing in sorted(pool.timings.items()):
+        lines.append(f'argon2_seconds_sum{{op="{label}"}} {timing.total}')
+        lines.append(f'argon2_seconds_count{{op="{label}"}} {timing.count}')
+    lines += _gauge("argon2_in_flight", "Argon2 jobs running or queued", [("", stats["in_flight"])])
+    lines += [
+        "# HELP argon2_rejected_total Argon2 jobs rejected because the pool was full",
+        "# TYPE argon2_rejected_total counter",
+        f"argon2_rejected_total {stats['rejected']}",
+    ]
+    return lines
+
+
+def _cache_samples(caches: dict) -> list[str]:
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    lines = []
+    for key, help in (("hits", "Cache hits"), ("misses", "Cache misses"), ("evictions", "Entries evicted by size")):
+        lines += [f"# HELP cache_{key}_total {help}", f"# TYPE cache_{key}_total counter"]
+        lines += [f'cache_{key}_total{{cache="{name}"}} {s[key]}' for name, s in stats.items()]
+    lines += _gauge("cache_size", "Entries currently cached", [(f'{{cache="{name}"}}', s["size"]) for name, s in stats.items()])
+    return lines
+
+
+def render(engines: dict, hashing_pool, caches: dict | None = None) -> str:
+    """Render every metric in Prometheus text exposition format"""
+    lines = _gauge("http_requests_in_flight", "HTTP requests currently being served", [("", in_flight)])
+    lines += request_duration.render()
+    lines += responses_total.render()
+    lines += pool_checkout_wait.render()
+    lines += group_commit_batch_size.render()
+    lines += auth_rejected.render()
+    lines += profile_queries.render()
+    lines += idempotency_requests.render()
+    lines += _pool_samples(engines)
+    lines += _hashing_samples(hashing_pool)
+    lines += _cache_samples(caches or {})
+    return "\n".join(lines) + "\n"
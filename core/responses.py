@@ -0,0 +1,19 @@
+"""
+Response classes for pre-serialized bodies
+"""
+from fastapi.responses import JSONResponse
+
+
+class RawJSONResponse(JSONResponse):
+    """
+    JSON response whose content is already encoded
+
+    Handlers that serialize with a pydantic ``TypeAdapter.dump_json`` pass
+    the bytes straight through instead of paying for ``json.dumps`` again.
+    Anything that is not bytes falls back to the normal JSON encoding.
+    """
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return super().render(content)
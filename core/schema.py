@@ -0,0 +1,141 @@
+"""
+Schema management: additive migrations and a cached schema fingerprint
+
+Nothing here runs at import. ``python manage.py migrate`` brings a database
+up to the models and records a fingerprint of the schema it applied in
+``schema_meta``; startup then compares that one stored row with the
+models' fingerprint instead of inspecting every table.
+
+Migrations are additive only: missing tables, columns, indexes and the
+SQLite full-text index are created. A new NOT NULL column without a
+server default is refused; dropped or retyped columns need a manual
+migration.
+"""
+import hashlib
+from functools import cache
+
+from sqlalchemy import Column, MetaData, String, Table, inspect, select, text
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+from .database import Base
+
+schema_meta = Table(
+    "schema_meta",
+    MetaData(),
+    Column("key", String, primary_key=True),
+    Column("value", String, nullable=False),
+)
+
+
+class SchemaError(Exception):
+    """Raised when the database schema does not match the models"""
+
+
+def _models():
+    """Import every model so Base.metadata is complete"""
+    import models  # noqa: F401
+    from models.item import ITEMS_FTS_DDL
+    return ITEMS_FTS_DDL
+
+
+def _extra_ddl(dialect) -> list[str]:
+    """Dialect-specific DDL attached to tables through events"""
+    fts_ddl = _models()
+    return fts_ddl if dialect.name == "sqlite" else []
+
+
+@cache
+def schema_fingerprint(dialect) -> str:
+    """SHA-256 over the DDL the models compile to on ``dialect``"""
+    _models()
+    digest = hashlib.sha256()
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    for statement in _extra_ddl(dialect):
+        digest.update(statement.encode())
+    return digest.hexdigest()
+
+
+def stored_fingerprint(conn) -> str | None:
+    if not inspect(conn).has_table(schema_meta.name):
+        return None
+    return conn.execute(select(schema_meta.c.value).where(schema_meta.c.key == "fingerprint")).scalar()
+
+
+def plan(conn) -> list[str]:
+    """Describe the changes ``migrate`` would make, without making them"""
+    return migrate(conn, dry_run=True)
+
+
+def migrate(conn, dry_run: bool = False) -> list[str]:
+    """
+    Apply additive schema changes on a sync Connection and record the fingerprint
+
+    Returns a description of each change. Run it inside a transaction
+    (``engine.begin()``, or ``run_sync`` on an async connection).
+
+    Raises:
+        SchemaError: if a missing column cannot be added in place
+    """
+    _models()
+    inspector = inspect(conn)
+    existing = set(inspector.get_table_names())
+    changes = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            changes.append(f"create table {table.name}")
+            if not dry_run:
+                table.create(conn)  # after_create listeners add the FTS index
+            continue
+
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise SchemaError(f"Cannot add NOT NULL column {table.name}.{column.name} without a server default")
+            changes.append(f"add column {table.name}.{column.name}")
+            if not dry_run:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                changes.append(f"create index {index.name}")
+                if not dry_run:
+                    index.create(conn)
+
+    if conn.dialect.name == "sqlite" and "items" in existing and "items_fts" not in existing:
+        changes.append("create full-text index items_fts")
+        if not dry_run:
+            for statement in _extra_ddl(conn.dialect):
+                conn.execute(text(statement))
+            conn.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+
+    fingerprint = schema_fingerprint(conn.dialect)
+    if stored_fingerprint(conn) != fingerprint and not changes:
+        changes.append("record schema fingerprint")
+    if not dry_run:
+        schema_meta.create(conn, checkfirst=True)
+        conn.execute(schema_meta.delete().where(schema_meta.c.key == "fingerprint"))
+        conn.execute(schema_meta.insert().values(key="fingerprint", value=fingerprint))
+    return changes
+
+
+def check(conn):
+    """
+    Fail fast if the database was not migrated to the current models
+
+    Reads only the stored fingerprint, so it is cheap enough for startup.
+
+    Raises:
+        SchemaError: if the stored fingerprint is missing or out of date
+    """
+    stored = stored_fingerprint(conn)
+    if stored != schema_fingerprint(conn.dialect):
+        state = "has no schema fingerprint" if stored is None else "schema is out of date"
+        raise SchemaError(f"Database {state}; run `python manage.py migrate`")
@@ -1,28 +1,83 @@
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
-from jose import jwt, JWTError
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import cache
+import hashlib
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.config import settings
-from core.database import get_db
+from core.cache import TTLCache
+from core.database import get_async_db
+from core.hashing import hashing_pool, PoolSaturatedError
 from models.user import User
 
-# Initialize Argon2 password hasher
-ph = PasswordHasher()
+# argon2 and python-jose (which loads cryptography's x509 stack) are imported
+# on first use, keeping them off the import path of every worker and test run
+
+@cache
+def _password_hasher():
+    """Shared Argon2 password hasher with the configured cost"""
+    from argon2 import PasswordHasher
+    return PasswordHasher(
+        time_cost=settings.PASSWORD_HASH_TIME_COST,
+        memory_cost=settings.PASSWORD_HASH_MEMORY_COST,
+        parallelism=settings.PASSWORD_HASH_PARALLELISM,
+    )
+
+def _jose():
+    """The python-jose package, with its jwt module loaded"""
+    import jose.jwt
+    return jose
 
 # OAuth2 scheme for JWT token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated user as seen by request handlers (a snapshot, not an ORM row)"""
+    id: int
+    email: str
+    username: str
+    full_name: str | None = None
+    version: int = 1
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            full_name=user.full_name,
+            version=user.version,
+        )
+
+# Authenticated principals keyed by token subject (email)
+principal_cache = TTLCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+# Verified token claims keyed by SHA-256 of the token
+token_cache = TTLCache(
+    max_size=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+def invalidate_principal(email: str):
+    """Drop a cached principal after the user is changed or deleted"""
+    principal_cache.invalidate(email)
+
 def hash_password(password: str) -> str:
     """Hash password using Argon2"""
-    return ph.hash(password)
+    return _password_hasher().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password against hashed password"""
+    from argon2.exceptions import VerifyMismatchError
     try:
-        ph.verify(hashed_password, plain_password)
+        _password_hasher().verify(hashed_password, plain_password)
         return True
     except VerifyMismatchError:
         return False
@@ -30,6 +85,45 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         print(f"Error verifying password: {e}")
         return False
 
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with parameters other than the configured ones"""
+    return _password_hasher().check_needs_rehash(hashed_password)
+
+def _pool_saturated(exc: PoolSaturatedError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry later",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+async def hash_password_async(password: str) -> str:
+    """Hash password on the Argon2 worker pool"""
+    try:
+        return await hashing_pool.run("hash", hash_password, password)
+    except PoolSaturatedError as exc:
+        raise _pool_saturated(exc)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify password on the Argon2 worker pool"""
+    try:
+        return await hashing_pool.run("verify", verify_password, plain_password, hashed_password)
+    except PoolSaturatedError as exc:
+        raise _pool_saturated(exc)
+
+async def rehash_password_async(plain_password: str, hashed_password: str) -> str | None:
+    """
+    A new hash with the current parameters if ``hashed_password`` is outdated
+
+    Returns None when no upgrade is needed or the pool is busy; the upgrade
+    is retried on a later login rather than failing this one.
+    """
+    if not needs_rehash(hashed_password):
+        return None
+    try:
+        return await hashing_pool.run("hash", hash_password, plain_password)
+    except PoolSaturatedError:
+        return None
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -39,15 +133,37 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
+    encoded_jwt = _jose().jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
-def get_current_user(
+def decode_access_token(token: str) -> dict:
+    """
+    Decode and verify a JWT, memoizing the claims until the token expires
+    
+    Raises:
+        JWTError: if the token is invalid or expired
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    claims = _jose().jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    exp = claims.get("exp")
+    if exp is not None:
+        token_cache.set(key, claims, ttl=exp - time.time())
+    return claims
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
     """
     Get current user from JWT token
+    
+    Principals are cached per subject for at most PRINCIPAL_CACHE_TTL_SECONDS
+    and never past the token's expiry. The cache is per process: a change
+    or delete invalidates it only in the worker that handled it.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,16 +173,26 @@ def get_current_user(
 
     try:
         # Decode JWT token
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-    except JWTError:
+    # Evaluated only when an exception reaches it, by which time
+    # decode_access_token has imported jose
+    except _jose().JWTError:
         raise credentials_exception
 
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+
     # Get user from database
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
 
-    return user
\ No newline at end of file
+    principal = Principal.from_user(user)
+    exp = payload.get("exp")
+    principal_cache.set(email, principal, ttl=exp - time.time() if exp is not None else None)
+    return principal
\ No newline at end of file
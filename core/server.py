@@ -0,0 +1,141 @@
+"""
+Pre-fork multi-worker server
+
+The master binds the listening socket, imports the app once and forks
+``workers`` children that each run a uvicorn server on the inherited
+socket; the kernel spreads incoming connections across them. Argon2 work
+then scales with cores instead of being capped by one process.
+
+The master never opens a database connection. Connection pools and the
+hashing executor are reset in each child by ``os.register_at_fork`` hooks
+in core.database and core.hashing, so no connection or thread crosses a
+fork.
+
+Crashed workers are replaced (with a short delay if they die right after
+starting, so a broken deploy does not fork-bomb). SIGTERM or SIGINT drains:
+each worker stops accepting, finishes in-flight requests and runs its
+lifespan shutdown; stragglers are killed after the graceful timeout.
+"""
+import os
+import signal
+import socket
+import sys
+import time
+
+# A worker that dies sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+RESTART_DELAY = 1.0
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, graceful_timeout: float, log_level: str) -> int:
+    """Serve ``app`` on the inherited socket until told to stop; returns the exit code"""
+    import uvicorn
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    config = uvicorn.Config(
+        app,
+        log_level=log_level,
+        timeout_graceful_shutdown=graceful_timeout,
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return 0 if server.started else 1
+
+
+class Master:
+    """Forks, supervises and drains the worker processes"""
+
+    def __init__(self, app, sock: socket.socket, workers: int, graceful_timeout: float, log_level: str = "info"):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.log_level = log_level
+        self.children: dict[int, float] = {}  # pid -> start time
+        self.stopping = False
+
+    def log(self, message: str):
+        print(f"[master {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = run_worker(self.app, self.sock, self.graceful_timeout, self.log_level)
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        self.log(f"started worker {pid}")
+
+    def handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def reap(self) -> list[tuple[int, int, float]]:
+        """Collect exited workers as (pid, wait status, lifetime)"""
+        exited = []
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            if started is not None:
+                exited.append((pid, status, time.monotonic() - started))
+        return exited
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self.stopping:
+            for pid, status, lifetime in self.reap():
+                self.log(f"worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+                if lifetime < MIN_WORKER_LIFETIME:
+                    time.sleep(RESTART_DELAY)
+                if not self.stopping:
+                    self.spawn()
+            time.sleep(0.1)
+
+        return self.drain()
+
+    def drain(self) -> int:
+        self.log(f"draining {len(self.children)} workers")
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            self.log(f"killing worker {pid} after graceful timeout")
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.children.pop(pid)
+        self.sock.close()
+        return 0
+
+
+def serve(host: str, port: int, workers: int, graceful_timeout: float, log_level: str = "info") -> int:
+    """Bind, pre-load the app and supervise ``workers`` forked servers"""
+    sock = bind_socket(host, port)
+    from main import app
+
+    master = Master(app, sock, workers, graceful_timeout, log_level)
+    master.log(f"listening on {host}:{port} with {workers} workers")
+    return master.run()
@@ -0,0 +1,111 @@
+"""
+SQLite storage profiles
+
+A profile is the set of per-connection pragmas applied from a "connect"
+event on every new DBAPI connection, so pooled connections always carry
+them. Settings choose a named profile (SQLITE_PROFILE) and may override
+any single pragma; pool sizing comes from the DB_POOL_* settings.
+"""
+from dataclasses import dataclass, replace
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from .config import settings
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    journal_mode: str
+    synchronous: str
+    busy_timeout_ms: int
+    # Negative values are KiB, positive values are pages (SQLite's convention)
+    cache_size: int
+    mmap_size: int
+    temp_store: str
+
+    @classmethod
+    def from_settings(cls, config=settings) -> "StorageProfile":
+        overrides = {
+            "journal_mode": config.SQLITE_JOURNAL_MODE,
+            "synchronous": config.SQLITE_SYNCHRONOUS,
+            "busy_timeout_ms": config.SQLITE_BUSY_TIMEOUT_MS,
+            "cache_size": config.SQLITE_CACHE_SIZE,
+            "mmap_size": config.SQLITE_MMAP_SIZE,
+            "temp_store": config.SQLITE_TEMP_STORE,
+        }
+        return replace(PROFILES[config.SQLITE_PROFILE], **{k: v for k, v in overrides.items() if v is not None})
+
+    def pragmas(self, read_only: bool = False) -> list[str]:
+        """Pragma statements; a read-only connection skips the ones that write"""
+        # journal_mode goes first: it cannot change inside a transaction
+        durability = [] if read_only else [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+        ]
+        return durability + [
+            f"PRAGMA busy_timeout={self.busy_timeout_ms}",
+            f"PRAGMA cache_size={self.cache_size}",
+            f"PRAGMA mmap_size={self.mmap_size}",
+            f"PRAGMA temp_store={self.temp_store}",
+        ]
+
+
+PROFILES = {
+    # SQLite's own defaults: rollback journal, fsync on every commit
+    "compat": StorageProfile("DELETE", "FULL", 5000, -2000, 0, "DEFAULT"),
+    # Readers no longer block behind the writer; fsync only at checkpoints
+    "wal": StorageProfile("WAL", "NORMAL", 5000, -2000, 0, "DEFAULT"),
+    # WAL plus a 64 MiB page cache, 256 MiB memory map and in-memory temp tables
+    "wal_mmap": StorageProfile("WAL", "NORMAL", 5000, -64000, 256 * 1024 * 1024, "MEMORY"),
+}
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def is_memory(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def read_only_url(url: str) -> str:
+    """The same SQLite file opened through a read-only URI (mode=ro)"""
+    url = make_url(url)
+    return url.set(
+        database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"}
+    ).render_as_string(hide_password=False)
+
+
+def pool_options(url: str, config=settings) -> dict:
+    """Engine keyword arguments for pool sizing; in-memory SQLite keeps its single-connection pool"""
+    if is_sqlite(url) and is_memory(url):
+        return {}
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": config.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+
+def apply_storage_profile(
+    engine, profile: StorageProfile | None = None, read_only: bool = False
+) -> StorageProfile | None:
+    """Run the profile's pragmas on every new connection of a SQLite engine"""
+    if engine.dialect.name != "sqlite":
+        return None
+    profile = profile or StorageProfile.from_settings()
+    statements = profile.pragmas(read_only=read_only)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return profile
@@ -1,14 +1,123 @@
-from sqlalchemy.orm import Session
+from typing import Sequence
+from sqlalchemy import Select, and_, bindparam, column, delete, func, insert, literal_column, or_, select, table, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from models.item import Item
-from schemas.item import ItemCreate
+from schemas.item import ItemBulkUpdate, ItemCreate
+from crud.item_stats import adjust_item_count
 
-def create_item(db: Session, item: ItemCreate, owner_id: int) -> Item:
+async def create_item(db: AsyncSession, item: ItemCreate, owner_id: int) -> Item:
     db_item = Item(
         title=item.title,
         description=item.description,
         owner_id=owner_id
     )
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
-    return db_item
\ No newline at end of file
+    await db.flush()
+    await adjust_item_count(db, owner_id, 1)
+    await db.commit()
+    await db.refresh(db_item)
+    return db_item
+
+def owned_items_query(owner_id: int, after_id: int | None = None) -> Select:
+    """Items of one owner in id order, optionally starting after a keyset cursor"""
+    query = select(Item).where(Item.owner_id == owner_id)
+    if after_id is not None:
+        query = query.where(Item.id > after_id)
+    return query.order_by(Item.id)
+
+async def create_items(db: AsyncSession, items: Sequence[ItemCreate], owner_id: int) -> list[Item]:
+    """Insert many items with one executemany INSERT ... RETURNING, in input order"""
+    result = await db.execute(
+        insert(Item).returning(Item, sort_by_parameter_order=True),
+        [{"title": item.title, "description": item.description, "owner_id": owner_id} for item in items],
+    )
+    db_items = list(result.scalars().all())
+    await adjust_item_count(db, owner_id, len(db_items))
+    await db.commit()
+    return db_items
+
+async def get_owned_item_ids(db: AsyncSession, owner_id: int, ids: Sequence[int]) -> set[int]:
+    """Subset of ``ids`` that exist and belong to ``owner_id``"""
+    result = await db.execute(select(Item.id).where(Item.owner_id == owner_id, Item.id.in_(set(ids))))
+    return set(result.scalars().all())
+
+async def update_items(db: AsyncSession, updates: Sequence[ItemBulkUpdate], owner_id: int) -> dict[int, Item]:
+    """
+    Update the caller's items with one executemany UPDATE by primary key, bumping versions
+    
+    Returns the updated items by id; ids not owned by ``owner_id`` are skipped.
+    """
+    owned = await get_owned_item_ids(db, owner_id, [u.id for u in updates])
+    rows = [
+        {"b_id": u.id, "b_title": u.title, "b_description": u.description}
+        for u in updates if u.id in owned
+    ]
+    if rows:
+        # Core executemany so each row also bumps its version
+        items = Item.__table__
+        await db.execute(
+            update(items)
+            .where(items.c.id == bindparam("b_id"))
+            .values(title=bindparam("b_title"), description=bindparam("b_description"), version=items.c.version + 1),
+            rows,
+        )
+    await db.commit()
+    result = await db.execute(
+        select(Item).where(Item.id.in_(owned)).execution_options(populate_existing=True)
+    )
+    return {item.id: item for item in result.scalars().all()}
+
+async def delete_item(db: AsyncSession, item_id: int, owner_id: int) -> bool:
+    """
+    Delete one of the caller's items without committing; False if it is not theirs
+
+    A core DELETE skips the ORM's version check, so deleting an item that a
+    concurrent update just changed is still a delete, not a conflict.
+    """
+    result = await db.execute(delete(Item).where(Item.id == item_id, Item.owner_id == owner_id))
+    if result.rowcount == 0:
+        return False
+    await adjust_item_count(db, owner_id, -1)
+    return True
+
+async def delete_items(db: AsyncSession, ids: Sequence[int], owner_id: int) -> set[int]:
+    """Delete the caller's items in one statement; returns the ids deleted"""
+    owned = await get_owned_item_ids(db, owner_id, ids)
+    if owned:
+        await db.execute(delete(Item).where(Item.id.in_(owned)))
+        await adjust_item_count(db, owner_id, -len(owned))
+    await db.commit()
+    return owned
+
+# FTS5 shadow of the items table, created by the DDL in models/item.py
+items_fts = table("items_fts", column("rowid"))
+
+def fts_match_expression(q: str) -> str:
+    """Quote each search term so user input is never parsed as FTS5 syntax"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+def search_items_query(owner_id: int, q: str, after: tuple[float, int] | None = None) -> Select:
+    """
+    The owner's items matching ``q``, best bm25 rank first
+    
+    Selects (Item, rank); ``after`` is the (rank, id) of the last row of the
+    previous page.
+    """
+    fts = literal_column(items_fts.name)  # the table-named hidden column
+    ranked = (
+        select(Item, func.bm25(fts).label("rank"))
+        .select_from(items_fts)
+        .join(Item, Item.id == items_fts.c.rowid)
+        .where(fts.op("MATCH")(fts_match_expression(q)), Item.owner_id == owner_id)
+        .subquery()
+    )
+    ranked_item = aliased(Item, ranked)
+    query = select(ranked_item, ranked.c.rank)
+    if after is not None:
+        last_rank, last_id = after
+        query = query.where(or_(
+            ranked.c.rank > last_rank,
+            and_(ranked.c.rank == last_rank, ranked.c.id > last_id),
+        ))
+    return query.order_by(ranked.c.rank, ranked.c.id)
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Per-owner item counters
+
+Every path that inserts or deletes items calls ``adjust_item_count`` before
+its commit, so the counter moves in the same transaction as the rows and
+``GET /items/stats`` reads one row instead of counting. Writes that bypass
+the API (raw SQL, restores) are repaired by ``python manage.py reconcile``.
+"""
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.item import Item
+from models.item_stats import ItemStats
+
+def _count_items(owner_id: int):
+    return select(func.count()).select_from(Item).where(Item.owner_id == owner_id).scalar_subquery()
+
+async def adjust_item_count(db: AsyncSession, owner_id: int, delta: int):
+    """
+    Add ``delta`` to the owner's counter inside the caller's transaction
+
+    The owner's first counted write creates the row from a COUNT over its
+    items, which must already be flushed; owners that predate the table are
+    picked up this way.
+    """
+    result = await db.execute(
+        update(ItemStats)
+        .where(ItemStats.owner_id == owner_id)
+        .values(item_count=ItemStats.item_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        await db.execute(insert(ItemStats).values(owner_id=owner_id, item_count=_count_items(owner_id)))
+
+async def get_item_count(db: AsyncSession, owner_id: int) -> int:
+    """The owner's item count; owners without a row yet are counted once"""
+    result = await db.execute(select(ItemStats.item_count).where(ItemStats.owner_id == owner_id))
+    count = result.scalar()
+    if count is None:
+        count = (await db.execute(select(_count_items(owner_id)))).scalar()
+    return count
+
+async def delete_item_stats(db: AsyncSession, owner_id: int):
+    await db.execute(delete(ItemStats).where(ItemStats.owner_id == owner_id))
+
+def reconcile(conn, dry_run: bool = False) -> list[tuple[int, int | None, int]]:
+    """
+    Rebuild the counters from ``items`` on a sync Connection
+
+    Returns the drift as (owner id, stored count or None, actual count) and,
+    unless ``dry_run``, corrects it. Run it inside a transaction.
+    """
+    actual = dict(conn.execute(
+        select(Item.owner_id, func.count()).where(Item.owner_id.is_not(None)).group_by(Item.owner_id)
+    ).all())
+    stored = dict(conn.execute(select(ItemStats.owner_id, ItemStats.item_count)).all())
+
+    drift = [
+        (owner_id, stored.get(owner_id), actual.get(owner_id, 0))
+        for owner_id in sorted(actual.keys() | stored.keys())
+        if stored.get(owner_id) != actual.get(owner_id, 0)
+    ]
+    if drift and not dry_run:
+        for owner_id, before, count in drift:
+            if before is None:
+                conn.execute(insert(ItemStats).values(owner_id=owner_id, item_count=count))
+            else:
+                conn.execute(update(ItemStats).where(ItemStats.owner_id == owner_id).values(item_count=count))
+    return drift
@@ -0,0 +1,121 @@
+"""
+Rotating refresh tokens
+
+A refresh token is a random string handed to the client once; the database
+keeps only its SHA-256 digest. Checking one therefore costs a hash and an
+indexed lookup, never an Argon2 verify. Each exchange marks the token used
+and issues a successor in the same family. Presenting a used token again
+means it was copied, so the whole family is revoked.
+
+Tokens die with their user, and a token issued before its user row was
+created is refused, so a reused user id never inherits an old login.
+Expired, revoked and long-used rows are removed by
+``python manage.py sweep-refresh-tokens``.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from models.refresh_token import RefreshToken
+from models.user import User
+
+def digest(token: str) -> str:
+    """SHA-256 hex digest stored in place of the token"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def issue_refresh_token(db: AsyncSession, user_id: int, family: str | None = None) -> str:
+    """Create a refresh token (a new family unless ``family`` is given) and return it"""
+    token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    db.add(RefreshToken(
+        user_id=user_id,
+        family=family or secrets.token_hex(16),
+        token_hash=digest(token),
+        issued_at=now,
+        expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    await db.commit()
+    return token
+
+async def revoke_family(db: AsyncSession, family: str):
+    """Revoke every token of a family"""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family == family, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    await db.commit()
+
+async def delete_user_tokens(db: AsyncSession, user_id: int):
+    """Delete every refresh token of a user, inside the caller's transaction"""
+    await db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id))
+
+async def get_refresh_token(db: AsyncSession, token: str) -> RefreshToken | None:
+    result = await db.execute(select(RefreshToken).where(RefreshToken.token_hash == digest(token)))
+    return result.scalars().first()
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> tuple[int, str] | None:
+    """
+    Exchange a refresh token for its successor
+
+    Returns:
+        (user id, new token), or None if the token is unknown, expired,
+        revoked or already used, or its user is gone or newer than it.
+        A used token, or one older than its user, revokes its family.
+    """
+    result = await db.execute(
+        select(RefreshToken, User.id, User.created_at)
+        .outerjoin(User, User.id == RefreshToken.user_id)
+        .where(RefreshToken.token_hash == digest(token))
+    )
+    found = result.first()
+    now = datetime.utcnow()
+    if found is None:
+        return None
+    row, user_id, user_created_at = found
+    if row.revoked_at is not None or row.expires_at <= now:
+        return None
+    if user_id is None or (
+        user_created_at is not None and (row.issued_at is None or row.issued_at < user_created_at)
+    ):
+        # Issued to an earlier holder of this user id
+        await revoke_family(db, row.family)
+        return None
+
+    # The conditional update lets exactly one of two concurrent exchanges win
+    claimed = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.used_at.is_(None))
+        .values(used_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        await revoke_family(db, row.family)
+        return None
+    return row.user_id, await issue_refresh_token(db, row.user_id, row.family)
+
+def _sweepable(now: datetime):
+    """Rows no exchange can use: expired, revoked, or used longer ago than reuse detection needs"""
+    used_before = now - timedelta(days=settings.REFRESH_TOKEN_REUSE_DETECTION_DAYS)
+    return or_(
+        RefreshToken.expires_at <= now,
+        RefreshToken.revoked_at.is_not(None),
+        RefreshToken.used_at <= used_before,
+    )
+
+def sweep(conn, batch_size: int = 1000) -> int:
+    """
+    Delete dead refresh tokens on a sync Connection, ``batch_size`` rows per statement
+
+    Returns the number of rows deleted. Run it inside a transaction.
+    """
+    now = datetime.utcnow()
+    deleted = 0
+    while True:
+        batch = select(RefreshToken.id).where(_sweepable(now)).limit(batch_size).scalar_subquery()
+        count = conn.execute(delete(RefreshToken).where(RefreshToken.id.in_(batch))).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
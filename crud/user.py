@@ -1,19 +1,33 @@
-from sqlalchemy.orm import Session
+from typing import Sequence
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.item import Item
 from models.user import User
-from schemas.user import UserCreate
-from core.security import hash_password
+from schemas.user import User as UserSchema, UserCreate
+from core import metrics
+from core.cache import TTLCache
+from core.config import settings
+from core.security import hash_password_async
 
-def get_user_by_email(db: Session, email: str):
+# Public profiles (the schemas.user.User projection) keyed by user id
+profile_cache = TTLCache(
+    max_size=settings.PROFILE_CACHE_SIZE,
+    ttl=settings.PROFILE_CACHE_TTL_SECONDS,
+)
+
+async def get_user_by_email(db: AsyncSession, email: str):
     """Get user by email"""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
-def get_user_by_username(db: Session, username: str):
+async def get_user_by_username(db: AsyncSession, username: str):
     """Get user by username"""
-    return db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
-def create_user(db: Session, username: str, password: str, email: str, full_name: str | None = None) -> User:
+async def create_user(db: AsyncSession, username: str, password: str, email: str, full_name: str | None = None) -> User:
     """Create new user"""
-    hashed_password = hash_password(password)
+    hashed_password = await hash_password_async(password)
     db_user = User(
         username=username,
         email=email,
@@ -21,6 +35,66 @@ def create_user(db: Session, username: str, password: str, email: str, full_name
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def update_password_hash(db: AsyncSession, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """
+    Replace a password hash with a rehash of the same password
+
+    Matches on the old hash so a concurrent password change wins, and
+    leaves ``version`` alone: the user's visible state does not change.
+    """
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id, User.hashed_password == old_hash)
+        .values(hashed_password=new_hash)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+async def delete_user(db: AsyncSession, user_id: int):
+    """
+    Delete a user without committing, detaching their items as the ORM cascade did
+
+    Core statements skip the ORM's version check, so a delete racing a
+    profile update is still a delete rather than a StaleDataError.
+    """
+    await db.execute(
+        update(Item).where(Item.owner_id == user_id).values(owner_id=None).execution_options(synchronize_session=False)
+    )
+    await db.execute(delete(User).where(User.id == user_id).execution_options(synchronize_session=False))
+
+
+async def get_profiles(db: AsyncSession, ids: Sequence[int]) -> dict[int, UserSchema]:
+    """
+    Public profiles by id, read through the profile cache
+
+    All misses are loaded with one query. Unknown ids are absent from the
+    result and are not cached.
+    """
+    profiles = {}
+    misses = []
+    for user_id in ids:
+        profile = profile_cache.get(user_id)
+        if profile is None:
+            misses.append(user_id)
+        else:
+            profiles[user_id] = profile
+    if misses:
+        metrics.profile_queries.inc()
+        result = await db.execute(select(User).where(User.id.in_(misses)))
+        for user in result.scalars().all():
+            profiles[user.id] = cache_profile(user)
+    return profiles
+
+def cache_profile(user: User) -> UserSchema:
+    """Store the user's current profile (write-through after an update) and return it"""
+    profile = UserSchema.model_validate(user)
+    profile_cache.set(user.id, profile)
+    return profile
+
+def invalidate_profile(user_id: int):
+    profile_cache.invalidate(user_id)
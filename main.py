@@ -1,12 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from api.router import api_router
-from core.database import Base, engine
+from core.database import async_engine, engine, read_engines
 from core.config import settings
+from core.group_commit import group_writer
+from core.hashing import hashing_pool
+from core.idempotency import IdempotencyMiddleware
+from core.security import principal_cache, token_cache
+from crud.user import profile_cache
+from core.instrumentation import SQLMetricsMiddleware
+from core import metrics, schema
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Importing this module touches no database. Schema changes are applied by
+# `python manage.py migrate`; startup only checks the stored fingerprint.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.DB_AUTO_MIGRATE:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(schema.migrate)
+    elif settings.SCHEMA_CHECK_ON_STARTUP:
+        async with async_engine.connect() as conn:
+            await conn.run_sync(schema.check)
+    yield
+    await group_writer.close()
+    hashing_pool.shutdown()
 
 app = FastAPI(
     title="Task Management API",
@@ -15,6 +34,7 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    lifespan=lifespan,
 
     swagger_ui_init_oauth={
         "usePkceWithAuthorizationCodeGrant": False,
@@ -23,6 +43,14 @@ app = FastAPI(
     }
 )
 
+# Idempotency-Key on item writes; POST /items/batch only reads.
+# Added before CORS so replays and its own errors get CORS headers too.
+app.add_middleware(
+    IdempotencyMiddleware,
+    prefixes=(f"{settings.API_V1_STR}/items",),
+    exclude=(f"{settings.API_V1_STR}/items/batch",),
+)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -32,12 +60,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Query count and DB time per request, reported in Server-Timing
+app.add_middleware(SQLMetricsMiddleware)
+# Outermost, so its latency covers every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+metrics.instrument_pool(engine, "sync")
+metrics.instrument_pool(async_engine.sync_engine, "async")
+for n, read_engine in enumerate(read_engines):
+    metrics.instrument_pool(read_engine.sync_engine, f"read{n}")
+
 # Exception handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail, "status_code": exc.status_code}
+        content={"detail": exc.detail, "status_code": exc.status_code},
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
@@ -63,4 +102,13 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "database": "connected"}
\ No newline at end of file
+    return {"status": "healthy", "database": "connected"}
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    engines = {"sync": engine, "async": async_engine.sync_engine}
+    engines.update((f"read{n}", read_engine.sync_engine) for n, read_engine in enumerate(read_engines))
+    caches = {"principal": principal_cache, "token": token_cache, "profile": profile_cache}
+    body = metrics.render(engines, hashing_pool, caches)
+    return Response(body, media_type=metrics.CONTENT_TYPE)
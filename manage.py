@@ -0,0 +1,164 @@
+"""
+Management commands
+
+Usage:
+    python manage.py migrate           # apply additive schema changes
+    python manage.py migrate --dry-run # list them without applying
+    python manage.py check             # exit 1 unless the database is migrated
+    python manage.py serve --workers 4 # pre-fork server on 127.0.0.1:8000
+    python manage.py calibrate         # tune Argon2 cost for this host into .env
+    python manage.py reconcile         # rebuild per-user item counters, report drift
+    python manage.py sweep-idempotency # delete expired Idempotency-Key responses
+    python manage.py sweep-refresh-tokens # delete expired, revoked and long-used refresh tokens
+"""
+import argparse
+import os
+import sys
+
+from core.config import settings
+from core.database import engine
+from core import schema
+
+
+def migrate(args) -> int:
+    with engine.begin() as conn:
+        changes = schema.plan(conn) if args.dry_run else schema.migrate(conn)
+    for change in changes:
+        print(change)
+    if not changes:
+        print("Schema is up to date")
+    return 0
+
+
+def check(args) -> int:
+    with engine.connect() as conn:
+        pending = schema.plan(conn)
+        try:
+            schema.check(conn)
+        except schema.SchemaError as exc:
+            print(exc)
+            for change in pending:
+                print(f"pending: {change}")
+            return 1
+    print("Schema is up to date")
+    return 0
+
+
+def serve(args) -> int:
+    from core.server import serve as run_server
+    return run_server(args.host, args.port, args.workers, args.graceful_timeout, args.log_level)
+
+
+def reconcile(args) -> int:
+    from crud.item_stats import reconcile as run_reconcile
+
+    with engine.begin() as conn:
+        drift = run_reconcile(conn, dry_run=args.dry_run)
+    for owner_id, stored, actual in drift:
+        print(f"owner {owner_id}: stored {'missing' if stored is None else stored}, actual {actual}")
+    if not drift:
+        print("Item counters match")
+    elif not args.dry_run:
+        print(f"Corrected {len(drift)} counters")
+    return 1 if drift and args.dry_run else 0
+
+
+def sweep_idempotency(args) -> int:
+    from core.idempotency import sweep
+
+    with engine.begin() as conn:
+        deleted = sweep(conn, batch_size=args.batch_size)
+    print(f"Deleted {deleted} expired idempotency keys")
+    return 0
+
+
+def sweep_refresh_tokens(args) -> int:
+    from crud.refresh_token import sweep
+
+    with engine.begin() as conn:
+        deleted = sweep(conn, batch_size=args.batch_size)
+    print(f"Deleted {deleted} refresh tokens")
+    return 0
+
+
+def write_env(path: str, values: dict[str, str]):
+    """Set ``values`` in a dotenv file, replacing existing assignments and keeping other lines"""
+    lines = []
+    if os.path.exists(path):
+        with open(path) as f:
+            lines = f.read().splitlines()
+    remaining = dict(values)
+    for n, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip()
+        if key in remaining:
+            lines[n] = f"{key}={remaining.pop(key)}"
+    lines += [f"{key}={value}" for key, value in remaining.items()]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def calibrate(args) -> int:
+    from core.calibration import calibrate as run_calibration
+
+    params = run_calibration(args.target_ms / 1000, args.max_memory_mib * 1024, args.parallelism)
+    print(
+        f"time_cost={params.time_cost} memory_cost={params.memory_cost} KiB "
+        f"parallelism={params.parallelism}: {params.seconds * 1000:.0f} ms per hash"
+    )
+    values = params.as_settings()
+    if args.dry_run:
+        for key, value in values.items():
+            print(f"{key}={value}")
+        return 0
+    write_env(args.env_file, values)
+    print(f"Wrote {', '.join(values)} to {args.env_file}; existing hashes are upgraded on next login")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Task Management API management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="apply additive schema changes")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="list changes without applying them")
+    migrate_parser.set_defaults(handler=migrate)
+
+    check_parser = commands.add_parser("check", help="exit 1 unless the schema matches the models")
+    check_parser.set_defaults(handler=check)
+
+    serve_parser = commands.add_parser("serve", help="run the pre-fork multi-worker server")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    serve_parser.add_argument("--graceful-timeout", type=float, default=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS)
+    serve_parser.add_argument("--log-level", default="info")
+    serve_parser.set_defaults(handler=serve)
+
+    calibrate_parser = commands.add_parser("calibrate", help="pick Argon2 cost for a target latency on this host")
+    calibrate_parser.add_argument("--target-ms", type=float, default=250, help="target latency of one hash or verify")
+    calibrate_parser.add_argument("--max-memory-mib", type=int, default=64, help="memory cost ceiling")
+    calibrate_parser.add_argument("--parallelism", type=int, default=settings.PASSWORD_HASH_PARALLELISM)
+    calibrate_parser.add_argument("--env-file", default=".env")
+    calibrate_parser.add_argument("--dry-run", action="store_true", help="print the settings instead of writing them")
+    calibrate_parser.set_defaults(handler=calibrate)
+
+    reconcile_parser = commands.add_parser("reconcile", help="rebuild per-user item counters from the items table")
+    reconcile_parser.add_argument("--dry-run", action="store_true", help="report drift without correcting it (exit 1 on drift)")
+    reconcile_parser.set_defaults(handler=reconcile)
+
+    sweep_parser = commands.add_parser("sweep-idempotency", help="delete expired Idempotency-Key responses")
+    sweep_parser.add_argument("--batch-size", type=int, default=settings.IDEMPOTENCY_SWEEP_BATCH, help="rows per DELETE")
+    sweep_parser.set_defaults(handler=sweep_idempotency)
+
+    refresh_sweep_parser = commands.add_parser(
+        "sweep-refresh-tokens", help="delete expired, revoked and long-used refresh tokens"
+    )
+    refresh_sweep_parser.add_argument("--batch-size", type=int, default=1000, help="rows per DELETE")
+    refresh_sweep_parser.set_defaults(handler=sweep_refresh_tokens)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
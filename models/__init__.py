@@ -1,4 +1,7 @@
 from .user import User
 from .item import Item
+from .item_stats import ItemStats
+from .refresh_token import RefreshToken
+from .idempotency_key import IdempotencyKey
 
-__all__ = ["User", "Item"]
\ No newline at end of file
+__all__ = ["User", "Item", "ItemStats", "RefreshToken", "IdempotencyKey"]
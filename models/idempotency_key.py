@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+from core.database import Base
+
+class IdempotencyKey(Base):
+    """First response to a request sent with an Idempotency-Key, replayed to its retries"""
+    __tablename__ = "idempotency_keys"
+
+    # SHA-256 of the token subject and the client's key, so keys are per user
+    key_hash = Column(LargeBinary, primary_key=True)
+    # SHA-256 of method, path, query and body; a retry must send the same request
+    fingerprint = Column(LargeBinary, nullable=False)
+    # NULL while the first request is still executing
+    status_code = Column(Integer, nullable=True)
+    # JSON list of the [name, value] response headers worth replaying
+    headers = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    # A pending claim expires after IDEMPOTENCY_LOCK_SECONDS, a stored response
+    # after IDEMPOTENCY_TTL_SECONDS; expired rows are swept
+    expires_at = Column(DateTime, nullable=False, index=True)
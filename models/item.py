@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, DDL, event
 from sqlalchemy.orm import relationship
 from core.database import Base
 
@@ -9,5 +9,38 @@ class Item(Base):
     title = Column(String, index=True, nullable=False)
     description = Column(String, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Bumped on every ORM update; drives ETags and optimistic concurrency
+    version = Column(Integer, nullable=False, server_default="1")
 
-    owner = relationship("User", back_populates="items")
\ No newline at end of file
+    owner = relationship("User", back_populates="items")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        # Keyset pagination: WHERE owner_id = ? AND id > ? ORDER BY id
+        Index("ix_items_owner_id_id", "owner_id", "id"),
+    )
+
+# SQLite FTS5 index over title/description, kept in sync by triggers so that
+# ORM, bulk and raw SQL writes are all covered
+ITEMS_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        title, description, content='items', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF title, description ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO items_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+for statement in ITEMS_FTS_DDL:
+    event.listen(Item.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Item.__table__, "before_drop", DDL("DROP TABLE IF EXISTS items_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, ForeignKey, Integer
+from core.database import Base
+
+class ItemStats(Base):
+    """Per-owner item aggregates, updated in the same transaction as item writes"""
+    __tablename__ = "item_stats"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    item_count = Column(Integer, nullable=False, server_default="0")
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from core.database import Base
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Every token rotated from one login shares a family; a replayed token
+    # revokes the whole family
+    family = Column(String, nullable=False, index=True)
+    # SHA-256 hex digest; the token itself is never stored
+    token_hash = Column(String, nullable=False, unique=True)
+    # Compared with users.created_at; NULL for tokens that predate the column
+    issued_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=False)
+    # Set when the token is exchanged; a second exchange is a reuse
+    used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
 from core.database import Base
 
@@ -10,5 +11,12 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     full_name = Column(String, nullable=True)
     hashed_password = Column(String, nullable=False)
+    # Bumped on every ORM update; drives ETags and optimistic concurrency
+    version = Column(Integer, nullable=False, server_default="1")
+    # Refresh tokens issued before this are refused: SQLite reuses the id of
+    # a deleted last user. NULL for users that predate the column.
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow)
 
-    items = relationship("Item", back_populates="owner")
\ No newline at end of file
+    items = relationship("Item", back_populates="owner")
+
+    __mapper_args__ = {"version_id_col": version}
\ No newline at end of file
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+from typing import List
 
 class ItemBase(BaseModel):
     title: str
@@ -12,4 +13,35 @@ class Item(ItemBase):
     owner_id: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        from_attributes = True
+
+# Built once at import; validates row tuples and dumps JSON bytes in Rust
+ItemListAdapter = TypeAdapter(List[Item])
+
+class ItemStats(BaseModel):
+    """Aggregates of one owner's items"""
+    owner_id: int
+    item_count: int
+
+class ItemBatchRequest(BaseModel):
+    """Body of POST /items/batch"""
+    ids: List[int]
+
+class ItemBatch(BaseModel):
+    """Items found for a batch fetch, in request order, and the ids that were not"""
+    items: List[Item]
+    missing: List[int]
+
+class ItemBulkUpdate(ItemBase):
+    id: int
+
+class ItemBulkDelete(BaseModel):
+    ids: List[int]
+
+class BulkItemResult(BaseModel):
+    """Outcome of one element of a bulk request, in request order"""
+    index: int
+    id: int | None = None
+    status: int
+    detail: str | None = None
+    item: Item | None = None
\ No newline at end of file
@@ -31,6 +31,11 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class UserBatch(BaseModel):
+    """Profiles found for a batch lookup, in request order, and the ids that were not"""
+    users: list[User]
+    missing: list[int]
+
 class LoginSchema(BaseModel):
     email: EmailStr
     password: str
@@ -39,6 +44,11 @@ class Token(BaseModel):
     """OAuth2 token response"""
     access_token: str
     token_type: str = "bearer"
+    refresh_token: str | None = None
+
+class RefreshRequest(BaseModel):
+    """Body of /auth/refresh and /auth/logout"""
+    refresh_token: str
 
 class TokenData(BaseModel):
     """JWT token payload"""
@@ -4,77 +4,127 @@ Provides test database, client, and authenticated users
 """
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.pool import StaticPool
 
-from core.database import Base, get_db
+from core.admission import auth_admission
+from core.config import settings
+from core.database import Base, get_async_db
+from core.idempotency import idempotency_store
+from core.security import principal_cache, token_cache
+from crud.user import profile_cache
 from main import app
 
+# Tests build their schema on the test engine below, never on DATABASE_URL
+settings.SCHEMA_CHECK_ON_STARTUP = False
+
 # Test database URL (in-memory SQLite)
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 # Create test engine with in-memory database
-engine = create_engine(
+engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,  # Reuse same connection for all tests
 )
 
 # Create SessionLocal for tests
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+# The Idempotency-Key middleware opens its own sessions, outside get_async_db
+idempotency_store.session_factory = TestingSessionLocal
 
 
-@pytest.fixture(scope="function")
-def db_session():
-    """
-    Create a fresh database for each test
-    
-    Yields:
-        Session: Database session
-    """
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-    
-    # Create session
-    session = TestingSessionLocal()
-    
-    try:
+async def create_tables():
+    """Create all tables on the test engine"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def drop_tables():
+    """Drop all tables and release the shared test connection"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    # The aiosqlite connection is tied to this test's event loop
+    await engine.dispose()
+
+
+async def override_get_db():
+    """Test database session, one per request like the real dependency"""
+    async with TestingSessionLocal() as session:
         yield session
-    finally:
-        session.close()
-        # Drop all tables after test
-        Base.metadata.drop_all(bind=engine)
 
 
 @pytest.fixture(scope="function")
-def client(db_session):
+def client():
     """
-    Create test client with overridden database dependency
+    Create test client with a fresh database and overridden database dependency
     
-    Args:
-        db_session: Test database session
+    Tables are created and dropped on the TestClient's own event loop,
+    the same loop that serves requests, so the shared aiosqlite
+    connection never crosses loops.
     
     Yields:
         TestClient: FastAPI test client
     """
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
-    
     # Override dependency
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_db
+    # Cached principals would outlive this test's database
+    principal_cache.clear()
+    token_cache.clear()
+    profile_cache.clear()
+    auth_admission.reset()
     
     # Create test client
     with TestClient(app) as test_client:
-        yield test_client
+        test_client.portal.call(create_tables)
+        try:
+            yield test_client
+        finally:
+            test_client.portal.call(drop_tables)
     
     # Clear overrides
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def run_db(client):
+    """
+    Run ``await fn(session)`` against the test database on the client's loop
+    
+    Returns:
+        callable: run(fn) -> result of fn
+    """
+    def run(fn):
+        async def _run():
+            async with TestingSessionLocal() as session:
+                return await fn(session)
+        return client.portal.call(_run)
+    return run
+
+
+@pytest.fixture
+def concurrent_write():
+    """
+    Simulate another request committing between a handler's read and its flush
+    
+    Returns:
+        callable: arm(sql) runs ``sql`` once, just before the next ORM flush
+    """
+    pending = []
+
+    def before_flush(session, flush_context, instances):
+        while pending:
+            session.connection().execute(text(pending.pop()))
+
+    event.listen(Session, "before_flush", before_flush)
+    try:
+        yield pending.append
+    finally:
+        event.remove(Session, "before_flush", before_flush)
+
+
 @pytest.fixture
 def test_user_data():
     """Test user credentials"""
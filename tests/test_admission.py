@@ -0,0 +1,117 @@
+"""
+Test admission control on the auth endpoints
+"""
+from core.admission import HashedTokenBuckets, auth_admission
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHashedTokenBuckets:
+    """Test the fixed-size token bucket table"""
+
+    def test_burst_then_refill(self):
+        """Test a key gets its burst, is refused, then refills at the rate"""
+        clock = FakeClock()
+        buckets = HashedTokenBuckets(slots=64, rate=2, burst=3, clock=clock)
+
+        assert [buckets.take("a") for _ in range(3)] == [0, 0, 0]
+        assert buckets.take("a") == 0.5
+
+        clock.now += 0.5
+        assert buckets.take("a") == 0
+        assert buckets.take("a") > 0
+
+    def test_keys_are_independent(self):
+        """Test exhausting one key leaves another key's bucket full"""
+        buckets = HashedTokenBuckets(slots=1 << 16, rate=1, burst=1, clock=FakeClock())
+
+        assert buckets.take("first") == 0
+        assert buckets.take("first") > 0
+        assert buckets.take("second") == 0
+
+    def test_memory_is_bounded(self):
+        """Test many distinct keys fit in the fixed slot arrays"""
+        buckets = HashedTokenBuckets(slots=128, rate=1, burst=1, clock=FakeClock())
+        for n in range(10_000):
+            buckets.take(f"client-{n}")
+
+        assert len(buckets._tokens) == len(buckets._stamps) == 128
+
+
+class TestAuthAdmission:
+    """Test 429 responses from the auth router"""
+
+    def test_account_limit(self, client, test_user, test_user_data):
+        """Test repeated logins to one account are refused with Retry-After"""
+        login = {"username": test_user_data["email"], "password": "wrong1"}
+        statuses = [
+            client.post("/api/v1/auth/login", data=login).status_code
+            for _ in range(auth_admission.accounts.burst + 1)
+        ]
+
+        # Registration already spent one token of this account's bucket
+        assert statuses[-2:] == [429, 429]
+        assert set(statuses[:-2]) == {401}
+        response = client.post("/api/v1/auth/login", data=login)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+    def test_account_key_is_case_insensitive(self, client, test_user, test_user_data):
+        """Test varying the email's case does not reset the account bucket"""
+        for n in range(auth_admission.accounts.burst - 1):
+            email = test_user_data["email"].upper() if n % 2 else test_user_data["email"]
+            client.post("/api/v1/auth/login", data={"username": email, "password": "wrong1"})
+
+        response = client.post("/api/v1/auth/login", data={"username": "TEST@example.com", "password": "wrong1"})
+
+        assert response.status_code == 429
+
+    def test_client_limit(self, client):
+        """Test one client address is limited across different accounts"""
+        statuses = [
+            client.post("/api/v1/auth/login", data={"username": f"u{n}@example.com", "password": "wrong1"}).status_code
+            for n in range(auth_admission.clients.burst + 1)
+        ]
+
+        assert statuses[-1] == 429
+        assert set(statuses[:-1]) == {401}
+
+    def test_concurrency_cap(self, client, test_user_data):
+        """Test requests beyond the in-flight cap are refused without hashing"""
+        auth_admission.in_flight = auth_admission.max_concurrent
+        try:
+            response = client.post("/api/v1/auth/register", json=test_user_data)
+        finally:
+            auth_admission.in_flight = 0
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        assert client.post("/api/v1/auth/register", json=test_user_data).status_code == 200
+
+    def test_item_traffic_is_not_limited(self, client, auth_headers):
+        """Test item requests pass while auth is saturated"""
+        auth_admission.in_flight = auth_admission.max_concurrent
+        try:
+            responses = [client.get("/api/v1/items/", headers=auth_headers) for _ in range(30)]
+        finally:
+            auth_admission.in_flight = 0
+
+        assert {response.status_code for response in responses} == {200}
+
+    def test_rejections_are_counted(self, client):
+        """Test /metrics reports rejections by reason"""
+        auth_admission.in_flight = auth_admission.max_concurrent
+        try:
+            client.post("/api/v1/auth/login", data={"username": "a@example.com", "password": "wrong1"})
+        finally:
+            auth_admission.in_flight = 0
+
+        body = client.get("/metrics").text
+
+        assert 'auth_admission_rejected_total{reason="concurrency"}' in body
@@ -2,6 +2,10 @@
 Test authentication endpoints (register, login)
 """
 import pytest
+from datetime import timedelta
+from jose import JWTError
+
+from core.security import create_access_token, decode_access_token, token_cache
 
 
 class TestRegister:
@@ -108,6 +112,191 @@ class TestLogin:
         
         assert response.status_code == 422
 
+    
+    def test_login_upgrades_outdated_hash(self, client, test_user_data, test_user, run_db, monkeypatch):
+        """Test a hash made with older Argon2 parameters is replaced on login"""
+        from sqlalchemy import select
+        from core.config import settings
+        from core.security import _password_hasher, needs_rehash
+        from models.user import User
+        
+        async def stored_hash(session):
+            return (await session.execute(select(User.hashed_password))).scalar_one()
+        
+        monkeypatch.setattr(settings, "PASSWORD_HASH_TIME_COST", settings.PASSWORD_HASH_TIME_COST + 1)
+        _password_hasher.cache_clear()
+        try:
+            old_hash = run_db(stored_hash)
+            assert needs_rehash(old_hash)
+            
+            response = client.post("/api/v1/auth/login", data={
+                "username": test_user_data["email"],
+                "password": test_user_data["password"]
+            })
+            new_hash = run_db(stored_hash)
+        finally:
+            monkeypatch.undo()
+            _password_hasher.cache_clear()
+        
+        assert response.status_code == 200
+        assert new_hash != old_hash
+        assert f"t={settings.PASSWORD_HASH_TIME_COST + 1}," in new_hash
+        me = client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {response.json()['access_token']}"})
+        assert me.json()["email"] == test_user_data["email"]
+
+
+class TestRefreshToken:
+    """Test rotating refresh tokens"""
+    
+    @pytest.fixture
+    def tokens(self, client, test_user_data, test_user):
+        response = client.post("/api/v1/auth/login", data={
+            "username": test_user_data["email"],
+            "password": test_user_data["password"]
+        })
+        return response.json()
+    
+    def refresh(self, client, refresh_token):
+        return client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+    
+    def test_refresh_rotates(self, client, tokens):
+        """Test a refresh returns a working access token and a new refresh token"""
+        response = self.refresh(client, tokens["refresh_token"])
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["refresh_token"] != tokens["refresh_token"]
+        me = client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {data['access_token']}"})
+        assert me.json()["email"] == "test@example.com"
+        assert self.refresh(client, data["refresh_token"]).status_code == 200
+    
+    def test_refresh_skips_argon2(self, client, tokens):
+        """Test refreshing never runs a password verify"""
+        from core.hashing import hashing_pool
+        verifies = hashing_pool.timings["verify"].count
+        
+        for _ in range(3):
+            tokens = self.refresh(client, tokens["refresh_token"]).json()
+        
+        assert hashing_pool.timings["verify"].count == verifies
+    
+    def test_only_digest_is_stored(self, client, tokens, run_db):
+        """Test the database holds the SHA-256 digest, not the token"""
+        from sqlalchemy import select
+        from crud.refresh_token import digest
+        from models.refresh_token import RefreshToken
+        
+        async def stored(session):
+            return (await session.execute(select(RefreshToken.token_hash))).scalars().all()
+        
+        assert run_db(stored) == [digest(tokens["refresh_token"])]
+    
+    def test_reuse_revokes_family(self, client, tokens):
+        """Test replaying a used token revokes its successor too"""
+        successor = self.refresh(client, tokens["refresh_token"]).json()["refresh_token"]
+        
+        assert self.refresh(client, tokens["refresh_token"]).status_code == 401
+        assert self.refresh(client, successor).status_code == 401
+    
+    def test_unknown_token(self, client):
+        """Test a made-up refresh token is rejected"""
+        assert self.refresh(client, "not-a-token").status_code == 401
+    
+    def test_expired_token(self, client, tokens, run_db):
+        """Test an expired refresh token is rejected"""
+        from datetime import datetime
+        from sqlalchemy import update
+        from models.refresh_token import RefreshToken
+        
+        async def expire(session):
+            await session.execute(update(RefreshToken).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+            await session.commit()
+        
+        run_db(expire)
+        
+        assert self.refresh(client, tokens["refresh_token"]).status_code == 401
+    
+    def test_logout_revokes(self, client, tokens):
+        """Test logout revokes the refresh token"""
+        response = client.post("/api/v1/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+        
+        assert response.status_code == 204
+        assert self.refresh(client, tokens["refresh_token"]).status_code == 401
+    
+    def test_other_family_unaffected(self, client, tokens, test_user_data):
+        """Test reuse in one login's family leaves another login's tokens valid"""
+        other = client.post("/api/v1/auth/login", data={
+            "username": test_user_data["email"],
+            "password": test_user_data["password"]
+        }).json()
+        self.refresh(client, tokens["refresh_token"])
+        self.refresh(client, tokens["refresh_token"])
+        
+        assert self.refresh(client, other["refresh_token"]).status_code == 200
+    
+    def test_deleted_account_cannot_be_refreshed_into(self, client, tokens):
+        """Test a deleted user's token does not work for the next user given the same id"""
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        old_id = client.get("/api/v1/users/me", headers=headers).json()["id"]
+        assert client.delete("/api/v1/users/me", headers=headers).status_code == 204
+        newcomer = {"email": "b@example.com", "password": "b-pass1"}
+        client.post("/api/v1/auth/register", json=newcomer)
+        access = client.post("/api/v1/auth/login", data={
+            "username": newcomer["email"], "password": newcomer["password"]
+        }).json()["access_token"]
+        assert client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {access}"}).json()["id"] == old_id
+        
+        assert self.refresh(client, tokens["refresh_token"]).status_code == 401
+    
+    def test_token_older_than_user(self, client, tokens, run_db):
+        """Test a token issued before its user row was created is refused"""
+        from datetime import datetime
+        from sqlalchemy import update
+        from models.user import User
+        
+        async def recreate(session):
+            await session.execute(update(User).values(created_at=datetime.utcnow() + timedelta(seconds=1)))
+            await session.commit()
+        
+        run_db(recreate)
+        
+        assert self.refresh(client, tokens["refresh_token"]).status_code == 401
+
+
+class TestRefreshTokenSweep:
+    """Test deleting refresh tokens no exchange can use"""
+    
+    def test_sweep(self, tmp_path):
+        """Test expired, revoked and long-used tokens go; live and recently used ones stay"""
+        from datetime import datetime
+        from sqlalchemy import create_engine, insert, select
+        from core.database import Base
+        from crud.refresh_token import sweep
+        from models.refresh_token import RefreshToken
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'sweep.db'}")
+        Base.metadata.create_all(engine)
+        now = datetime.utcnow()
+        later = now + timedelta(days=1)
+        rows = {
+            "expired": {"expires_at": now - timedelta(seconds=1)},
+            "revoked": {"expires_at": later, "revoked_at": now},
+            "used long ago": {"expires_at": later, "used_at": now - timedelta(days=8)},
+            "used recently": {"expires_at": later, "used_at": now - timedelta(days=1)},
+            "live": {"expires_at": later},
+        }
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(RefreshToken), [
+                    {"user_id": 1, "family": "f", "token_hash": name, "used_at": None, "revoked_at": None, **values}
+                    for name, values in rows.items()
+                ])
+                
+                assert sweep(conn, batch_size=2) == 3
+                assert sorted(conn.execute(select(RefreshToken.token_hash)).scalars()) == ["live", "used recently"]
+        finally:
+            engine.dispose()
+
 
 class TestTokenValidation:
     """Test JWT token validation"""
@@ -130,6 +319,37 @@ class TestTokenValidation:
         assert response.status_code == 401
 
 
+class TestTokenCache:
+    """Test memoization of verified JWT claims"""
+    
+    def test_repeated_decode_hits_cache(self, client):
+        """Test a token is verified once and then served from the cache"""
+        token = create_access_token({"sub": "cache@example.com"})
+        
+        first = decode_access_token(token)
+        hits = token_cache.hits
+        second = decode_access_token(token)
+        
+        assert second == first
+        assert token_cache.hits == hits + 1
+        assert token not in token_cache._data  # keyed by digest, not the raw token
+    
+    def test_expired_token_is_not_cached(self, client):
+        """Test an expired token is rejected and never stored"""
+        token = create_access_token({"sub": "old@example.com"}, expires_delta=timedelta(minutes=-1))
+        
+        with pytest.raises(JWTError):
+            decode_access_token(token)
+        assert len(token_cache) == 0
+    
+    def test_invalid_token_is_not_cached(self, client):
+        """Test an invalid token is rejected on every use"""
+        for _ in range(2):
+            response = client.get("/api/v1/users/me", headers={"Authorization": "Bearer invalid-token"})
+            assert response.status_code == 401
+        assert len(token_cache) == 0
+
+
 class TestAuthFlow:
     """Test complete authentication flow"""
     
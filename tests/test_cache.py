@@ -0,0 +1,81 @@
+"""
+Test in-process caches
+"""
+import pytest
+
+from core.cache import TTLCache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestTTLCache:
+    """Test TTLCache expiry, LRU eviction and counters"""
+    
+    def test_hit_and_miss(self, clock):
+        """Test hits and misses are counted"""
+        cache = TTLCache(max_size=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_entry_expires(self, clock):
+        """Test entries are dropped once their TTL has passed"""
+        cache = TTLCache(max_size=2, ttl=10, clock=clock)
+        cache.set("a", 1, ttl=5)
+        
+        clock.now = 5
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+        assert len(cache) == 0
+    
+    def test_ttl_cannot_exceed_default(self, clock):
+        """Test a per-entry TTL only shortens the cache-wide TTL"""
+        cache = TTLCache(max_size=2, ttl=10, clock=clock)
+        cache.set("a", 1, ttl=100)
+        
+        clock.now = 10
+        assert cache.get("a") is None
+    
+    def test_non_positive_ttl_not_stored(self, clock):
+        """Test an already-expired entry is never stored"""
+        cache = TTLCache(max_size=2, ttl=10, clock=clock)
+        cache.set("a", 1, ttl=-1)
+        assert len(cache) == 0
+    
+    def test_lru_eviction(self, clock):
+        """Test the least recently used entry is evicted first"""
+        cache = TTLCache(max_size=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.evictions == 1
+    
+    def test_invalidate(self, clock):
+        """Test explicit invalidation removes the entry"""
+        cache = TTLCache(max_size=2, ttl=10, clock=clock)
+        cache.set("a", 1)
+        cache.invalidate("a")
+        cache.invalidate("missing")
+        
+        assert cache.get("a") is None
+        assert cache.invalidations == 1
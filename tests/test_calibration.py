@@ -0,0 +1,64 @@
+"""
+Test Argon2 cost calibration and the settings it writes
+"""
+from core.calibration import MAX_TIME_COST, MIN_MEMORY_KIB, calibrate
+from manage import write_env
+
+
+def model(ms_per_pass_per_mib: float):
+    """Fake measurement: latency grows with time cost and memory"""
+    calls = []
+
+    def measure(time_cost, memory_cost, parallelism):
+        calls.append((time_cost, memory_cost))
+        return time_cost * memory_cost / 1024 * ms_per_pass_per_mib / 1000
+    measure.calls = calls
+    return measure
+
+
+class TestCalibrate:
+    """Test the parameter search"""
+    
+    def test_keeps_memory_and_raises_time_cost(self):
+        """Test a fast host keeps the memory ceiling and gets more passes"""
+        params = calibrate(0.25, 64 * 1024, 4, measure=model(1.0))
+        
+        assert params.memory_cost == 64 * 1024
+        assert params.time_cost == 3
+        assert params.seconds <= 0.25
+    
+    def test_halves_memory_on_slow_host(self):
+        """Test memory drops until a single pass fits the target"""
+        params = calibrate(0.25, 64 * 1024, 4, measure=model(10.0))
+        
+        assert params.memory_cost == 16 * 1024
+        assert params.time_cost == 1
+    
+    def test_bounds(self):
+        """Test the search stops at the time cost cap and memory floor"""
+        assert calibrate(100, 1024, 1, measure=model(0.001)).time_cost == MAX_TIME_COST
+        params = calibrate(0.001, 64 * 1024, 1, measure=model(1000.0))
+        assert (params.time_cost, params.memory_cost) == (1, MIN_MEMORY_KIB)
+    
+    def test_as_settings(self):
+        """Test parameters map onto the PASSWORD_HASH_* settings"""
+        params = calibrate(0.25, 64 * 1024, 2, measure=model(1.0))
+        
+        assert params.as_settings() == {
+            "PASSWORD_HASH_TIME_COST": "3",
+            "PASSWORD_HASH_MEMORY_COST": "65536",
+            "PASSWORD_HASH_PARALLELISM": "2",
+        }
+
+
+class TestWriteEnv:
+    """Test the .env update done by manage.py calibrate"""
+    
+    def test_replaces_and_appends(self, tmp_path):
+        """Test existing keys are replaced in place and others kept"""
+        path = tmp_path / ".env"
+        path.write_text("SECRET_KEY=abc\nPASSWORD_HASH_TIME_COST=3\n")
+        
+        write_env(str(path), {"PASSWORD_HASH_TIME_COST": "5", "PASSWORD_HASH_MEMORY_COST": "32768"})
+        
+        assert path.read_text() == "SECRET_KEY=abc\nPASSWORD_HASH_TIME_COST=5\nPASSWORD_HASH_MEMORY_COST=32768\n"
@@ -0,0 +1,32 @@
+"""
+Test ETag helpers
+"""
+from core.etag import if_match, if_none_match, make_etag, make_list_etag
+
+
+class TestETagHelpers:
+    """Test conditional header matching"""
+    
+    def test_if_none_match_weak_comparison(self):
+        """Test weak validators and lists match If-None-Match"""
+        etag = make_etag("item", 1, 2)
+        assert if_none_match(etag, etag)
+        assert if_none_match(f'"other", W/{etag}', etag)
+        assert if_none_match("*", etag)
+        assert not if_none_match(None, etag)
+        assert not if_none_match('"other"', etag)
+    
+    def test_if_match_strong_comparison(self):
+        """Test If-Match uses strong comparison and passes when absent"""
+        etag = make_etag("item", 1, 2)
+        assert if_match(None, etag)
+        assert if_match(etag, etag)
+        assert if_match("*", etag)
+        assert not if_match(f"W/{etag}", etag)
+    
+    def test_list_etag_depends_on_versions_and_order(self):
+        """Test list ETags change with any version or ordering change"""
+        base = make_list_etag("items", [(1, 1), (2, 1)])
+        assert make_list_etag("items", [(1, 1), (2, 1)]) == base
+        assert make_list_etag("items", [(1, 1), (2, 2)]) != base
+        assert make_list_etag("items", [(2, 1), (1, 1)]) != base
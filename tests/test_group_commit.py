@@ -0,0 +1,256 @@
+"""
+Test the group-commit writer and item writes routed through it
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from core import group_commit, metrics
+from core.config import settings
+from core.database import Base, get_async_db
+from core.group_commit import GroupCommitWriter, enable_savepoints
+from main import app
+from models.item import Item
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """Build a file-backed async engine with savepoint support and the schema"""
+    def make():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'group.db'}")
+        enable_savepoints(engine.sync_engine)
+        return engine
+    return make
+
+
+async def create_schema(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def count_items(engine) -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(select(func.count()).select_from(Item))).scalar()
+
+
+def add_item(title: str):
+    async def op(session):
+        item = Item(title=title)
+        session.add(item)
+        await session.flush()
+        return item.id
+    return op
+
+
+class TestGroupCommitWriter:
+    """Test batching, isolation and acknowledgement"""
+
+    def test_concurrent_ops_share_one_commit(self, make_engine):
+        """Test ops submitted together are committed in one transaction"""
+        async def scenario():
+            engine = make_engine()
+            await create_schema(engine)
+            commits = []
+            event.listen(engine.sync_engine, "commit", lambda conn: commits.append(1))
+            writer = GroupCommitWriter(async_sessionmaker(engine, expire_on_commit=False), max_delay=0.05, max_batch=64)
+            try:
+                ids = await asyncio.gather(*(writer.submit(add_item(f"t{n}")) for n in range(20)))
+                return ids, len(commits), await count_items(engine)
+            finally:
+                await writer.close()
+                await engine.dispose()
+
+        ids, commits, rows = asyncio.run(scenario())
+
+        assert len(set(ids)) == 20
+        assert commits == 1
+        assert rows == 20
+
+    def test_max_batch(self, make_engine):
+        """Test a batch never exceeds the configured size"""
+        async def scenario():
+            engine = make_engine()
+            await create_schema(engine)
+            commits = []
+            event.listen(engine.sync_engine, "commit", lambda conn: commits.append(1))
+            writer = GroupCommitWriter(async_sessionmaker(engine, expire_on_commit=False), max_delay=0.05, max_batch=4)
+            try:
+                await asyncio.gather(*(writer.submit(add_item(f"t{n}")) for n in range(10)))
+                return len(commits)
+            finally:
+                await writer.close()
+                await engine.dispose()
+
+        assert asyncio.run(scenario()) == 3
+
+    def test_failure_is_isolated(self, make_engine):
+        """Test a failing op is rolled back alone and gets its own exception"""
+        async def failing(session):
+            session.add(Item(title="rolled back"))
+            await session.flush()
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        async def scenario():
+            engine = make_engine()
+            await create_schema(engine)
+            writer = GroupCommitWriter(async_sessionmaker(engine, expire_on_commit=False), max_delay=0.05)
+            try:
+                results = await asyncio.gather(
+                    writer.submit(add_item("a")), writer.submit(failing), writer.submit(add_item("b")),
+                    return_exceptions=True,
+                )
+                async with engine.connect() as conn:
+                    titles = (await conn.execute(select(Item.title).order_by(Item.id))).scalars().all()
+                return results, titles
+            finally:
+                await writer.close()
+                await engine.dispose()
+
+        results, titles = asyncio.run(scenario())
+
+        assert isinstance(results[1], HTTPException) and results[1].status_code == 404
+        assert isinstance(results[0], int) and isinstance(results[2], int)
+        assert titles == ["a", "b"]
+
+    def test_commit_failure_fails_whole_batch(self, make_engine):
+        """Test no op is acknowledged when the shared commit fails"""
+        async def scenario():
+            engine = make_engine()
+            await create_schema(engine)
+
+            def fail(conn):
+                raise RuntimeError("disk full")
+            event.listen(engine.sync_engine, "commit", fail)
+            writer = GroupCommitWriter(async_sessionmaker(engine, expire_on_commit=False), max_delay=0.05)
+            try:
+                results = await asyncio.gather(
+                    *(writer.submit(add_item(f"t{n}")) for n in range(3)), return_exceptions=True
+                )
+                event.remove(engine.sync_engine, "commit", fail)
+                return results, await count_items(engine)
+            finally:
+                await writer.close()
+                await engine.dispose()
+
+        results, rows = asyncio.run(scenario())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert rows == 0
+
+    def test_acknowledged_after_commit(self, make_engine):
+        """Test the row is visible to other connections as soon as submit returns"""
+        async def scenario():
+            engine = make_engine()
+            await create_schema(engine)
+            writer = GroupCommitWriter(async_sessionmaker(engine, expire_on_commit=False), max_delay=0.01)
+            try:
+                await writer.submit(add_item("durable"))
+                return await count_items(engine)
+            finally:
+                await writer.close()
+                await engine.dispose()
+
+        assert asyncio.run(scenario()) == 1
+
+    def test_runs_outside_submitter_context(self, make_engine):
+        """Test ops do not see the context variables of the request that started the writer"""
+        from core import instrumentation
+        
+        async def seen(session):
+            return instrumentation.current_stats()
+        
+        async def scenario():
+            engine = make_engine()
+            await create_schema(engine)
+            writer = GroupCommitWriter(async_sessionmaker(engine, expire_on_commit=False), max_delay=0.01)
+            token = instrumentation._current.set(instrumentation.QueryStats())
+            try:
+                return await writer.submit(seen)
+            finally:
+                instrumentation._current.reset(token)
+                await writer.close()
+                await engine.dispose()
+        
+        assert asyncio.run(scenario()) is None
+
+    def test_close_commits_queued_ops(self, make_engine):
+        """Test closing the writer finishes every op already submitted"""
+        async def scenario():
+            engine = make_engine()
+            await create_schema(engine)
+            writer = GroupCommitWriter(async_sessionmaker(engine, expire_on_commit=False), max_delay=0.05, max_batch=2)
+            try:
+                pending = [asyncio.ensure_future(writer.submit(add_item(f"t{n}"))) for n in range(5)]
+                await asyncio.sleep(0)
+                await writer.close()
+                return [task.done() for task in pending], await count_items(engine)
+            finally:
+                await engine.dispose()
+
+        done, rows = asyncio.run(scenario())
+
+        assert all(done)
+        assert rows == 5
+
+
+class TestGroupCommitEndpoints:
+    """Test the item endpoints with GROUP_COMMIT_ENABLED"""
+
+    @pytest.fixture
+    def group_client(self, client, make_engine, tmp_path, monkeypatch):
+        """Requests read through a plain engine; the writer has its own, like in production"""
+        writer_engine = client.portal.call(self._engine, make_engine)
+        request_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'group.db'}")
+        sessions = async_sessionmaker(request_engine, autoflush=False, expire_on_commit=False)
+
+        async def override_get_db():
+            async with sessions() as session:
+                yield session
+
+        app.dependency_overrides[get_async_db] = override_get_db
+        monkeypatch.setattr(settings, "GROUP_COMMIT_ENABLED", True)
+        writer = GroupCommitWriter(async_sessionmaker(writer_engine, expire_on_commit=False), max_delay=0.001)
+        monkeypatch.setattr(group_commit, "group_writer", writer)
+        try:
+            yield client
+        finally:
+            client.portal.call(writer.close)
+            client.portal.call(writer_engine.dispose)
+            client.portal.call(request_engine.dispose)
+
+    @staticmethod
+    async def _engine(make_engine):
+        engine = make_engine()
+        await create_schema(engine)
+        return engine
+
+    @pytest.fixture
+    def headers(self, group_client, test_user_data):
+        group_client.post("/api/v1/auth/register", json=test_user_data)
+        token = group_client.post("/api/v1/auth/login", data={
+            "username": test_user_data["email"], "password": test_user_data["password"]
+        }).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_create_update_delete(self, group_client, headers):
+        """Test each write endpoint behaves the same through the writer"""
+        batches = metrics.group_commit_batch_size.count()
+        item = group_client.post("/api/v1/items/", json={"title": "Grouped"}, headers=headers)
+        assert item.status_code == 201
+        item_id = item.json()["id"]
+
+        updated = group_client.put(f"/api/v1/items/{item_id}", json={"title": "Regrouped"}, headers=headers)
+        assert updated.status_code == 200
+        assert updated.json()["title"] == "Regrouped"
+        stale = group_client.put(
+            f"/api/v1/items/{item_id}", json={"title": "x"}, headers={**headers, "If-Match": item.headers.get("ETag", '"0"')}
+        )
+        assert stale.status_code == 412
+
+        assert group_client.delete(f"/api/v1/items/{item_id}", headers=headers).status_code == 204
+        assert group_client.delete(f"/api/v1/items/{item_id}", headers=headers).status_code == 404
+        assert group_client.get("/api/v1/items/stats", headers=headers).json()["item_count"] == 0
+        assert metrics.group_commit_batch_size.count() - batches == 5
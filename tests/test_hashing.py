@@ -0,0 +1,92 @@
+"""
+Test the bounded Argon2 worker pool
+"""
+import asyncio
+import threading
+
+import pytest
+
+from core.hashing import HashingPool, PoolSaturatedError, hashing_pool
+from core.security import hash_password, verify_password
+
+
+class TestHashingPool:
+    """Test HashingPool admission and bookkeeping"""
+    
+    def test_run_records_timing(self):
+        """Test jobs run on the pool and are timed per label"""
+        pool = HashingPool(workers=1, max_queue=1)
+        
+        async def scenario():
+            hashed = await pool.run("hash", hash_password, "secret1")
+            return await pool.run("verify", verify_password, "secret1", hashed)
+        
+        try:
+            assert asyncio.run(scenario()) is True
+        finally:
+            pool.shutdown()
+        
+        stats = pool.stats()
+        assert stats["timings"]["hash"]["count"] == 1
+        assert stats["timings"]["verify"]["count"] == 1
+        assert stats["timings"]["hash"]["max_ms"] > 0
+        assert stats["in_flight"] == 0
+    
+    def test_rejects_when_full(self):
+        """Test jobs beyond workers + queue are rejected immediately"""
+        pool = HashingPool(workers=1, max_queue=1, retry_after=3)
+        release = threading.Event()
+        
+        async def scenario():
+            blocked = [asyncio.ensure_future(pool.run("hash", release.wait)) for _ in range(2)]
+            await asyncio.sleep(0)
+            assert pool.in_flight == 2
+            assert pool.queue_depth == 1
+            with pytest.raises(PoolSaturatedError) as exc_info:
+                await pool.run("hash", release.wait)
+            release.set()
+            await asyncio.gather(*blocked)
+            return exc_info.value
+        
+        try:
+            error = asyncio.run(scenario())
+        finally:
+            release.set()
+            pool.shutdown()
+        
+        assert error.retry_after == 3
+        assert pool.rejected == 1
+        assert pool.queue_depth == 0
+    
+    def test_unknown_executor(self):
+        """Test an unknown executor kind is refused"""
+        with pytest.raises(ValueError):
+            HashingPool(kind="fiber")
+
+
+class TestBackpressure:
+    """Test saturated pool maps to 503 on auth endpoints"""
+    
+    def test_login_returns_503_with_retry_after(self, client, test_user, test_user_data, monkeypatch):
+        """Test login is rejected fast when the pool is saturated"""
+        monkeypatch.setattr(hashing_pool, "_pending", hashing_pool.capacity)
+        
+        response = client.post("/api/v1/auth/login", data={
+            "username": test_user_data["email"],
+            "password": test_user_data["password"]
+        })
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(hashing_pool.retry_after)
+    
+    def test_register_returns_503(self, client, monkeypatch):
+        """Test registration is rejected fast when the pool is saturated"""
+        monkeypatch.setattr(hashing_pool, "_pending", hashing_pool.capacity)
+        
+        response = client.post("/api/v1/auth/register", json={
+            "email": "busy@example.com",
+            "password": "busy123"
+        })
+        
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
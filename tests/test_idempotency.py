@@ -0,0 +1,219 @@
+"""
+Test Idempotency-Key handling on item writes
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, func, insert, select, update
+from starlette.responses import JSONResponse
+
+from core import metrics
+from core.database import Base
+from core.idempotency import IdempotencyMiddleware, IdempotencyStore, _digest, sweep
+from main import app
+from models.idempotency_key import IdempotencyKey
+from models.item import Item
+from tests.conftest import TestingSessionLocal
+
+
+def count(run_db, model) -> int:
+    async def fn(session):
+        return (await session.execute(select(func.count()).select_from(model))).scalar()
+    return run_db(fn)
+
+
+class TestIdempotencyKey:
+    """Test replay, scoping and rejection through the item endpoints"""
+
+    def test_retry_replays_first_response(self, client, auth_headers, run_db):
+        """Test a retried create returns the stored response and adds no row"""
+        headers = {**auth_headers, "Idempotency-Key": "create-1"}
+        replays = metrics.idempotency_requests.value(("replayed",))
+
+        first = client.post("/api/v1/items/", json={"title": "Once"}, headers=headers)
+        retry = client.post("/api/v1/items/", json={"title": "Once"}, headers=headers)
+
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert count(run_db, Item) == 1
+        assert client.get("/api/v1/items/stats", headers=auth_headers).json()["item_count"] == 1
+        assert metrics.idempotency_requests.value(("replayed",)) - replays == 1
+
+    def test_replays_and_errors_carry_cors_headers(self, client, auth_headers):
+        """Test browser clients can read replays and the middleware's own errors"""
+        headers = {**auth_headers, "Idempotency-Key": "cors", "Origin": "https://app.example.com"}
+        
+        first = client.post("/api/v1/items/", json={"title": "Once"}, headers=headers)
+        replay = client.post("/api/v1/items/", json={"title": "Once"}, headers=headers)
+        mismatch = client.post("/api/v1/items/", json={"title": "Other"}, headers=headers)
+        
+        for response in (first, replay, mismatch):
+            assert response.headers["Access-Control-Allow-Origin"] == "*"
+        assert replay.headers["Idempotent-Replayed"] == "true"
+        assert mismatch.status_code == 422
+
+    def test_without_key_unchanged(self, client, auth_headers, run_db):
+        """Test requests without the header are never deduplicated"""
+        client.post("/api/v1/items/", json={"title": "Twice"}, headers=auth_headers)
+        client.post("/api/v1/items/", json={"title": "Twice"}, headers=auth_headers)
+
+        assert count(run_db, Item) == 2
+        assert count(run_db, IdempotencyKey) == 0
+
+    def test_reuse_with_different_request(self, client, auth_headers, run_db):
+        """Test a key sent with another body or path is rejected"""
+        headers = {**auth_headers, "Idempotency-Key": "create-2"}
+        client.post("/api/v1/items/", json={"title": "A"}, headers=headers)
+
+        assert client.post("/api/v1/items/", json={"title": "B"}, headers=headers).status_code == 422
+        assert client.post("/api/v1/items/bulk", json=[{"title": "A"}], headers=headers).status_code == 422
+        assert count(run_db, Item) == 1
+
+    def test_keys_are_per_user(self, client, auth_headers, second_auth_headers, run_db):
+        """Test two users sending the same key both get their own item"""
+        mine = client.post("/api/v1/items/", json={"title": "Same"}, headers={**auth_headers, "Idempotency-Key": "k"})
+        theirs = client.post(
+            "/api/v1/items/", json={"title": "Same"}, headers={**second_auth_headers, "Idempotency-Key": "k"}
+        )
+
+        assert mine.json()["id"] != theirs.json()["id"]
+        assert "Idempotent-Replayed" not in theirs.headers
+        assert count(run_db, Item) == 2
+
+    def test_update_and_delete_replay(self, client, auth_headers):
+        """Test a retried update keeps its ETag and a retried delete still answers 204"""
+        item_id = client.post("/api/v1/items/", json={"title": "Old"}, headers=auth_headers).json()["id"]
+
+        put_headers = {**auth_headers, "Idempotency-Key": "put-1"}
+        updated = client.put(f"/api/v1/items/{item_id}", json={"title": "New"}, headers=put_headers)
+        retried = client.put(f"/api/v1/items/{item_id}", json={"title": "New"}, headers=put_headers)
+        assert retried.json() == updated.json()
+        assert retried.headers["ETag"] == updated.headers["ETag"]
+        assert client.get(f"/api/v1/items/{item_id}", headers=auth_headers).json()["title"] == "New"
+
+        delete_headers = {**auth_headers, "Idempotency-Key": "delete-1"}
+        assert client.delete(f"/api/v1/items/{item_id}", headers=delete_headers).status_code == 204
+        retried = client.delete(f"/api/v1/items/{item_id}", headers=delete_headers)
+        assert retried.status_code == 204
+        assert retried.headers["Idempotent-Replayed"] == "true"
+
+    def test_batch_fetch_not_covered(self, client, auth_headers, run_db):
+        """Test the read-only POST /items/batch stores nothing"""
+        response = client.post("/api/v1/items/batch", json={"ids": [1]}, headers={**auth_headers, "Idempotency-Key": "b"})
+
+        assert response.status_code == 200
+        assert count(run_db, IdempotencyKey) == 0
+
+    def test_invalid_key(self, client, auth_headers):
+        """Test an overlong key is rejected before anything runs"""
+        response = client.post("/api/v1/items/", json={"title": "x"}, headers={**auth_headers, "Idempotency-Key": "k" * 256})
+
+        assert response.status_code == 400
+
+    def test_unauthenticated_passes_through(self, client):
+        """Test a request without a valid token gets the endpoint's own 401"""
+        response = client.post("/api/v1/items/", json={"title": "x"}, headers={"Idempotency-Key": "k"})
+
+        assert response.status_code == 401
+
+    def test_concurrent_duplicates_coalesced(self, client, auth_headers, run_db):
+        """Test duplicates arriving together run the endpoint once and share its response"""
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await asyncio.gather(*(
+                    http.post("/api/v1/items/", json={"title": "Burst"}, headers={**auth_headers, "Idempotency-Key": "burst"})
+                    for _ in range(10)
+                ))
+
+        responses = client.portal.call(scenario)
+
+        assert {response.status_code for response in responses} == {201}
+        assert len({response.json()["id"] for response in responses}) == 1
+        assert sum("idempotent-replayed" in response.headers for response in responses) == 9
+        assert count(run_db, Item) == 1
+
+    def test_pending_in_another_worker(self, client, test_user_data, auth_headers, run_db):
+        """Test a key claimed elsewhere and not yet finished answers 409"""
+        async def claim(session):
+            await session.execute(insert(IdempotencyKey).values(
+                key_hash=_digest(test_user_data["email"].encode(), b"elsewhere"),
+                fingerprint=b"",
+                expires_at=datetime.utcnow() + timedelta(seconds=60),
+            ))
+            await session.commit()
+        run_db(claim)
+
+        response = client.post("/api/v1/items/", json={"title": "x"}, headers={**auth_headers, "Idempotency-Key": "elsewhere"})
+
+        assert response.status_code == 409
+        assert response.headers["Retry-After"] == "1"
+        assert count(run_db, Item) == 0
+
+    def test_expired_key_executes_again(self, client, auth_headers, run_db):
+        """Test a key past its TTL is treated as new"""
+        headers = {**auth_headers, "Idempotency-Key": "old"}
+        client.post("/api/v1/items/", json={"title": "x"}, headers=headers)
+
+        async def expire(session):
+            await session.execute(update(IdempotencyKey).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+            await session.commit()
+        run_db(expire)
+
+        response = client.post("/api/v1/items/", json={"title": "x"}, headers=headers)
+        assert "Idempotent-Replayed" not in response.headers
+        assert count(run_db, Item) == 2
+        assert count(run_db, IdempotencyKey) == 1
+
+
+class TestIdempotencyMiddleware:
+    """Test which responses are kept"""
+
+    def test_server_errors_release_the_key(self, client, auth_headers, run_db):
+        """Test a 5xx is not replayed: the next attempt runs the endpoint"""
+        calls = []
+
+        async def flaky(scope, receive, send):
+            calls.append(1)
+            status_code = 503 if len(calls) == 1 else 201
+            await JSONResponse({"attempt": len(calls)}, status_code=status_code)(scope, receive, send)
+
+        middleware = IdempotencyMiddleware(flaky, prefixes=("/w",), store=IdempotencyStore(TestingSessionLocal))
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=middleware)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                headers = {**auth_headers, "Idempotency-Key": "flaky"}
+                return [(await http.post("/w", json={}, headers=headers)).status_code for _ in range(3)]
+
+        assert client.portal.call(scenario) == [503, 201, 201]
+        assert len(calls) == 2
+        assert count(run_db, IdempotencyKey) == 1
+
+
+class TestSweep:
+    """Test deleting expired keys"""
+
+    @pytest.fixture
+    def conn(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'sweep.db'}")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            yield conn
+        engine.dispose()
+
+    def test_deletes_only_expired(self, conn):
+        """Test every expired row goes, batch by batch, and live ones stay"""
+        now = datetime.utcnow()
+        conn.execute(insert(IdempotencyKey), [
+            {"key_hash": bytes([n]), "fingerprint": b"", "expires_at": now + timedelta(hours=-1 if n < 5 else 1)}
+            for n in range(8)
+        ])
+
+        assert sweep(conn, batch_size=2) == 5
+        assert sweep(conn, batch_size=2) == 0
+        assert conn.execute(select(func.count()).select_from(IdempotencyKey)).scalar() == 3
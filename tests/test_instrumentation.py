@@ -0,0 +1,96 @@
+"""
+Test per-request SQL instrumentation
+"""
+import logging
+import re
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from core.instrumentation import QueryStats, SQLMetricsMiddleware, current_stats, statement_shape
+
+SERVER_TIMING = re.compile(r'^db;dur=(\d+\.\d{2});desc="(\d+) queries"$')
+
+
+def make_app(queries: int, threshold: int):
+    """App whose only route runs ``SELECT ?`` ``queries`` times"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    
+    def endpoint(request):
+        with engine.connect() as conn:
+            for i in range(queries):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return PlainTextResponse("ok")
+    
+    app = Starlette(routes=[Route("/", endpoint)])
+    return SQLMetricsMiddleware(app, n_plus_one_threshold=threshold), engine
+
+
+class TestQueryStats:
+    """Test statement aggregation"""
+    
+    def test_in_lists_share_a_shape(self):
+        """Test expanded IN lists of different lengths normalize to one shape"""
+        assert statement_shape("SELECT 1 WHERE id IN (?, ?, ?)") == statement_shape("SELECT 1 WHERE id IN (?,?)")
+    
+    def test_repeated_shapes(self):
+        """Test only shapes above the threshold are reported"""
+        stats = QueryStats()
+        for _ in range(3):
+            stats.record("SELECT a", 0.001)
+        stats.record("SELECT b", 0.001)
+        
+        assert stats.count == 4
+        assert stats.repeated(2) == [("SELECT a", 3)]
+        assert stats.repeated(3) == []
+    
+    def test_no_stats_outside_request(self):
+        """Test statements outside a request are not collected"""
+        assert current_stats() is None
+
+
+class TestSQLMetricsMiddleware:
+    """Test Server-Timing and N+1 reporting"""
+    
+    def test_server_timing_header(self, client, auth_headers):
+        """Test API responses report query count and DB time"""
+        client.post("/api/v1/items/", json={"title": "Timed"}, headers=auth_headers)
+        
+        response = client.get("/api/v1/items/", headers=auth_headers)
+        
+        match = SERVER_TIMING.match(response.headers["Server-Timing"])
+        assert match
+        assert int(match.group(2)) >= 1
+    
+    def test_counts_each_statement(self):
+        """Test every cursor execution in the request is counted"""
+        app, engine = make_app(queries=4, threshold=10)
+        with TestClient(app) as test_client:
+            response = test_client.get("/")
+        engine.dispose()
+        
+        assert SERVER_TIMING.match(response.headers["Server-Timing"]).group(2) == "4"
+    
+    def test_n_plus_one_warning(self, caplog):
+        """Test a statement repeated past the threshold logs a warning"""
+        app, engine = make_app(queries=5, threshold=3)
+        with caplog.at_level(logging.WARNING, logger="core.instrumentation"):
+            with TestClient(app) as test_client:
+                test_client.get("/")
+        engine.dispose()
+        
+        assert any("Possible N+1: GET / ran the same statement 5 times" in r.message for r in caplog.records)
+    
+    def test_no_warning_below_threshold(self, caplog):
+        """Test distinct or infrequent statements do not warn"""
+        app, engine = make_app(queries=3, threshold=3)
+        with caplog.at_level(logging.WARNING, logger="core.instrumentation"):
+            with TestClient(app) as test_client:
+                test_client.get("/")
+        engine.dispose()
+        
+        assert not [r for r in caplog.records if r.name == "core.instrumentation"]
@@ -1,7 +1,19 @@
 """
 Test item/task management endpoints
 """
+import asyncio
+import json
+import os
+import statistics
+import time
+
 import pytest
+from sqlalchemy import insert, text
+
+from core.pagination import encode_cursor
+from crud.item import owned_items_query
+from main import app
+from models.item import Item
 
 
 class TestCreateItem:
@@ -109,12 +121,93 @@ class TestGetItems:
         assert len(resp2.json()) == 1
         assert "User 2" in resp2.json()[0]["title"]
     
+    def test_get_items_matches_item_schema(self, client, auth_headers):
+        """Test the list fast path emits exactly the item schema's fields"""
+        created = client.post(
+            "/api/v1/items/", json={"title": "Ünïcode \"quoted\"", "description": None}, headers=auth_headers
+        ).json()
+        
+        response = client.get("/api/v1/items/", headers=auth_headers)
+        
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == [created]
+    
     def test_get_items_unauthorized(self, client):
         """Test getting items without authentication"""
         response = client.get("/api/v1/items/")
         assert response.status_code == 401
 
 
+class TestCursorPagination:
+    """Test keyset pagination on GET /items/"""
+    
+    def test_walk_all_pages(self, client, auth_headers):
+        """Test following X-Next-Cursor visits every item exactly once"""
+        for i in range(7):
+            client.post("/api/v1/items/", json={"title": f"Task {i}"}, headers=auth_headers)
+        
+        seen = []
+        response = client.get("/api/v1/items/?limit=3", headers=auth_headers)
+        while True:
+            seen.extend(item["title"] for item in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            response = client.get(f"/api/v1/items/?limit=3&cursor={cursor}", headers=auth_headers)
+        
+        assert seen == [f"Task {i}" for i in range(7)]
+    
+    def test_invalid_cursor(self, client, auth_headers):
+        """Test a malformed cursor is rejected"""
+        response = client.get("/api/v1/items/?cursor=not-a-cursor", headers=auth_headers)
+        assert response.status_code == 400
+    
+    def test_cursor_of_other_user_rejected(self, client, auth_headers, second_auth_headers):
+        """Test a cursor issued to another user cannot be replayed"""
+        for i in range(2):
+            client.post("/api/v1/items/", json={"title": f"Task {i}"}, headers=auth_headers)
+        cursor = client.get("/api/v1/items/?limit=1", headers=auth_headers).headers["X-Next-Cursor"]
+        
+        response = client.get(f"/api/v1/items/?cursor={cursor}", headers=second_auth_headers)
+        assert response.status_code == 400
+    
+    def test_page_latency_flat_to_page_10000(self, client, auth_headers, run_db):
+        """Test the 10,000th page costs about the same as the first"""
+        owner_id = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+        
+        async def seed(session):
+            await session.execute(
+                insert(Item),
+                [{"title": f"Task {i}", "owner_id": owner_id} for i in range(10_001)],
+            )
+            await session.commit()
+            ids = (await session.execute(owned_items_query(owner_id).with_only_columns(Item.id))).scalars().all()
+            plan = (await session.execute(
+                text("EXPLAIN QUERY PLAN " + str(
+                    owned_items_query(owner_id, after_id=0).limit(1).compile(compile_kwargs={"literal_binds": True})
+                ))
+            )).all()
+            return ids, plan
+        
+        ids, plan = run_db(seed)
+        assert any("ix_items_owner_id_id" in row[-1] for row in plan)
+        
+        def median_latency(after_id):
+            url = f"/api/v1/items/?limit=1&cursor={encode_cursor(owner_id, after_id)}"
+            samples = []
+            for _ in range(30):
+                start = time.perf_counter()
+                response = client.get(url, headers=auth_headers)
+                samples.append(time.perf_counter() - start)
+                assert response.status_code == 200
+            return statistics.median(samples)
+        
+        # limit=1: page 1 starts after id 0, page 10,000 after the 9,999th id
+        first_page = median_latency(0)
+        last_page = median_latency(ids[9_998])
+        assert last_page < first_page * 2
+
+
 class TestGetItemById:
     """Test GET /items/{item_id} endpoint"""
     
@@ -151,6 +244,15 @@ class TestGetItemById:
         # User 2 tries to access
         response = client.get(f"/api/v1/items/{item_id}", headers=second_auth_headers)
         assert response.status_code == 404
+    
+    def test_get_item_one_query(self, client, auth_headers):
+        """Test an unconditional GET reads the row once and still sends its ETag"""
+        item_id = client.post("/api/v1/items/", json={"title": "Once"}, headers=auth_headers).json()["id"]
+        
+        response = client.get(f"/api/v1/items/{item_id}", headers=auth_headers)
+        
+        assert response.headers["Server-Timing"].endswith('desc="1 queries"')
+        assert "ETag" in response.headers
 
 
 class TestUpdateItem:
@@ -202,6 +304,23 @@ class TestUpdateItem:
             headers=second_auth_headers
         )
         assert response.status_code == 404
+    
+    def test_update_loses_race(self, client, auth_headers, concurrent_write):
+        """Test an update overtaken by a concurrent write is 409, or 412 with If-Match"""
+        item = client.post("/api/v1/items/", json={"title": "Raced"}, headers=auth_headers)
+        item_id = item.json()["id"]
+        
+        concurrent_write(f"UPDATE items SET version = version + 1 WHERE id = {item_id}")
+        response = client.put(f"/api/v1/items/{item_id}", json={"title": "Mine"}, headers=auth_headers)
+        assert response.status_code == 409
+        
+        etag = client.get(f"/api/v1/items/{item_id}", headers=auth_headers).headers["ETag"]
+        concurrent_write(f"UPDATE items SET version = version + 1 WHERE id = {item_id}")
+        response = client.put(
+            f"/api/v1/items/{item_id}", json={"title": "Mine"}, headers={**auth_headers, "If-Match": etag}
+        )
+        assert response.status_code == 412
+        assert client.get(f"/api/v1/items/{item_id}", headers=auth_headers).json()["title"] == "Raced"
 
 
 class TestDeleteItem:
@@ -228,4 +347,440 @@ class TestDeleteItem:
     def test_delete_item_not_found(self, client, auth_headers):
         """Test deleting non-existent item"""
         response = client.delete("/api/v1/items/99999", headers=auth_headers)
-        assert response.status_code == 404
\ No newline at end of file
+        assert response.status_code == 404
+    
+    def test_delete_racing_update(self, client, auth_headers, concurrent_write):
+        """Test a delete still succeeds when a concurrent update changed the item"""
+        item_id = client.post("/api/v1/items/", json={"title": "Raced"}, headers=auth_headers).json()["id"]
+        
+        concurrent_write(f"UPDATE items SET version = version + 1 WHERE id = {item_id}")
+        response = client.delete(f"/api/v1/items/{item_id}", headers=auth_headers)
+        
+        assert response.status_code == 204
+        assert client.get(f"/api/v1/items/{item_id}", headers=auth_headers).status_code == 404
+        assert client.get("/api/v1/items/stats", headers=auth_headers).json()["item_count"] == 0
+
+class TestBulkItems:
+    """Test /items/bulk endpoints"""
+    
+    def test_bulk_create(self, client, auth_headers):
+        """Test creating many items returns per-element results in order"""
+        payload = [{"title": f"Bulk {i}", "description": f"D{i}"} for i in range(5)]
+        response = client.post("/api/v1/items/bulk", json=payload, headers=auth_headers)
+        
+        assert response.status_code == 200
+        results = response.json()
+        assert [r["index"] for r in results] == list(range(5))
+        assert all(r["status"] == 201 for r in results)
+        assert [r["item"]["title"] for r in results] == [p["title"] for p in payload]
+        
+        listed = client.get("/api/v1/items/", headers=auth_headers).json()
+        assert len(listed) == 5
+    
+    def test_bulk_create_validates_elements(self, client, auth_headers):
+        """Test elements are validated with the item schemas"""
+        response = client.post("/api/v1/items/bulk", json=[{"description": "no title"}], headers=auth_headers)
+        assert response.status_code == 422
+    
+    def test_bulk_create_too_large(self, client, auth_headers, monkeypatch):
+        """Test batches over ITEMS_BULK_MAX_BATCH are rejected"""
+        from core.config import settings
+        monkeypatch.setattr(settings, "ITEMS_BULK_MAX_BATCH", 2)
+        
+        response = client.post("/api/v1/items/bulk", json=[{"title": "t"}] * 3, headers=auth_headers)
+        assert response.status_code == 413
+    
+    def test_bulk_update(self, client, auth_headers, second_auth_headers):
+        """Test updating many items reports 404 for missing or foreign ids"""
+        created = client.post(
+            "/api/v1/items/bulk", json=[{"title": "A"}, {"title": "B"}], headers=auth_headers
+        ).json()
+        foreign = client.post("/api/v1/items/", json={"title": "Theirs"}, headers=second_auth_headers).json()
+        
+        response = client.patch("/api/v1/items/bulk", json=[
+            {"id": created[0]["id"], "title": "A2"},
+            {"id": foreign["id"], "title": "Hacked"},
+            {"id": created[1]["id"], "title": "B2", "description": "new"},
+            {"id": 99999, "title": "Missing"},
+        ], headers=auth_headers)
+        
+        assert response.status_code == 200
+        results = response.json()
+        assert [r["status"] for r in results] == [200, 404, 200, 404]
+        assert results[2]["item"]["description"] == "new"
+        
+        theirs = client.get(f"/api/v1/items/{foreign['id']}", headers=second_auth_headers).json()
+        assert theirs["title"] == "Theirs"
+        mine = client.get(f"/api/v1/items/{created[0]['id']}", headers=auth_headers).json()
+        assert mine["title"] == "A2"
+    
+    def test_bulk_delete(self, client, auth_headers, second_auth_headers):
+        """Test deleting many items only removes the caller's items"""
+        created = client.post(
+            "/api/v1/items/bulk", json=[{"title": "A"}, {"title": "B"}], headers=auth_headers
+        ).json()
+        foreign = client.post("/api/v1/items/", json={"title": "Theirs"}, headers=second_auth_headers).json()
+        
+        ids = [created[0]["id"], foreign["id"], created[1]["id"]]
+        response = client.request("DELETE", "/api/v1/items/bulk", json={"ids": ids}, headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert [r["status"] for r in response.json()] == [204, 404, 204]
+        assert client.get("/api/v1/items/", headers=auth_headers).json() == []
+        assert client.get(f"/api/v1/items/{foreign['id']}", headers=second_auth_headers).status_code == 200
+
+
+class TestExportItems:
+    """Test GET /items/export streaming endpoint"""
+    
+    def test_export_ndjson(self, client, auth_headers, second_auth_headers):
+        """Test NDJSON export contains only the caller's items, one per line"""
+        client.post("/api/v1/items/bulk", json=[{"title": f"T{i}"} for i in range(3)], headers=auth_headers)
+        client.post("/api/v1/items/", json={"title": "Theirs"}, headers=second_auth_headers)
+        
+        response = client.get("/api/v1/items/export", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["title"] for row in rows] == ["T0", "T1", "T2"]
+    
+    def test_export_json_array(self, client, auth_headers):
+        """Test JSON array export is a single valid document"""
+        client.post("/api/v1/items/bulk", json=[{"title": f"T{i}"} for i in range(3)], headers=auth_headers)
+        
+        response = client.get("/api/v1/items/export?format=json", headers=auth_headers)
+        assert [row["title"] for row in response.json()] == ["T0", "T1", "T2"]
+    
+    def test_export_empty_json_array(self, client, auth_headers):
+        """Test exporting no items yields an empty array"""
+        response = client.get("/api/v1/items/export?format=json", headers=auth_headers)
+        assert response.json() == []
+    
+    def test_export_gzip(self, client, auth_headers):
+        """Test the compressed stream is gzip-encoded"""
+        client.post("/api/v1/items/", json={"title": "Zipped"}, headers=auth_headers)
+        
+        response = client.get("/api/v1/items/export?compress=gzip", headers=auth_headers)
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert json.loads(response.text)["title"] == "Zipped"
+    
+    def test_export_unauthorized(self, client):
+        """Test export requires authentication"""
+        assert client.get("/api/v1/items/export").status_code == 401
+    
+    @pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc to read RSS")
+    def test_export_1m_rows_bounded_rss(self, client, auth_headers, run_db):
+        """Test streaming 1M items keeps RSS growth bounded"""
+        owner_id = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+        total = 1_000_000
+        
+        async def seed(session):
+            await session.execute(text(
+                "INSERT INTO items (title, description, owner_id) "
+                "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < :total) "
+                "SELECT 'Task ' || x, 'Description of task ' || x, :owner_id FROM n"
+            ), {"total": total, "owner_id": owner_id})
+            await session.commit()
+        
+        run_db(seed)
+        
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        
+        def rss():
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * page_size
+        
+        token = auth_headers["Authorization"].encode()
+        
+        async def stream_export():
+            # Drive the ASGI app directly; test clients buffer the whole body
+            scope = {
+                "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+                "path": "/api/v1/items/export", "raw_path": b"/api/v1/items/export",
+                "query_string": b"", "root_path": "", "server": ("test", 80), "client": ("test", 1),
+                "headers": [(b"authorization", token), (b"host", b"test")],
+            }
+            stats = {"lines": 0, "peak": 0}
+            baseline = rss()
+            
+            requested = asyncio.Event()
+            
+            async def receive():
+                if not requested.is_set():
+                    requested.set()
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await asyncio.Event().wait()  # the client never disconnects
+            
+            async def send(message):
+                if message["type"] == "http.response.body":
+                    stats["lines"] += message.get("body", b"").count(b"\n")
+                    stats["peak"] = max(stats["peak"], rss() - baseline)
+            
+            await app(scope, receive, send)
+            return stats
+        
+        stats = client.portal.call(stream_export)
+        
+        assert stats["lines"] == total
+        # The full export is ~90 MB of NDJSON; streaming must not hold it
+        assert stats["peak"] < 40 * 1024 * 1024
+
+
+class TestSearchItems:
+    """Test GET /items/search full-text search"""
+    
+    def test_search_ranked_and_scoped(self, client, auth_headers, second_auth_headers):
+        """Test matches are ranked by relevance and limited to the caller"""
+        client.post("/api/v1/items/bulk", json=[
+            {"title": "Buy bread"},
+            {"title": "Milk", "description": "milk milk milk"},
+            {"title": "Buy milk", "description": "for breakfast"},
+        ], headers=auth_headers)
+        client.post("/api/v1/items/", json={"title": "Milk for them"}, headers=second_auth_headers)
+        
+        response = client.get("/api/v1/items/search?q=milk", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert [item["title"] for item in response.json()] == ["Milk", "Buy milk"]
+    
+    def test_search_all_words_must_match(self, client, auth_headers):
+        """Test multi-word queries match every word"""
+        client.post("/api/v1/items/bulk", json=[{"title": "Buy milk"}, {"title": "Buy bread"}], headers=auth_headers)
+        
+        response = client.get("/api/v1/items/search?q=buy bread", headers=auth_headers)
+        assert [item["title"] for item in response.json()] == ["Buy bread"]
+    
+    def test_search_tracks_updates_and_deletes(self, client, auth_headers):
+        """Test the index follows updates and deletes"""
+        item = client.post("/api/v1/items/", json={"title": "Old title"}, headers=auth_headers).json()
+        client.put(f"/api/v1/items/{item['id']}", json={"title": "New title"}, headers=auth_headers)
+        
+        assert client.get("/api/v1/items/search?q=old", headers=auth_headers).json() == []
+        assert len(client.get("/api/v1/items/search?q=new", headers=auth_headers).json()) == 1
+        
+        client.delete(f"/api/v1/items/{item['id']}", headers=auth_headers)
+        assert client.get("/api/v1/items/search?q=new", headers=auth_headers).json() == []
+    
+    def test_search_cursor_pagination(self, client, auth_headers):
+        """Test following X-Next-Cursor returns every match once"""
+        client.post("/api/v1/items/bulk", json=[{"title": f"Task {i}"} for i in range(5)], headers=auth_headers)
+        
+        seen = []
+        response = client.get("/api/v1/items/search?q=task&limit=2", headers=auth_headers)
+        while True:
+            seen.extend(item["id"] for item in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            response = client.get(f"/api/v1/items/search?q=task&limit=2&cursor={cursor}", headers=auth_headers)
+        
+        assert len(seen) == len(set(seen)) == 5
+    
+    def test_search_query_syntax_is_literal(self, client, auth_headers):
+        """Test FTS5 operators in user input do not cause errors"""
+        client.post("/api/v1/items/", json={"title": "quote \"me\""}, headers=auth_headers)
+        
+        response = client.get('/api/v1/items/search?q="me" OR * NEAR(', headers=auth_headers)
+        assert response.status_code == 200
+    
+    def test_search_blank_query(self, client, auth_headers):
+        """Test a whitespace-only query is rejected"""
+        response = client.get("/api/v1/items/search?q=%20%20", headers=auth_headers)
+        assert response.status_code == 400
+
+
+class TestConditionalRequests:
+    """Test ETag, If-None-Match and If-Match handling for items"""
+    
+    def test_get_item_not_modified(self, client, auth_headers):
+        """Test a matching If-None-Match returns 304 without a body"""
+        item = client.post("/api/v1/items/", json={"title": "Cached"}, headers=auth_headers).json()
+        first = client.get(f"/api/v1/items/{item['id']}", headers=auth_headers)
+        etag = first.headers["ETag"]
+        
+        response = client.get(f"/api/v1/items/{item['id']}", headers={**auth_headers, "If-None-Match": etag})
+        
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+    
+    def test_etag_changes_on_update(self, client, auth_headers):
+        """Test an update changes the item's ETag"""
+        item = client.post("/api/v1/items/", json={"title": "Before"}, headers=auth_headers).json()
+        etag = client.get(f"/api/v1/items/{item['id']}", headers=auth_headers).headers["ETag"]
+        
+        updated = client.put(f"/api/v1/items/{item['id']}", json={"title": "After"}, headers=auth_headers)
+        assert updated.headers["ETag"] != etag
+        
+        response = client.get(f"/api/v1/items/{item['id']}", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["title"] == "After"
+    
+    def test_list_not_modified(self, client, auth_headers):
+        """Test list ETags change when any listed item changes"""
+        created = client.post("/api/v1/items/bulk", json=[{"title": "A"}, {"title": "B"}], headers=auth_headers).json()
+        etag = client.get("/api/v1/items/", headers=auth_headers).headers["ETag"]
+        
+        not_modified = client.get("/api/v1/items/", headers={**auth_headers, "If-None-Match": etag})
+        assert not_modified.status_code == 304
+        
+        client.patch("/api/v1/items/bulk", json=[{"id": created[1]["id"], "title": "B2"}], headers=auth_headers)
+        modified = client.get("/api/v1/items/", headers={**auth_headers, "If-None-Match": etag})
+        assert modified.status_code == 200
+    
+    def test_update_if_match(self, client, auth_headers):
+        """Test If-Match applies the update only for the current ETag"""
+        item = client.post("/api/v1/items/", json={"title": "V1"}, headers=auth_headers).json()
+        etag = client.get(f"/api/v1/items/{item['id']}", headers=auth_headers).headers["ETag"]
+        
+        ok = client.put(
+            f"/api/v1/items/{item['id']}", json={"title": "V2"}, headers={**auth_headers, "If-Match": etag}
+        )
+        assert ok.status_code == 200
+        
+        stale = client.put(
+            f"/api/v1/items/{item['id']}", json={"title": "V3"}, headers={**auth_headers, "If-Match": etag}
+        )
+        assert stale.status_code == 412
+        assert client.get(f"/api/v1/items/{item['id']}", headers=auth_headers).json()["title"] == "V2"
+
+
+class TestItemStats:
+    """Test the maintained per-user item counters"""
+    
+    def count(self, client, headers) -> int:
+        response = client.get("/api/v1/items/stats", headers=headers)
+        assert response.status_code == 200
+        return response.json()["item_count"]
+    
+    def test_counts_every_write_path(self, client, auth_headers):
+        """Test single and bulk creates and deletes move the counter"""
+        assert self.count(client, auth_headers) == 0
+        
+        first = client.post("/api/v1/items/", json={"title": "One"}, headers=auth_headers).json()
+        bulk = client.post("/api/v1/items/bulk", json=[{"title": f"B{n}"} for n in range(3)], headers=auth_headers).json()
+        assert self.count(client, auth_headers) == 4
+        
+        client.delete(f"/api/v1/items/{first['id']}", headers=auth_headers)
+        client.request("DELETE", "/api/v1/items/bulk", json={"ids": [bulk[0]["id"], bulk[1]["id"], 999]}, headers=auth_headers)
+        assert self.count(client, auth_headers) == 1
+    
+    def test_counts_are_per_user(self, client, auth_headers, second_auth_headers):
+        """Test one user's writes do not touch another's counter"""
+        client.post("/api/v1/items/", json={"title": "Mine"}, headers=auth_headers)
+        
+        assert self.count(client, auth_headers) == 1
+        assert self.count(client, second_auth_headers) == 0
+    
+    def test_missing_row_is_seeded_from_items(self, client, auth_headers, run_db):
+        """Test an owner with items but no counter row (pre-migration data) is counted correctly"""
+        from sqlalchemy import delete
+        from models.item_stats import ItemStats
+        client.post("/api/v1/items/bulk", json=[{"title": "Old"}] * 2, headers=auth_headers)
+        
+        async def drop_counters(session):
+            await session.execute(delete(ItemStats))
+            await session.commit()
+        run_db(drop_counters)
+        
+        assert self.count(client, auth_headers) == 2
+        client.post("/api/v1/items/", json={"title": "New"}, headers=auth_headers)
+        assert self.count(client, auth_headers) == 3
+    
+    def test_stats_unauthorized(self, client):
+        """Test stats require authentication"""
+        assert client.get("/api/v1/items/stats").status_code == 401
+
+
+class TestReconcile:
+    """Test rebuilding the counters from the items table"""
+    
+    @pytest.fixture
+    def conn(self, tmp_path):
+        from sqlalchemy import create_engine
+        from core.database import Base
+        engine = create_engine(f"sqlite:///{tmp_path / 'reconcile.db'}")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            yield conn
+        engine.dispose()
+    
+    def test_reports_and_fixes_drift(self, conn):
+        """Test wrong, missing and stale counters are reported and corrected"""
+        from sqlalchemy import select
+        from crud.item_stats import reconcile
+        from models.item import Item
+        from models.item_stats import ItemStats
+        from models.user import User
+        conn.execute(insert(User), [
+            {"id": n, "username": f"u{n}", "email": f"u{n}@example.com", "hashed_password": "x"} for n in (1, 2, 3, 4)
+        ])
+        conn.execute(insert(Item), [{"title": "a", "owner_id": 1}] * 3 + [{"title": "b", "owner_id": 2}])
+        conn.execute(insert(ItemStats), [
+            {"owner_id": 1, "item_count": 5}, {"owner_id": 3, "item_count": 2}, {"owner_id": 4, "item_count": 0}
+        ])
+        
+        assert reconcile(conn, dry_run=True) == [(1, 5, 3), (2, None, 1), (3, 2, 0)]
+        assert reconcile(conn) == [(1, 5, 3), (2, None, 1), (3, 2, 0)]
+        assert reconcile(conn) == []
+        assert dict(conn.execute(select(ItemStats.owner_id, ItemStats.item_count)).all()) == {1: 3, 2: 1, 3: 0, 4: 0}
+
+
+class TestBatchFetch:
+    """Test fetching several items by id in one request"""
+    
+    def test_get_batch_in_request_order(self, client, auth_headers):
+        """Test found items follow the requested order and unknown ids are missing"""
+        ids = [
+            client.post("/api/v1/items/", json={"title": f"Item {n}"}, headers=auth_headers).json()["id"]
+            for n in range(3)
+        ]
+        
+        response = client.get(f"/api/v1/items/batch?ids={ids[2]},{ids[0]},999,{ids[2]}", headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["id"] for item in data["items"]] == [ids[2], ids[0]]
+        assert data["items"][0]["title"] == "Item 2"
+        assert data["missing"] == [999]
+    
+    def test_post_batch(self, client, auth_headers):
+        """Test the POST form resolves the same way"""
+        item = client.post("/api/v1/items/", json={"title": "Posted"}, headers=auth_headers).json()
+        
+        response = client.post("/api/v1/items/batch", json={"ids": [5000, item["id"]]}, headers=auth_headers)
+        
+        assert response.json() == {"items": [item], "missing": [5000]}
+    
+    def test_other_users_items_are_missing(self, client, auth_headers, second_auth_headers):
+        """Test another user's ids are reported missing, not returned"""
+        theirs = client.post("/api/v1/items/", json={"title": "Theirs"}, headers=second_auth_headers).json()
+        
+        response = client.get(f"/api/v1/items/batch?ids={theirs['id']}", headers=auth_headers)
+        
+        assert response.json() == {"items": [], "missing": [theirs["id"]]}
+    
+    def test_one_query(self, client, auth_headers):
+        """Test the whole batch is resolved with a single SELECT on items"""
+        ids = [item["id"] for item in client.post(
+            "/api/v1/items/bulk", json=[{"title": f"Q{n}"} for n in range(20)], headers=auth_headers
+        ).json()]
+        
+        response = client.get(f"/api/v1/items/batch?ids={','.join(map(str, ids))}", headers=auth_headers)
+        
+        assert len(response.json()["items"]) == 20
+        assert response.headers["Server-Timing"].endswith('desc="1 queries"')
+    
+    def test_invalid_and_oversized(self, client, auth_headers):
+        """Test malformed lists are 422 and lists over the batch cap are 413"""
+        from core.config import settings
+        
+        assert client.get("/api/v1/items/batch?ids=1,x", headers=auth_headers).status_code == 422
+        too_many = list(range(settings.ITEMS_BULK_MAX_BATCH + 1))
+        assert client.post("/api/v1/items/batch", json={"ids": too_many}, headers=auth_headers).status_code == 413
+    
+    def test_batch_unauthorized(self, client):
+        """Test batch fetch requires authentication"""
+        assert client.get("/api/v1/items/batch?ids=1").status_code == 401
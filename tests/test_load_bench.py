@@ -0,0 +1,51 @@
+"""
+Test the load benchmark's statistics and baseline comparison
+"""
+from bench.load import compare, percentile, summarize
+
+
+def report(**overrides) -> dict:
+    result = {"scenario": "me", "concurrency": 8, "requests": 100, "errors": 0, "rps": 500.0, "p95_ms": 10.0}
+    result.update(overrides)
+    return {"results": [result]}
+
+
+class TestPercentile:
+    """Test nearest-rank percentiles"""
+    
+    def test_nearest_rank(self):
+        """Test percentiles pick an observed sample"""
+        samples = [float(n) for n in range(1, 101)]
+        assert percentile(samples, 50) == 50
+        assert percentile(samples, 95) == 95
+        assert percentile(samples, 99) == 99
+        assert percentile([7.0], 99) == 7
+        assert percentile([], 50) == 0
+    
+    def test_summarize_in_milliseconds(self):
+        """Test summaries report latency in ms and throughput in rps"""
+        result = summarize("me", 4, [0.002] * 10, errors=1, elapsed=0.5)
+        assert result["rps"] == 20
+        assert result["p99_ms"] == 2
+        assert result["errors"] == 1
+
+
+class TestCompare:
+    """Test regression detection against a baseline"""
+    
+    def test_within_threshold(self):
+        """Test small changes pass"""
+        assert compare(report(), report(p95_ms=11.0, rps=460.0), 0.15) == []
+    
+    def test_latency_regression(self):
+        """Test p95 growth beyond the threshold is reported"""
+        assert compare(report(), report(p95_ms=12.0), 0.15) == ["me@8: p95 10.0 ms -> 12.0 ms"]
+    
+    def test_throughput_and_error_regression(self):
+        """Test RPS drops and new errors are reported"""
+        regressions = compare(report(), report(rps=400.0, errors=3), 0.15)
+        assert regressions == ["me@8: rps 500.0 -> 400.0", "me@8: errors 0 -> 3"]
+    
+    def test_new_scenarios_ignored(self):
+        """Test scenarios missing from the baseline are not compared"""
+        assert compare(report(), report(scenario="login", p95_ms=999.0), 0.15) == []
@@ -0,0 +1,129 @@
+"""
+Test the Prometheus metrics endpoint and collectors
+"""
+import asyncio
+import os
+import re
+import time
+
+from sqlalchemy import create_engine
+
+from core import metrics
+from core.hashing import HashingPool
+from core.metrics import Histogram, MetricsMiddleware, instrument_pool
+
+
+def sample(body: str, name: str) -> float | None:
+    """Value of the exposition line starting with ``name``"""
+    for line in body.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestHistogram:
+    """Test histogram bookkeeping and rendering"""
+    
+    def test_cumulative_buckets(self):
+        """Test buckets render cumulatively with sum and count"""
+        histogram = Histogram("h", "test", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, ("/a",))
+        
+        body = "\n".join(histogram.render())
+        
+        assert sample(body, 'h_bucket{route="/a",le="0.1"}') == 1
+        assert sample(body, 'h_bucket{route="/a",le="1.0"}') == 3
+        assert sample(body, 'h_bucket{route="/a",le="+Inf"}') == 4
+        assert sample(body, 'h_count{route="/a"}') == 4
+        assert sample(body, 'h_sum{route="/a"}') == 6.05
+
+
+class TestMetricsEndpoint:
+    """Test /metrics output from real requests"""
+    
+    def test_route_latency_and_status(self, client, auth_headers):
+        """Test requests are recorded under their route template and status"""
+        item = client.post("/api/v1/items/", json={"title": "Metered"}, headers=auth_headers).json()
+        labels = ("GET", "/api/v1/items/{item_id}")
+        before = metrics.request_duration.count(labels)
+        client.get(f"/api/v1/items/{item['id']}", headers=auth_headers)
+        client.get("/api/v1/items/999999", headers=auth_headers)
+        
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert metrics.request_duration.count(labels) == before + 2
+        route = 'method="GET",route="/api/v1/items/{item_id}"'
+        assert sample(body, f"http_request_duration_seconds_count{{{route}}}") == before + 2
+        assert sample(body, f'http_responses_total{{{route},status="404"}}') >= 1
+        assert sample(body, "http_requests_in_flight") == 1  # the scrape itself
+        assert re.search(r'^argon2_seconds_count\{op="hash"\} \d+$', body, re.M)
+    
+    def test_unmatched_paths_share_a_label(self, client):
+        """Test unknown paths do not create one series per path"""
+        client.get("/no/such/path/1")
+        client.get("/no/such/path/2")
+        
+        body = client.get("/metrics").text
+        
+        assert 'route="unmatched",status="404"' in body
+        assert "/no/such/path" not in body
+
+
+class TestPoolMetrics:
+    """Test connection checkout timing"""
+    
+    def test_checkout_wait_survives_dispose(self, tmp_path):
+        """Test checkouts are timed before and after engine.dispose()"""
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'pool.db')}")
+        instrument_pool(engine, "test")
+        before = metrics.pool_checkout_wait.count(("test",))
+        
+        with engine.connect():
+            pass
+        engine.dispose()
+        with engine.connect():
+            pass
+        engine.dispose()
+        
+        assert metrics.pool_checkout_wait.count(("test",)) == before + 2
+        body = metrics.render({"test": engine}, HashingPool())
+        assert sample(body, 'db_pool_checked_out{engine="test"}') == 0
+
+
+class TestMiddlewareOverhead:
+    """Test the recording cost per request stays negligible"""
+    
+    def test_overhead_per_request(self):
+        """Test the middleware adds well under 50 us to a request"""
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+        
+        async def receive():
+            return {"type": "http.request", "body": b""}
+        
+        async def send(message):
+            pass
+        
+        wrapped = MetricsMiddleware(app)
+        scope = {"type": "http", "method": "GET", "path": "/bench"}
+        
+        async def drive(target, n):
+            start = time.perf_counter()
+            for _ in range(n):
+                await target(dict(scope), receive, send)
+            return time.perf_counter() - start
+        
+        async def measure(n=20_000):
+            await drive(wrapped, 1000)
+            bare = min([await drive(app, n) for _ in range(3)])
+            metered = min([await drive(wrapped, n) for _ in range(3)])
+            return (metered - bare) / n
+        
+        overhead = asyncio.run(measure())
+        
+        assert overhead < 50e-6, f"{overhead * 1e6:.1f} us per request"
@@ -0,0 +1,88 @@
+"""
+Test read/write session routing
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import core.database as database
+from core.cache import TTLCache
+from core.database import AsyncSessionLocal, session_factory, to_async_url
+from core.storage import apply_storage_profile, read_only_url
+
+READ_A = object()
+READ_B = object()
+
+
+@pytest.fixture
+def two_readers(monkeypatch):
+    """Route reads over two stand-in session factories"""
+    readers = iter([READ_A, READ_B] * 10)
+    monkeypatch.setattr(database, "_next_read_session", lambda: next(readers))
+    monkeypatch.setattr(database, "recent_writers", TTLCache(max_size=100, ttl=60))
+
+
+class TestSessionFactory:
+    """Test which engine serves each request"""
+    
+    def test_without_read_engines_everything_uses_primary(self, monkeypatch):
+        """Test routing is a no-op when no read engine is configured"""
+        monkeypatch.setattr(database, "_next_read_session", None)
+        assert session_factory("GET", None) is AsyncSessionLocal
+        assert session_factory("POST", "Bearer t") is AsyncSessionLocal
+    
+    def test_safe_methods_use_read_engines(self, two_readers):
+        """Test reads are spread round-robin and writes use the primary"""
+        assert session_factory("GET", "Bearer a") is READ_A
+        assert session_factory("HEAD", "Bearer a") is READ_B
+        assert session_factory("PUT", None) is AsyncSessionLocal
+        assert session_factory("DELETE", None) is AsyncSessionLocal
+    
+    def test_read_your_writes(self, two_readers):
+        """Test a caller's reads follow its own writes to the primary"""
+        assert session_factory("POST", "Bearer writer") is AsyncSessionLocal
+        
+        assert session_factory("GET", "Bearer writer") is AsyncSessionLocal
+        assert session_factory("GET", "Bearer other") is READ_A
+    
+    def test_read_your_writes_window_expires(self, two_readers, monkeypatch):
+        """Test reads return to the read engines once the window closes"""
+        now = [0.0]
+        monkeypatch.setattr(database, "recent_writers", TTLCache(max_size=100, ttl=5, clock=lambda: now[0]))
+        session_factory("PATCH", "Bearer writer")
+        
+        now[0] = 6.0
+        
+        assert session_factory("GET", "Bearer writer") is READ_A
+
+
+class TestReadOnlyURL:
+    """Test the local read-only SQLite engine"""
+    
+    def test_read_only_engine_reads_but_cannot_write(self, tmp_path):
+        """Test mode=ro connections see committed rows and reject writes"""
+        url = f"sqlite:///{os.path.join(tmp_path, 'replica.db')}"
+        primary = create_engine(url)
+        apply_storage_profile(primary)
+        with primary.begin() as conn:
+            conn.execute(text("CREATE TABLE t (a INTEGER)"))
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+        
+        async def use_replica():
+            replica = create_async_engine(to_async_url(read_only_url(url)))
+            apply_storage_profile(replica.sync_engine, read_only=True)
+            try:
+                async with replica.connect() as conn:
+                    count = (await conn.execute(text("SELECT count(*) FROM t"))).scalar()
+                    with pytest.raises(OperationalError, match="readonly"):
+                        await conn.execute(text("INSERT INTO t VALUES (2)"))
+                return count
+            finally:
+                await replica.dispose()
+        
+        assert asyncio.run(use_replica()) == 1
+        primary.dispose()
@@ -0,0 +1,126 @@
+"""
+Test schema migrations and the startup fingerprint check
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from core.schema import SchemaError, check, migrate, plan, schema_fingerprint, stored_fingerprint
+from crud.item import search_items_query
+
+# The schema as the first release created it: no version columns, no
+# keyset index and no full-text index
+ORIGINAL_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER NOT NULL PRIMARY KEY, username VARCHAR NOT NULL, email VARCHAR NOT NULL,
+        full_name VARCHAR, hashed_password VARCHAR NOT NULL
+    )""",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+    "CREATE INDEX ix_users_id ON users (id)",
+    """CREATE TABLE items (
+        id INTEGER NOT NULL PRIMARY KEY, title VARCHAR NOT NULL, description VARCHAR,
+        owner_id INTEGER REFERENCES users (id)
+    )""",
+    "CREATE INDEX ix_items_id ON items (id)",
+    "CREATE INDEX ix_items_title ON items (title)",
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'schema.db')}")
+    yield engine
+    engine.dispose()
+
+
+class TestMigrate:
+    """Test additive migrations"""
+    
+    def test_fresh_database(self, engine):
+        """Test migrate creates every table and records the fingerprint"""
+        with engine.begin() as conn:
+            changes = migrate(conn)
+        
+        assert changes == [
+            "create table idempotency_keys",
+            "create table users",
+            "create table item_stats",
+            "create table items",
+            "create table refresh_tokens",
+        ]
+        with engine.connect() as conn:
+            check(conn)
+            assert {"users", "items", "items_fts", "schema_meta"} <= set(inspect(conn).get_table_names())
+    
+    def test_idempotent(self, engine):
+        """Test a second migrate finds nothing to do"""
+        with engine.begin() as conn:
+            migrate(conn)
+        with engine.begin() as conn:
+            assert migrate(conn) == []
+    
+    def test_upgrades_original_schema(self, engine):
+        """Test an existing database gains new columns, indexes and a populated search index"""
+        with engine.begin() as conn:
+            for statement in ORIGINAL_SCHEMA:
+                conn.execute(text(statement))
+            conn.execute(text("INSERT INTO users VALUES (1, 'a', 'a@example.com', NULL, 'x')"))
+            conn.execute(text("INSERT INTO items (title, owner_id) VALUES ('buy milk', 1)"))
+        
+        with engine.connect() as conn:
+            pending = plan(conn)
+        with engine.begin() as conn:
+            changes = migrate(conn)
+        
+        assert changes == pending == [
+            "create table idempotency_keys",
+            "add column users.version",
+            "add column users.created_at",
+            "create table item_stats",
+            "add column items.version",
+            "create index ix_items_owner_id_id",
+            "create table refresh_tokens",
+            "create full-text index items_fts",
+        ]
+        with engine.connect() as conn:
+            check(conn)
+            assert conn.execute(text("SELECT version FROM items")).scalar() == 1
+            assert len(conn.execute(search_items_query(1, "milk")).all()) == 1
+    
+    def test_refuses_not_null_column_without_default(self, engine):
+        """Test a column that cannot be added in place is rejected"""
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL)"))
+        
+        with pytest.raises(SchemaError, match="users.username"):
+            with engine.begin() as conn:
+                migrate(conn)
+
+
+class TestCheck:
+    """Test the cheap startup check"""
+    
+    def test_unmigrated_database(self, engine):
+        """Test a database without a fingerprint is refused"""
+        with engine.connect() as conn:
+            with pytest.raises(SchemaError, match="no schema fingerprint"):
+                check(conn)
+    
+    def test_stale_fingerprint(self, engine):
+        """Test a fingerprint from other models is refused"""
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(text("UPDATE schema_meta SET value = 'old' WHERE key = 'fingerprint'"))
+        
+        with engine.connect() as conn:
+            with pytest.raises(SchemaError, match="out of date"):
+                check(conn)
+    
+    def test_fingerprint_is_stable(self, engine):
+        """Test the stored fingerprint is the models' fingerprint"""
+        with engine.begin() as conn:
+            migrate(conn)
+        with engine.connect() as conn:
+            assert stored_fingerprint(conn) == schema_fingerprint(engine.dialect)
@@ -0,0 +1,179 @@
+"""
+Test the pre-fork server: fork safety, worker restarts, draining and scaling
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import pytest
+
+from core.database import async_engine, engine
+from core.hashing import hashing_pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "pass123"
+
+needs_proc = pytest.mark.skipif(not os.path.exists("/proc/self/task"), reason="needs Linux /proc")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """`manage.py serve` on a fresh, migrated database"""
+    
+    def __init__(self, tmp_path, workers: int):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp_path, f'server-{self.port}.db')}",
+            # One Argon2 thread per process, so throughput can only scale with processes
+            "PASSWORD_HASH_WORKERS": "1",
+        }
+        subprocess.run([sys.executable, "manage.py", "migrate"], cwd=ROOT, env=self.env, check=True,
+                       capture_output=True)
+        self.process = subprocess.Popen(
+            [sys.executable, "manage.py", "serve", "--port", str(self.port), "--workers", str(workers),
+             "--graceful-timeout", "10", "--log-level", "warning"],
+            cwd=ROOT, env=self.env, stderr=subprocess.DEVNULL,
+        )
+        self.wait_ready(workers)
+    
+    def workers(self) -> list[int]:
+        pid = self.process.pid
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    
+    def wait_ready(self, workers: int):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{self.url}/health").status_code == 200 and len(self.workers()) == workers:
+                    return
+            except (httpx.TransportError, FileNotFoundError):
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("server did not start")
+    
+    def register(self, email: str):
+        httpx.post(f"{self.url}/api/v1/auth/register", json={"email": email, "password": PASSWORD}, timeout=30)
+    
+    def login(self, email: str) -> int:
+        return httpx.post(
+            f"{self.url}/api/v1/auth/login", data={"username": email, "password": PASSWORD}, timeout=60
+        ).status_code
+    
+    def stop(self) -> int:
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+        return self.process.wait(timeout=60)
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    servers = []
+    
+    def start(workers: int) -> Server:
+        servers.append(Server(tmp_path, workers))
+        return servers[-1]
+    
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def login_rps(server: Server, requests: int, concurrency: int) -> float:
+    server.register("load@example.com")
+    remaining = iter(range(requests))
+    failures = []
+    
+    def worker():
+        for _ in remaining:
+            if server.login("load@example.com") != 200:
+                failures.append(1)
+    
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    assert not failures
+    return requests / elapsed
+
+
+class TestForkSafety:
+    """Test process-wide state is reset in forked children"""
+    
+    def test_child_gets_fresh_pools(self):
+        """Test pools and the hashing executor are not shared across fork"""
+        parent_pools = (engine.pool, async_engine.sync_engine.pool)
+        hashing_pool._get_executor()
+        read_fd, write_fd = os.pipe()
+        
+        pid = os.fork()
+        if pid == 0:
+            fresh = (
+                engine.pool is not parent_pools[0]
+                and async_engine.sync_engine.pool is not parent_pools[1]
+                and hashing_pool._executor is None
+            )
+            os.write(write_fd, b"1" if fresh else b"0")
+            os._exit(0)
+        
+        os.close(write_fd)
+        result = os.read(read_fd, 1)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+        assert result == b"1"
+
+
+@needs_proc
+class TestSupervisor:
+    """Test the master process"""
+    
+    def test_restarts_crashed_worker(self, start_server):
+        """Test a killed worker is replaced and the server keeps answering"""
+        server = start_server(2)
+        crashed = server.workers()[0]
+        
+        os.kill(crashed, signal.SIGKILL)
+        time.sleep(0.5)
+        server.wait_ready(2)
+        
+        assert crashed not in server.workers()
+        assert httpx.get(f"{server.url}/health").status_code == 200
+    
+    def test_sigterm_drains_in_flight_requests(self, start_server):
+        """Test SIGTERM lets an in-flight login finish before workers exit"""
+        server = start_server(1)
+        server.register("drain@example.com")
+        result = {}
+        request = threading.Thread(target=lambda: result.update(status=server.login("drain@example.com")))
+        request.start()
+        time.sleep(0.05)
+        
+        exit_code = server.stop()
+        request.join()
+        
+        assert result["status"] == 200
+        assert exit_code == 0
+    
+    @pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="throughput can only scale with more than one CPU")
+    def test_login_throughput_scales_with_workers(self, start_server):
+        """Test /auth/login throughput grows with worker processes"""
+        workers = min(os.cpu_count(), 4)
+        single = login_rps(start_server(1), requests=16, concurrency=8)
+        multi = login_rps(start_server(workers), requests=16 * workers, concurrency=8 * workers)
+        
+        assert multi >= single * min(workers, 2) * 0.75, f"{single:.1f} rps -> {multi:.1f} rps"
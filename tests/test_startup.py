@@ -0,0 +1,48 @@
+"""
+Test cold-start budget: importing the app touches no database and stays fast
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Generous against the ~0.85 s measured by bench.bench_startup, to absorb CI noise
+IMPORT_BUDGET_SECONDS = 2.5
+DEFERRED_MODULES = ("argon2", "jose", "cryptography.x509")
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {DEFERRED_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def import_main(tmp_path) -> tuple[dict, str]:
+    db_path = os.path.join(tmp_path, "startup.db")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1]), db_path
+
+
+class TestColdStart:
+    """Test what importing main costs"""
+    
+    def test_import_runs_no_ddl(self, tmp_path):
+        """Test importing the app does not open or create the database"""
+        _, db_path = import_main(tmp_path)
+        assert not os.path.exists(db_path)
+    
+    def test_heavy_dependencies_deferred(self, tmp_path):
+        """Test argon2 and python-jose load on first use, not at import"""
+        probe, _ = import_main(tmp_path)
+        assert probe["loaded"] == []
+    
+    def test_import_budget(self, tmp_path):
+        """Test importing the app stays within its time budget"""
+        probe, _ = import_main(tmp_path)
+        assert probe["seconds"] < IMPORT_BUDGET_SECONDS, f"import main took {probe['seconds']:.2f}s"
@@ -0,0 +1,82 @@
+"""
+Test SQLite storage profiles and pool settings
+"""
+import os
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, text
+
+from core.config import Settings
+from core.storage import PROFILES, StorageProfile, apply_storage_profile, pool_options
+
+
+def read_pragmas(engine) -> dict:
+    with engine.connect() as conn:
+        return {
+            name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size", "temp_store")
+        }
+
+
+class TestStorageProfile:
+    """Test profile selection and validation through Settings"""
+    
+    def test_profile_with_overrides(self):
+        """Test a single pragma can override the named profile"""
+        config = Settings(SQLITE_PROFILE="wal_mmap", SQLITE_SYNCHRONOUS="FULL", SQLITE_BUSY_TIMEOUT_MS=250)
+        
+        profile = StorageProfile.from_settings(config)
+        
+        assert profile.journal_mode == "WAL"
+        assert profile.synchronous == "FULL"
+        assert profile.busy_timeout_ms == 250
+        assert profile.mmap_size == PROFILES["wal_mmap"].mmap_size
+    
+    @pytest.mark.parametrize("field, value", [
+        ("SQLITE_PROFILE", "turbo"),
+        ("SQLITE_JOURNAL_MODE", "wal2"),
+        ("SQLITE_BUSY_TIMEOUT_MS", -1),
+        ("DB_POOL_SIZE", 0),
+        ("DB_POOL_RECYCLE_SECONDS", -2),
+    ])
+    def test_invalid_settings_rejected(self, field, value):
+        """Test out-of-range storage settings fail at startup"""
+        with pytest.raises(ValidationError):
+            Settings(**{field: value})
+    
+    def test_pragmas_applied_to_new_connections(self, tmp_path):
+        """Test every pooled connection carries the profile's pragmas"""
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'profile.db')}")
+        apply_storage_profile(engine, PROFILES["wal_mmap"])
+        
+        pragmas = read_pragmas(engine)
+        engine.dispose()
+        
+        assert pragmas == {
+            "journal_mode": "wal",
+            "synchronous": 1,  # NORMAL
+            "busy_timeout": 5000,
+            "cache_size": -64000,
+            "mmap_size": 256 * 1024 * 1024,
+            "temp_store": 2,  # MEMORY
+        }
+
+
+class TestPoolOptions:
+    """Test pool sizing settings"""
+    
+    def test_file_database_gets_pool_settings(self):
+        """Test pool sizing is passed through for file databases"""
+        config = Settings(DB_POOL_SIZE=3, DB_MAX_OVERFLOW=0, DB_POOL_RECYCLE_SECONDS=600)
+        
+        options = pool_options("sqlite:///./app.db", config)
+        
+        assert options["pool_size"] == 3
+        assert options["max_overflow"] == 0
+        assert options["pool_recycle"] == 600
+    
+    def test_memory_database_keeps_default_pool(self):
+        """Test in-memory SQLite is left on its single-connection pool"""
+        assert pool_options("sqlite://") == {}
+        assert pool_options("sqlite+aiosqlite:///:memory:") == {}
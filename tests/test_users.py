@@ -2,6 +2,11 @@
 Test user management endpoints
 """
 import pytest
+from sqlalchemy import text
+
+from core import metrics
+from core.security import principal_cache
+from crud.user import profile_cache
 
 
 class TestGetCurrentUser:
@@ -35,6 +40,47 @@ class TestGetCurrentUser:
         assert user2["email"] == second_user_data["email"]
 
 
+class TestPrincipalCache:
+    """Test caching of authenticated users in get_current_user"""
+    
+    def test_repeated_requests_hit_cache(self, client, auth_headers):
+        """Test the second authenticated request is served from the cache"""
+        client.get("/api/v1/users/me", headers=auth_headers)
+        hits = principal_cache.hits
+        
+        response = client.get("/api/v1/users/me", headers=auth_headers)
+        assert response.status_code == 200
+        assert principal_cache.hits == hits + 1
+    
+    def test_update_invalidates_cache(self, client, auth_headers):
+        """Test /users/me reflects an update made through PUT /users/me"""
+        client.get("/api/v1/users/me", headers=auth_headers)
+        client.put("/api/v1/users/me", params={"full_name": "Cached Name"}, headers=auth_headers)
+        
+        response = client.get("/api/v1/users/me", headers=auth_headers)
+        assert response.json()["full_name"] == "Cached Name"
+
+
+class TestUserETag:
+    """Test conditional GET on /users/me"""
+    
+    def test_me_not_modified(self, client, auth_headers):
+        """Test a matching If-None-Match returns 304"""
+        etag = client.get("/api/v1/users/me", headers=auth_headers).headers["ETag"]
+        
+        response = client.get("/api/v1/users/me", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 304
+    
+    def test_me_etag_changes_on_update(self, client, auth_headers):
+        """Test updating the profile changes its ETag"""
+        etag = client.get("/api/v1/users/me", headers=auth_headers).headers["ETag"]
+        client.put("/api/v1/users/me", params={"full_name": "Renamed"}, headers=auth_headers)
+        
+        response = client.get("/api/v1/users/me", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
 class TestGetUserById:
     """Test GET /users/{user_id} endpoint"""
     
@@ -53,6 +99,86 @@ class TestGetUserById:
         assert response.status_code == 404
 
 
+class TestProfileCache:
+    """Test cached profile lookups and batch resolution"""
+    
+    def test_lookup_is_cached(self, client, auth_headers, test_user):
+        """Test a second lookup of the same profile issues no query"""
+        user_id = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+        queries = metrics.profile_queries.value()
+        
+        first = client.get(f"/api/v1/users/{user_id}", headers=auth_headers)
+        second = client.get(f"/api/v1/users/{user_id}", headers=auth_headers)
+        
+        assert first.json() == second.json()
+        assert metrics.profile_queries.value() == queries + 1
+        assert second.headers["Server-Timing"].endswith('desc="0 queries"')
+    
+    def test_batch_in_request_order(self, client, auth_headers, second_auth_headers):
+        """Test batch lookups keep request order and list unknown ids as missing"""
+        me = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+        other = client.get("/api/v1/users/me", headers=second_auth_headers).json()["id"]
+        
+        response = client.get(f"/api/v1/users?ids={other},999,{me},{other}", headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [user["id"] for user in data["users"]] == [other, me]
+        assert data["users"][0]["email"] == "user2@example.com"
+        assert data["missing"] == [999]
+    
+    def test_batch_limit(self, client, auth_headers, monkeypatch):
+        """Test id lists over USERS_BATCH_MAX_IDS are 413, independent of the items limit"""
+        from core.config import settings
+        monkeypatch.setattr(settings, "USERS_BATCH_MAX_IDS", 2)
+        monkeypatch.setattr(settings, "ITEMS_BULK_MAX_BATCH", 500)
+        
+        assert client.get("/api/v1/users?ids=1,2", headers=auth_headers).status_code == 200
+        assert client.get("/api/v1/users?ids=1,2,3", headers=auth_headers).status_code == 413
+        assert client.get("/api/v1/users?ids=1,x", headers=auth_headers).status_code == 422
+    
+    def test_batch_misses_share_one_query(self, client, auth_headers, second_auth_headers):
+        """Test only the uncached ids are loaded, with a single query"""
+        me = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+        other = client.get("/api/v1/users/me", headers=second_auth_headers).json()["id"]
+        client.get(f"/api/v1/users/{me}", headers=auth_headers)
+        hits = profile_cache.hits
+        
+        response = client.get(f"/api/v1/users?ids={me},{other},998,999", headers=auth_headers)
+        
+        assert response.headers["Server-Timing"].endswith('desc="1 queries"')
+        assert profile_cache.hits == hits + 1
+    
+    def test_update_writes_through(self, client, auth_headers):
+        """Test an update replaces the cached profile at once"""
+        user_id = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+        client.get(f"/api/v1/users/{user_id}", headers=auth_headers)
+        
+        client.put("/api/v1/users/me?full_name=Renamed", headers=auth_headers)
+        
+        assert client.get(f"/api/v1/users?ids={user_id}", headers=auth_headers).json()["users"][0]["full_name"] == "Renamed"
+    
+    def test_delete_invalidates(self, client, auth_headers, second_auth_headers):
+        """Test a deleted user is no longer served from the cache"""
+        user_id = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+        client.get(f"/api/v1/users/{user_id}", headers=second_auth_headers)
+        
+        client.delete("/api/v1/users/me", headers=auth_headers)
+        
+        assert client.get(f"/api/v1/users/{user_id}", headers=second_auth_headers).status_code == 404
+    
+    def test_cache_metrics(self, client, auth_headers):
+        """Test /metrics reports cache hits and misses by cache"""
+        user_id = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+        client.get(f"/api/v1/users/{user_id}", headers=auth_headers)
+        client.get(f"/api/v1/users/{user_id}", headers=auth_headers)
+        
+        body = client.get("/metrics").text
+        
+        assert 'cache_hits_total{cache="profile"}' in body
+        assert "profile_cache_fallback_queries_total" in body
+
+
 class TestUpdateUser:
     """Test PUT /users/me endpoint"""
     
@@ -67,6 +193,13 @@ class TestUpdateUser:
         assert response.status_code == 200
         assert response.json()["full_name"] == "New Name"
     
+    def test_update_loses_race(self, client, auth_headers, concurrent_write):
+        """Test an update overtaken by a concurrent write is 409, not 500"""
+        concurrent_write("UPDATE users SET version = version + 1")
+        response = client.put("/api/v1/users/me", params={"full_name": "Mine"}, headers=auth_headers)
+        
+        assert response.status_code == 409
+    
     def test_update_user_unauthorized(self, client):
         """Test updating user without authentication"""
         response = client.put(
@@ -88,6 +221,19 @@ class TestDeleteUser:
         response = client.get("/api/v1/users/me", headers=auth_headers)
         assert response.status_code == 401
     
+    def test_delete_racing_update(self, client, auth_headers, concurrent_write, run_db):
+        """Test deleting the account succeeds when a concurrent update changed it, and detaches its items"""
+        item_id = client.post("/api/v1/items/", json={"title": "Mine"}, headers=auth_headers).json()["id"]
+        concurrent_write("UPDATE users SET version = version + 1")
+        
+        assert client.delete("/api/v1/users/me", headers=auth_headers).status_code == 204
+        
+        async def remaining(session):
+            users = (await session.execute(text("SELECT count(*) FROM users"))).scalar()
+            owner = (await session.execute(text(f"SELECT owner_id FROM items WHERE id = {item_id}"))).scalar()
+            return users, owner
+        assert run_db(remaining) == (0, None)
+    
     def test_delete_user_unauthorized(self, client):
         """Test deleting user without authentication"""
         response = client.delete("/api/v1/users/me")